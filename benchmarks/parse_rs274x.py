@@ -0,0 +1,338 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+
+"""
+Benchmark the RS-274X parser against the line-splitting parser it replaced.
+
+Every gerber file in examples/gerbers and examples/gerbv_test_files is parsed
+with both parsers and the resulting statements are compared. Two timings are
+reported for each parser: building the statements from the file data (the
+part the tokenizer replaces), and the full parse including primitive
+generation. Use --repeat to change the number of timed runs per file; the
+best run is kept.
+
+    python benchmarks/parse_rs274x.py [--repeat N] [files...]
+"""
+
+from __future__ import print_function
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from gerber.gerber_statements import *
+from gerber.rs274x import GerberParser
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir, 'examples')
+DEFAULT_FILES = (glob.glob(os.path.join(EXAMPLES, 'gerbers', '*.G[BT][LOS]')) +
+                 glob.glob(os.path.join(EXAMPLES, 'gerbv_test_files', '*.gbx')))
+
+
+class LegacyGerberParser(GerberParser):
+    """ The parser as it was before the single-pass tokenizer
+
+    Commands are split on '*' and newlines, then each command is matched
+    against every statement expression in turn.
+    """
+
+    def _parse(self, data):
+        return self._parse_commands(self._split_commands(data))
+
+    def _split_commands(self, data):
+        """
+        Split the data into commands. Commands end with * (and also newline to help with some badly formatted files)
+        """
+
+        length = len(data)
+        start = 0
+        in_header = True
+
+        for cur in range(0, length):
+
+            val = data[cur]
+
+            if val == '%' and start == cur:
+                in_header = True
+                continue
+
+            if val == '\r' or val == '\n':
+                if start != cur:
+                    yield data[start:cur]
+                start = cur + 1
+
+            elif not in_header and val == '*':
+                yield data[start:cur + 1]
+                start = cur + 1
+
+            elif in_header and val == '%':
+                yield data[start:cur + 1]
+                start = cur + 1
+                in_header = False
+
+    def _parse_commands(self, data):
+        oldline = ''
+
+        for line in data:
+            line = oldline + line.strip()
+
+            # skip empty lines
+            if not len(line):
+                continue
+
+            # deal with multi-line parameters
+            if line.startswith("%") and not line.endswith("%") and not "%" in line[1:]:
+                oldline = line
+                continue
+
+            did_something = True  # make sure we do at least one loop
+            while did_something and len(line) > 0:
+                did_something = False
+
+                # consume empty data blocks
+                if line[0] == '*':
+                    line = line[1:]
+                    did_something = True
+                    continue
+
+                # coord
+                (coord, r) = _match_one(self.COORD_STMT, line)
+                if coord:
+                    yield CoordStmt.from_dict(coord, self.settings)
+                    line = r
+                    did_something = True
+                    continue
+
+                # aperture selection
+                (aperture, r) = _match_one(self.APERTURE_STMT, line)
+                if aperture:
+                    yield ApertureStmt(**aperture)
+                    did_something = True
+                    line = r
+                    continue
+
+                # parameter
+                (param, r) = _match_one_from_many(self.PARAM_STMT, line)
+
+                if param:
+                    if param["param"] == "FS":
+                        stmt = FSParamStmt.from_dict(param)
+                        self.settings.zero_suppression = stmt.zero_suppression
+                        self.settings.format = stmt.format
+                        self.settings.notation = stmt.notation
+                        yield stmt
+                    elif param["param"] == "MO":
+                        stmt = MOParamStmt.from_dict(param)
+                        self.settings.units = stmt.mode
+                        yield stmt
+                    elif param["param"] == "LP":
+                        yield LPParamStmt.from_dict(param)
+                    elif param["param"] == "AD":
+                        yield ADParamStmt.from_dict(param)
+                    elif param["param"] == "AM":
+                        stmt = AMParamStmt.from_dict(param)
+                        stmt.units = self.settings.units
+                        yield stmt
+                    elif param["param"] == "OF":
+                        yield OFParamStmt.from_dict(param)
+                    elif param["param"] == "IF":
+                        # Don't crash on include loop
+                        if self._recursion_depth < self.INCLUDE_FILE_RECURSION_LIMIT:
+                            self._recursion_depth += 1
+                            with open(os.path.join(os.path.dirname(self.filename), param["filename"]), 'r') as f:
+                                inc_data = f.read()
+                            for stmt in self._parse(inc_data):
+                                yield stmt
+                            self._recursion_depth -= 1
+                        else:
+                            raise IOError("Include file nesting depth limit exceeded.")
+                    elif param["param"] == "IN":
+                        yield INParamStmt.from_dict(param)
+                    elif param["param"] == "LN":
+                        yield LNParamStmt.from_dict(param)
+                    # deprecated commands AS, IN, IP, IR, MI, OF, SF, LN
+                    elif param["param"] == "AS":
+                        yield ASParamStmt.from_dict(param)
+                    elif param["param"] == "IN":
+                        yield INParamStmt.from_dict(param)
+                    elif param["param"] == "IP":
+                        yield IPParamStmt.from_dict(param)
+                    elif param["param"] == "IR":
+                        yield IRParamStmt.from_dict(param)
+                    elif param["param"] == "MI":
+                        yield MIParamStmt.from_dict(param)
+                    elif param["param"] == "OF":
+                        yield OFParamStmt.from_dict(param)
+                    elif param["param"] == "SF":
+                        yield SFParamStmt.from_dict(param)
+                    elif param["param"] == "LN":
+                        yield LNParamStmt.from_dict(param)
+                    else:
+                        yield UnknownStmt(line)
+
+                    did_something = True
+                    line = r
+                    continue
+
+                # Region Mode
+                (mode, r) = _match_one(self.REGION_MODE_STMT, line)
+                if mode:
+                    yield RegionModeStmt.from_gerber(line)
+                    line = r
+                    did_something = True
+                    continue
+
+                # Quadrant Mode
+                (mode, r) = _match_one(self.QUAD_MODE_STMT, line)
+                if mode:
+                    yield QuadrantModeStmt.from_gerber(line)
+                    line = r
+                    did_something = True
+                    continue
+
+                # comment
+                (comment, r) = _match_one(self.COMMENT_STMT, line)
+                if comment:
+                    yield CommentStmt(comment["comment"])
+                    did_something = True
+                    line = r
+                    continue
+
+                # deprecated codes
+                (deprecated_unit, r) = _match_one(self.DEPRECATED_UNIT, line)
+                if deprecated_unit:
+                    stmt = MOParamStmt(param="MO", mo="inch" if "G70" in
+                                       deprecated_unit["mode"] else "metric")
+                    self.settings.units = stmt.mode
+                    yield stmt
+                    line = r
+                    did_something = True
+                    continue
+
+                (deprecated_format, r) = _match_one(self.DEPRECATED_FORMAT, line)
+                if deprecated_format:
+                    yield DeprecatedStmt.from_gerber(line)
+                    line = r
+                    did_something = True
+                    continue
+
+                # eof
+                (eof, r) = _match_one(self.EOF_STMT, line)
+                if eof:
+                    yield EofStmt()
+                    did_something = True
+                    line = r
+                    continue
+
+                if line.find('*') > 0:
+                    yield UnknownStmt(line)
+                    did_something = True
+                    line = ""
+                    continue
+
+            oldline = line
+
+
+def _match_one(expr, data):
+    match = expr.match(data)
+    if match is None:
+        return ({}, None)
+    else:
+        return (match.groupdict(), data[match.end(0):])
+
+
+def _match_one_from_many(exprs, data):
+    for expr in exprs:
+        match = expr.match(data)
+        if match:
+            return (match.groupdict(), data[match.end(0):])
+
+    return ({}, None)
+
+
+def _statements(parser_class, data, filename):
+    parser = parser_class()
+    parser.filename = filename
+    return list(parser._parse(data))
+
+
+def _parse(parser_class, data, filename):
+    parser = parser_class()
+    return parser.parse_raw(data, filename)
+
+
+def _time(func, parser_class, data, filename, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func(parser_class, data, filename)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('--repeat', type=int, default=5,
+                           help='number of timed parses per file (best is kept)')
+    argparser.add_argument('files', nargs='*', help='gerber files to parse')
+    args = argparser.parse_args()
+
+    total_bytes = 0
+    totals = {}
+
+    print('{0:<36} {1:>7} {2:>21} {3:>21}'.format(
+        '', '', 'statements (ms)', 'full parse (ms)'))
+    print('{0:<36} {1:>7} {2:>7}{3:>7}{4:>7} {2:>7}{3:>7}{4:>7}'.format(
+        'file', 'bytes', 'legacy', 'new', 'gain'))
+    for filename in sorted(args.files or DEFAULT_FILES):
+        with open(filename, 'r') as f:
+            data = f.read()
+        try:
+            legacy = _parse(LegacyGerberParser, data, filename)
+        except Exception:
+            # Files the parser cannot handle are not interesting here
+            continue
+        new = _parse(GerberParser, data, filename)
+        if [str(s) for s in legacy.statements] != [str(s) for s in new.statements]:
+            print('{0}: statements differ'.format(filename), file=sys.stderr)
+
+        times = []
+        for func in (_statements, _parse):
+            for parser_class in (LegacyGerberParser, GerberParser):
+                elapsed = _time(func, parser_class, data, filename, args.repeat)
+                key = (func, parser_class)
+                totals[key] = totals.get(key, 0.0) + elapsed
+                times.append(elapsed)
+        total_bytes += len(data)
+        print('{0:<36} {1:>7} {2:>7.2f}{3:>7.2f}{4:>6.1f}x {5:>7.2f}{6:>7.2f}{7:>6.1f}x'.format(
+            os.path.basename(filename)[:36], len(data),
+            times[0] * 1000, times[1] * 1000, times[0] / max(times[1], 1e-9),
+            times[2] * 1000, times[3] * 1000, times[2] / max(times[3], 1e-9)))
+
+    print()
+    for func, name in ((_statements, 'statements'), (_parse, 'full parse')):
+        legacy = totals[(func, LegacyGerberParser)]
+        new = totals[(func, GerberParser)]
+        print('{0:<10}  legacy {1:6.2f} MB/s  new {2:6.2f} MB/s  ({3:.1f}x)'.format(
+            name, total_bytes / legacy / 1e6, total_bytes / new / 1e6, legacy / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+
+"""
+Benchmark the rendering backends.
+
+Every gerber file in examples/gerbers and examples/gerbv_test_files, plus a
+set of synthetic stress boards (100k flashes, 100k trace segments and a few
+huge regions), is rendered with each backend at each scale. For every run the
+best wall time, the growth of the peak resident set size (RSS) while
+rendering, and the number of primitives rendered per second are reported.
+Each measurement runs in a fresh worker process, so that peak RSS is not
+hidden by earlier runs.
+
+The SVG backends write vectors, so their cost does not depend on the scale
+and they are only run once per file.
+
+    python benchmarks/render.py [--backend NAME] [--scale N] [--repeat N]
+                                [--no-synthetic] [files...]
+"""
+
+from __future__ import print_function
+
+import argparse
+import glob
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from gerber import load_layer
+from gerber.primitives import Circle, Flash, Line, Region
+from gerber.render import GerberNumpyContext, GerberSvgContext
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    from gerber.render import GerberCairoContext
+except ImportError:
+    GerberCairoContext = None
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir, 'examples')
+DEFAULT_FILES = (glob.glob(os.path.join(EXAMPLES, 'gerbers', '*.G[BT][LOS]')) +
+                 glob.glob(os.path.join(EXAMPLES, 'gerbv_test_files', '*.gbx')))
+DEFAULT_SCALES = (100, 200, 400)
+
+
+def _render_cairo(layer, scale):
+    ctx = GerberCairoContext(scale, raster=True)
+    ctx.render_layer(layer)
+    ctx.dump_str()
+
+
+def _render_cairo_svg(layer, scale):
+    ctx = GerberCairoContext(scale)
+    ctx.render_layer(layer)
+    ctx.dump_svg_str()
+
+
+def _render_numpy(layer, scale):
+    ctx = GerberNumpyContext(scale)
+    ctx.render_layer(layer)
+    ctx.dump_str()
+
+
+def _render_svg(layer, scale):
+    with open(os.devnull, 'w') as f:
+        GerberSvgContext().render_layer(layer, f)
+
+
+# name: (render function, depends on scale)
+BACKENDS = {'numpy': (_render_numpy, True),
+            'svg': (_render_svg, False)}
+if GerberCairoContext is not None:
+    BACKENDS['cairo'] = (_render_cairo, True)
+    BACKENDS['cairo-svg'] = (_render_cairo_svg, False)
+
+
+class SyntheticLayer(object):
+    """ A layer made of generated primitives
+    """
+
+    def __init__(self, name, primitives):
+        self.name = name
+        self.layer_class = 'top'
+        self.cam_source = None
+        self.primitives = primitives
+        boxes = [p.bounding_box for p in primitives]
+        self.bounds = ((min(b[0][0] for b in boxes), max(b[0][1] for b in boxes)),
+                       (min(b[1][0] for b in boxes), max(b[1][1] for b in boxes)))
+
+
+def synthetic_layers(count=100000):
+    """ Stress boards in inches: flashes, trace segments and huge regions
+    """
+    rng = random.Random(0)
+
+    # A grid of pads, all flashed from the same aperture
+    pad = Circle((0, 0), 0.02)
+    columns = int(math.sqrt(count * 1.6))
+    flashes = [Flash(pad, (0.03 * (i % columns), 0.03 * (i // columns)))
+               for i in range(count)]
+
+    # Rows of short trace segments wandering across the board
+    trace = Circle((0, 0), 0.008)
+    per_row = int(math.sqrt(count))
+    segments = []
+    for row in range(count // per_row):
+        y = 0.04 * row
+        x = 0.0
+        for _ in range(per_row):
+            dx = rng.uniform(0.01, 0.03)
+            dy = rng.uniform(-0.01, 0.01)
+            segments.append(Line((x, y), (x + dx, y + dy), trace))
+            x, y = x + dx, y + dy
+
+    # Star shaped pours, each with a great many vertices
+    edge = Circle((0, 0), 0)
+    regions = []
+    vertices = count // 4
+    for i in range(4):
+        cx, cy = 4.0 * (i % 2), 4.0 * (i // 2)
+        points = []
+        for j in range(vertices):
+            angle = 2 * math.pi * j / vertices
+            radius = 1.5 + (0.3 if j % 2 else 0.0)
+            points.append((cx + radius * math.cos(angle),
+                           cy + radius * math.sin(angle)))
+        points.append(points[0])
+        regions.append(Region([Line(start, end, edge)
+                                for start, end in zip(points, points[1:])]))
+
+    return [SyntheticLayer('synthetic: {} flashes'.format(len(flashes)),
+                           flashes),
+            SyntheticLayer('synthetic: {} segments'.format(len(segments)),
+                           segments),
+            SyntheticLayer('synthetic: {} regions of {} edges'.format(
+                len(regions), vertices), regions)]
+
+
+def _peak_rss():
+    """ Peak RSS of this process in bytes, if known
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _measure(render, layer, scale, repeat):
+    """ Best time and peak RSS growth of `repeat` renders
+    """
+    baseline = _peak_rss()
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        render(layer, scale)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, _peak_rss() - baseline
+
+
+def _measure_worker(conn, render, layer, scale, repeat):
+    try:
+        conn.send(_measure(render, layer, scale, repeat))
+    except Exception as e:
+        conn.send(e)
+    conn.close()
+
+
+def measure(render, layer, scale, repeat):
+    """ Measure a render in a forked process where possible
+
+    The layer is inherited by the worker rather than pickled.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return _measure(render, layer, scale, repeat)
+    context = multiprocessing.get_context('fork')
+    parent, child = context.Pipe(duplex=False)
+    worker = context.Process(target=_measure_worker,
+                             args=(child, render, layer, scale, repeat))
+    worker.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = RuntimeError('worker exited with code {}'.format(
+            worker.exitcode))
+    worker.join()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('--backend', action='append',
+                           choices=sorted(BACKENDS),
+                           help='backend to benchmark, may be repeated '
+                                '(default: all available)')
+    argparser.add_argument('--scale', type=int, action='append',
+                           help='rendering scale in pixels per unit, may be '
+                                'repeated (default: {})'.format(
+                                    ' '.join(str(s) for s in DEFAULT_SCALES)))
+    argparser.add_argument('--repeat', type=int, default=3,
+                           help='number of timed renders per run (best is kept)')
+    argparser.add_argument('--no-synthetic', action='store_true',
+                           help='skip the synthetic stress boards')
+    argparser.add_argument('files', nargs='*', help='gerber files to render')
+    args = argparser.parse_args()
+
+    backends = args.backend or sorted(BACKENDS)
+    scales = args.scale or DEFAULT_SCALES
+
+    layers = []
+    for filename in sorted(args.files or DEFAULT_FILES):
+        try:
+            layer = load_layer(filename)
+        except Exception:
+            # Files the parser cannot handle are not interesting here
+            continue
+        layers.append((os.path.basename(filename), layer))
+    if not args.no_synthetic:
+        layers.extend((layer.name, layer) for layer in synthetic_layers())
+
+    totals = {}
+    print('{0:<10} {1:<36} {2:>6} {3:>8} {4:>10} {5:>9} {6:>12}'.format(
+        'backend', 'file', 'scale', 'prims', 'time (ms)', 'RSS (MB)',
+        'prims/s'))
+    for backend in backends:
+        render, scaled = BACKENDS[backend]
+        for name, layer in layers:
+            count = len(layer.primitives)
+            for scale in (scales if scaled else scales[:1]):
+                try:
+                    elapsed, rss = measure(render, layer, scale, args.repeat)
+                except Exception as e:
+                    print('{0} {1} @ {2}: {3!r}'.format(backend, name, scale, e),
+                          file=sys.stderr)
+                    continue
+                total = totals.setdefault(backend, [0, 0.0])
+                total[0] += count
+                total[1] += elapsed
+                print('{0:<10} {1:<36} {2:>6} {3:>8} {4:>10.2f} {5:>9.1f} '
+                      '{6:>12.0f}'.format(backend, name[:36],
+                                          scale if scaled else '-', count,
+                                          elapsed * 1000, rss / 1e6,
+                                          count / max(elapsed, 1e-9)))
+
+    print()
+    for backend in backends:
+        if backend in totals:
+            count, elapsed = totals[backend]
+            print('{0:<10}  {1:8.2f} s  {2:12.0f} primitives/s'.format(
+                backend, elapsed, count / max(elapsed, 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
@@ -23,6 +23,8 @@ gerber-tools provides utilities for working with Gerber (RS-274X) and Excellon
 files in python.
 """
 
+__version__ = '0.1'
+
 from .common import read, loads
 from .layers import load_layer, load_layer_data
 from .pcb import PCB
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.cache
+============
+**On-disk cache of parsed CAM files**
+
+This module provides :class:`ParseCache`, which stores parsed GerberFile,
+ExcellonFile and IPCNetlist objects on disk keyed by a hash of the source file
+contents, so reading an unchanged file again skips the parse.
+
+    >>> cache = ParseCache('/tmp/gerber-cache')
+    >>> copper = gerber.read('board.GTL', cache=cache)
+
+Cache entries are pickles, and unpickling data can run arbitrary code. Only
+point a cache at a directory that nobody untrusted can write to, even when it
+is shared between processes or machines.
+"""
+
+import hashlib
+import mmap
+import os
+import sys
+import tempfile
+import zlib
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from . import __version__
+from .common import loads
+from .reader import read_text
+
+# Version of the layout of the pickled objects. Bump it whenever a class that
+# ends up in a cache entry gains, loses or renames an attribute or slot, so
+# entries written before the change are no longer found.
+CACHE_FORMAT = 5
+
+# Cached objects are only valid for the cache format, library version and
+# Python major version that wrote them.
+CACHE_VERSION = '{0}-{1}-py{2}'.format(CACHE_FORMAT, __version__,
+                                       sys.version_info[0])
+
+CACHE_EXTENSION = '.cache'
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class ParseCache(object):
+    """ Size-bounded on-disk cache of parsed CAM files
+
+    Entries are stored as compressed pickles named after the SHA-1 of the
+    source file contents and the cache version. When the cache grows past
+    `max_size` bytes, the least recently used entries are removed.
+
+    The contents of files included by a gerber file (%IF%) are not part of
+    the key.
+
+    Parameters
+    ----------
+    directory : string
+        Directory to store cache entries in. Created if it does not exist.
+        Entries are unpickled, so it must only be writable by trusted users.
+
+    max_size : int, optional
+        Maximum total size of the cache entries in bytes.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @property
+    def size(self):
+        """ Total size of the cache entries in bytes
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def read(self, filename):
+        """ Read a CAM file, using the cached parse if there is one
+
+        Parameters
+        ----------
+        filename : string
+            Filename of the file to read.
+
+        Returns
+        -------
+        file : CncFile subclass
+            CncFile object representing the file, either GerberFile,
+            ExcellonFile, or IPCNetlist.
+        """
+        key = self.key(filename)
+        camfile = self.get(key)
+        if camfile is None:
+            camfile = loads(read_text(filename), filename)
+            self.put(key, camfile)
+        else:
+            camfile.filename = filename
+        return camfile
+
+    def key(self, filename):
+        """ Return the cache key for the contents of filename
+        """
+        digest = hashlib.sha1(CACHE_VERSION.encode('ascii'))
+        with open(filename, 'rb') as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                buf = None
+            if buf is not None:
+                try:
+                    digest.update(buf)
+                finally:
+                    buf.close()
+        return digest.hexdigest()
+
+    def get(self, key):
+        """ Return the object cached under key, or None if there is none
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return None
+        try:
+            obj = pickle.loads(zlib.decompress(data))
+        except Exception:
+            # Unreadable entry, most likely written by an older version
+            self._remove(path)
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return obj
+
+    def put(self, key, obj):
+        """ Store obj in the cache under key
+        """
+        data = zlib.compress(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), 1)
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            _replace(tmp, self._path(key))
+        except Exception:
+            self._remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """ Remove least recently used entries until the cache fits max_size
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """ Remove every cache entry
+        """
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_EXTENSION)
+
+    def _entries(self):
+        """ (mtime, size, path) of every cache entry
+        """
+        for name in os.listdir(self.directory):
+            if not name.endswith(CACHE_EXTENSION):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield (st.st_mtime, st.st_size, path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
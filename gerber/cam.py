@@ -22,6 +22,8 @@ CAM File
 This module provides common base classes for Excellon/Gerber CNC files
 """
 
+from .spatial import SpatialIndex
+
 
 class FileSettings(object):
     """ CAM File Settings
@@ -210,6 +212,14 @@ class CamFile(object):
     format : tuple (<int>, <int>)
         File decimal representation format as a tuple of (integer digits,
         decimal digits)
+
+    spatial_index : :class:`gerber.spatial.SpatialIndex`
+        Index of the primitives for window and nearest queries. Built on
+        first use, and rebuilt after `offset`, `to_inch` or `to_metric`.
+
+    version : int
+        Number of times the file has been modified in place, so that
+        anything derived from its primitives can tell when it is stale.
     """
 
     def __init__(self, statements=None, settings=None, primitives=None,
@@ -231,6 +241,7 @@ class CamFile(object):
             self.primitives = primitives
         self.filename = filename
         self.layer_name = layer_name
+        self._spatial_index = None
 
     @property
     def settings(self):
@@ -250,6 +261,25 @@ class CamFile(object):
         """
         pass
 
+    @property
+    def spatial_index(self):
+        # IPCNetlist doesn't call CamFile.__init__
+        if getattr(self, '_spatial_index', None) is None:
+            self._spatial_index = SpatialIndex(self.primitives)
+        return self._spatial_index
+
+    @property
+    def version(self):
+        return getattr(self, '_version', 0)
+
+    def invalidate_spatial_index(self):
+        """ Drop the spatial index, e.g. after editing the primitives
+
+        This also bumps the file's `version`.
+        """
+        self._spatial_index = None
+        self._version = self.version + 1
+
     def to_inch(self):
         pass
 
@@ -274,8 +304,7 @@ class CamFile(object):
         ctx._paint_background()
         ctx.invert = invert
         ctx._new_render_layer()
-        for p in self.primitives:
-            ctx.render(p)
+        ctx.render_many(self.primitives)
         ctx._flatten()
 
         if filename is not None:
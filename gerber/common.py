@@ -19,10 +19,11 @@ from . import rs274x
 from . import excellon
 from . import ipc356
 from .exceptions import ParseError
+from .reader import read_text
 from .utils import detect_file_format
 
 
-def read(filename):
+def read(filename, cache=None):
     """ Read a gerber or excellon file and return a representative object.
 
     Parameters
@@ -30,14 +31,19 @@ def read(filename):
     filename : string
         Filename of the file to read.
 
+    cache : :class:`gerber.cache.ParseCache`, optional
+        Cache of parsed files to use. The file is only parsed if the cache
+        does not hold a parse of the same file contents.
+
     Returns
     -------
     file : CncFile subclass
         CncFile object representing the file, either GerberFile, ExcellonFile,
         or IPCNetlist. Returns None if file is not of the proper type.
     """
-    with open(filename, 'rU') as f:
-        data = f.read()
+    if cache is not None:
+        return cache.read(filename)
+    data = read_text(filename)
     return loads(data, filename)
 
 
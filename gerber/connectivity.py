@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.connectivity
+===================
+**Copper connectivity**
+
+This module extracts the nets of a board from its copper layers and the
+plated holes joining them, and compares them with an IPC-D-356 netlist.
+
+    >>> nets = Connectivity([top, inner1, inner2, bottom], [drills])
+    >>> report = nets.compare(ipc_netlist)
+    >>> report.opens, report.shorts
+
+The copper of each layer is modelled as in :mod:`gerber.drc`. Copper that
+touches, copper inside a filled polygon, and copper touched by a plated hole
+is merged by union-find over the touching pairs found by sweep and prune.
+The holes then join the layers into nets. Layers are labelled in parallel,
+one worker process per layer.
+
+As in the design rule checks, clear polarity primitives are ignored, so
+copper cut apart by clear primitives is still reported as connected.
+"""
+
+import multiprocessing
+from collections import namedtuple
+from itertools import compress
+
+import numpy as np
+
+from .drc import (_Geometry, _components, _connected, _is_copper, _near_pairs,
+                  _spatial_index, _unit_scale, _TOUCHING)
+from .excellon import DrillHit, DrillSlot
+from .excellon_statements import ExcellonTool
+from .primitives import Drill, Slot
+
+NetReport = namedtuple('NetReport', ['nets', 'opens', 'shorts', 'unconnected'])
+NetReport.__doc__ = """ Extracted nets compared with a netlist
+
+    nets : dict
+        Sorted list of the extracted nets the test records of each netlist
+        net land on, by net name
+
+    opens : dict
+        The entries of `nets` that land on more than one net
+
+    shorts : dict
+        Sorted list of the netlist nets landing on each extracted net that
+        more than one lands on, by net id
+
+    unconnected : list
+        Test records with no copper under them
+"""
+
+# Test records with this net name are unconnected pins
+_NO_CONNECTION = 'N/C'
+
+# Layers being labelled by worker processes, inherited when they fork
+_TASKS = None
+
+
+class Connectivity(object):
+    """ Nets of a stack of copper layers
+
+    Parameters
+    ----------
+    layers : list
+        Copper layers (:class:`gerber.layers.PCBLayer` or
+        :class:`gerber.cam.CamFile`), from top to bottom
+
+    drill_layers : list, optional
+        Drill layers. Their plated hits and slots join the copper of every
+        layer they touch. Hits of tools known to be non-plated are left out.
+
+    tolerance : float, optional
+        Maximum error of the chords arcs are split into, in the units of
+        each layer
+
+    processes : int, optional
+        Number of worker processes labelling the layers. Defaults to one per
+        CPU. With 1, or where processes can't be forked, the layers are
+        labelled in this process.
+
+    Attributes
+    ----------
+    primitive_nets : list of numpy.ndarray
+        Net of each primitive of each layer, -1 for primitives that are not
+        copper
+
+    holes : list
+        The plated holes, as :class:`gerber.primitives.Drill` and
+        :class:`gerber.primitives.Slot` primitives
+
+    hole_nets : numpy.ndarray
+        Net of each hole, -1 for holes that touch no copper
+
+    net_count : int
+        Number of nets. Nets are numbered from 0.
+    """
+
+    def __init__(self, layers, drill_layers=(), tolerance=1e-4,
+                 processes=None):
+        self.layers = list(layers)
+        self.drill_layers = list(drill_layers)
+        self.tolerance = tolerance
+        self._indexes = {}
+
+        holes = []
+        for drill_layer in self.drill_layers:
+            holes.extend((drill_layer, hole)
+                         for hole in _plated_holes(drill_layer))
+        self.holes = [hole for _, hole in holes]
+        tasks = [([p for p in layer.primitives],
+                  [_scaled(hole, _unit_scale(drill_layer, layer))
+                   for drill_layer, hole in holes], tolerance)
+                 for layer in self.layers]
+        results = _run(tasks, processes)
+
+        # Nodes are the components of each layer, then the holes. The holes
+        # join the components they belong to on every layer.
+        hole_count = len(self.holes)
+        offsets = np.cumsum([0] + [len(labels) for _, labels in results])
+        total = offsets[-1] + hole_count
+        holes = np.arange(hole_count) + total - hole_count
+        first = [holes] * len(results)
+        second = [offset + labels[len(labels) - hole_count:]
+                  for offset, (_, labels) in zip(offsets, results)]
+        if hole_count:
+            labels = _components(total, np.concatenate(first),
+                                 np.concatenate(second))
+        else:
+            labels = np.arange(total)
+
+        # Number the components with copper in them
+        roots = np.unique(np.concatenate(
+            [labels[offset + layer_labels[:is_copper.sum()]]
+             for offset, (is_copper, layer_labels) in zip(offsets, results)] +
+            [np.zeros(0, np.intp)]))
+        self.net_count = len(roots)
+        net = np.full(total, -1, dtype=np.intp)
+        net[roots] = np.arange(len(roots))
+        net = net[labels]
+
+        self.primitive_nets = []
+        for (is_copper, layer_labels), offset in zip(results, offsets):
+            nets = np.full(len(is_copper), -1, dtype=np.intp)
+            nets[is_copper] = net[offset + layer_labels[:is_copper.sum()]]
+            self.primitive_nets.append(nets)
+        self.hole_nets = net[holes]
+
+    def net_at(self, point, layer=0):
+        """ Net of the copper under a point of a layer
+
+        Parameters
+        ----------
+        point : tuple
+            (x, y) point, in the layer's units
+
+        layer : int
+            Index of the layer in :attr:`layers`
+
+        Returns
+        -------
+        net : int
+            The net, None if there is no copper under the point
+        """
+        try:
+            index = self._indexes[layer]
+        except KeyError:
+            index = self._indexes[layer] = _spatial_index(self.layers[layer])
+        nets = self.primitive_nets[layer]
+        x, y = point
+        for i in index.window_indices(((x, x), (y, y))):
+            if nets[i] < 0:
+                continue
+            geometry = _Geometry([index.primitives[i]], self.tolerance)
+            if geometry.inside_distance(x, y) >= -_TOUCHING:
+                return int(nets[i])
+        return None
+
+    def primitives(self, net):
+        """ Copper of a net
+
+        Returns
+        -------
+        primitives : list of tuple
+            (layer index, primitive) of each primitive of the net
+        """
+        found = []
+        for layer, nets in enumerate(self.primitive_nets):
+            primitives = self.layers[layer].primitives
+            found.extend((layer, primitives[i])
+                         for i in np.nonzero(nets == net)[0])
+        return found
+
+    def compare(self, netlist):
+        """ Compare the nets with a netlist
+
+        Each test record is looked up on the layers it is accessible from:
+        'top' on the first layer, 'bottom' on the last, 'layerN' on the
+        Nth, and 'both' on every layer until copper is found.
+
+        Parameters
+        ----------
+        netlist : :class:`gerber.ipc356.IPCNetlist`
+            Netlist to compare with
+
+        Returns
+        -------
+        report : :class:`NetReport`
+        """
+        nets = dict((net.name, set()) for net in netlist.nets
+                    if net.name != _NO_CONNECTION)
+        names = {}
+        unconnected = []
+        for record in netlist.test_records:
+            net = self._record_net(record, netlist)
+            if net is None:
+                unconnected.append(record)
+            elif record.net_name and record.net_name != _NO_CONNECTION:
+                nets.setdefault(record.net_name, set()).add(net)
+                names.setdefault(net, set()).add(record.net_name)
+        nets = dict((name, sorted(found)) for name, found in nets.items())
+        opens = dict((name, found) for name, found in nets.items()
+                     if len(found) > 1)
+        shorts = dict((net, sorted(found)) for net, found in names.items()
+                      if len(found) > 1)
+        return NetReport(nets, opens, shorts, unconnected)
+
+    def _record_net(self, record, netlist):
+        access = getattr(record, 'access', 'both')
+        count = len(self.layers)
+        if access == 'top':
+            layers = [0]
+        elif access == 'bottom':
+            layers = [count - 1]
+        elif access.startswith('layer'):
+            layers = [int(access[5:]) - 1]
+        else:
+            layers = range(count)
+        for layer in layers:
+            if not 0 <= layer < count:
+                continue
+            scale = _unit_scale(netlist, self.layers[layer])
+            net = self.net_at((record.x_coord * scale,
+                               record.y_coord * scale), layer)
+            if net is not None:
+                return net
+        return None
+
+
+def _plated_holes(drill_layer):
+    """ Drill hits and slots that may be plated
+    """
+    source = getattr(drill_layer, 'cam_source', None) or drill_layer
+    hits = getattr(source, 'hits', None)
+    if hits is None:
+        return [p for p in drill_layer.primitives
+                if isinstance(p, (Drill, Slot))]
+    holes = []
+    units = source.settings.units
+    for hit in hits:
+        if hit.tool.plated == ExcellonTool.PLATED_NO:
+            continue
+        if isinstance(hit, DrillHit):
+            holes.append(Drill(hit.position, hit.tool.diameter, units=units))
+        elif isinstance(hit, DrillSlot):
+            holes.append(Slot(hit.start, hit.end, hit.tool.diameter,
+                              units=units))
+    return holes
+
+
+def _scaled(hole, scale):
+    if scale == 1.0:
+        return hole
+    if isinstance(hole, Drill):
+        return Drill((hole.position[0] * scale, hole.position[1] * scale),
+                     hole.diameter * scale)
+    return Slot((hole.start[0] * scale, hole.start[1] * scale),
+                (hole.end[0] * scale, hole.end[1] * scale),
+                hole.diameter * scale)
+
+
+def _label_layer(primitives, holes, tolerance):
+    """ Connected copper of one layer
+
+    Returns
+    -------
+    is_copper : numpy.ndarray
+        Whether each primitive is copper
+
+    labels : numpy.ndarray
+        Component of each copper primitive, then of each hole
+    """
+    copper = [_is_copper(p) for p in primitives]
+    shapes = list(compress(primitives, copper)) + holes
+    geometry = _Geometry(shapes, tolerance)
+    first, second, gap, _ = _near_pairs(geometry, tolerance)
+    touching = gap <= _TOUCHING
+    return (np.array(copper, dtype=bool),
+            _connected(geometry, first[touching], second[touching]))
+
+
+def _run_task(index):
+    return _label_layer(*_TASKS[index])
+
+
+def _run(tasks, processes):
+    """ Label the layers, in worker processes where possible
+    """
+    global _TASKS
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(tasks))
+    if processes <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return [_label_layer(*task) for task in tasks]
+    # The workers inherit the layers rather than having them pickled
+    _TASKS = tasks
+    try:
+        pool = multiprocessing.get_context('fork').Pool(processes)
+        try:
+            return pool.map(_run_task, range(len(tasks)), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _TASKS = None
@@ -0,0 +1,667 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.drc
+==========
+**Design rule checks**
+
+This module checks copper layers against minimum copper to copper clearance,
+trace width and annular ring rules.
+
+    >>> violations = check_clearance(top_copper, 0.006)
+    >>> violations += check_annular_ring(top_copper, drills, 0.005)
+
+The copper of a layer is modelled as capsules (segments with a radius: traces,
+round pads and arcs split into chords) and filled polygons (rectangular and
+polygonal pads, regions). Candidate pairs are found by sweep and prune over
+the bounding boxes of these elements, and exact distances are only computed
+for the pairs whose boxes come within the clearance, in NumPy batches.
+
+Only dark copper is checked: clear polarity primitives, and clear parts of
+aperture macros, are ignored.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from .primitives import *
+from .spatial import SpatialIndex
+from .utils import point_segment_distance, segment_distance
+
+Violation = namedtuple('Violation', ['rule', 'primitives', 'value', 'location'])
+Violation.__doc__ = """ A design rule violation
+
+    rule : string
+        'clearance', 'trace_width' or 'annular_ring'
+
+    primitives : tuple
+        The primitives at fault
+
+    value : float
+        The measured clearance, width or ring. None for a drill hit with no
+        copper around it.
+
+    location : tuple
+        (x, y) point of the violation
+"""
+
+# Pairs of elements tested in one NumPy batch
+BATCH_SIZE = 1 << 20
+
+# Copper closer than this is considered touching
+_TOUCHING = 1e-9
+
+
+def check_clearance(layer, clearance, tolerance=None):
+    """ Find copper closer than `clearance` to unconnected copper
+
+    Copper that touches or overlaps is connected, and so is everything
+    connected to it: only gaps between copper that is not connected through
+    the layer are reported.
+
+    Parameters
+    ----------
+    layer : :class:`gerber.layers.PCBLayer` or :class:`gerber.cam.CamFile`
+        Copper layer to check
+
+    clearance : float
+        Minimum clearance, in the layer's units
+
+    tolerance : float, optional
+        Maximum error of the chords arcs are split into. Defaults to a
+        hundredth of the clearance.
+
+    Returns
+    -------
+    violations : list of :class:`Violation`
+        One violation per pair of primitives, at their closest points
+    """
+    if tolerance is None:
+        tolerance = clearance / 100.0
+    primitives = [p for p in layer.primitives if _is_copper(p)]
+    geometry = _Geometry(primitives, tolerance)
+
+    # Closest element pair of each pair of primitives within the clearance
+    pairs = _near_pairs(geometry, clearance)
+    first, second, gap, location = pairs
+
+    touching = gap <= _TOUCHING
+    labels = _connected(geometry, first[touching], second[touching])
+
+    violation = (~touching) & (gap < clearance)
+    violation &= labels[first] != labels[second]
+    return [Violation('clearance', (primitives[a], primitives[b]), float(d),
+                      (float(x), float(y)))
+            for a, b, d, (x, y) in zip(first[violation], second[violation],
+                                       gap[violation], location[violation])]
+
+
+def check_trace_width(layer, width):
+    """ Find traces narrower than `width`
+
+    Traces are the lines and arcs drawn with circular or rectangular
+    apertures. Regions are not traces.
+
+    Returns
+    -------
+    violations : list of :class:`Violation`
+        One violation per trace, at its middle
+    """
+    violations = []
+    for primitive in layer.primitives:
+        if not isinstance(primitive, (Line, Arc)) or not _is_copper(primitive):
+            continue
+        aperture = primitive.aperture
+        if isinstance(aperture, Circle):
+            trace_width = aperture.diameter
+        elif isinstance(aperture, Rectangle):
+            trace_width = min(aperture.width, aperture.height)
+        else:
+            continue
+        if trace_width < width:
+            if isinstance(primitive, Arc):
+                points = _arc_points(primitive, float('inf'))
+                location = points[len(points) // 2]
+            else:
+                location = ((primitive.start[0] + primitive.end[0]) / 2.0,
+                            (primitive.start[1] + primitive.end[1]) / 2.0)
+            violations.append(Violation('trace_width', (primitive,),
+                                        trace_width, location))
+    return violations
+
+
+def check_annular_ring(layer, drill_layer, ring, tolerance=None):
+    """ Find drill hits with less than `ring` of copper around them
+
+    The ring of a hit is the distance from the edge of the hole to the edge
+    of the copper shape around its center that leaves the widest ring. Slots
+    are not checked.
+
+    Parameters
+    ----------
+    layer : :class:`gerber.layers.PCBLayer` or :class:`gerber.cam.CamFile`
+        Copper layer to check
+
+    drill_layer : :class:`gerber.layers.DrillLayer` or :class:`gerber.excellon.ExcellonFile`
+        Drill hits. They are converted to the copper layer's units.
+
+    ring : float
+        Minimum annular ring, in the copper layer's units
+
+    tolerance : float, optional
+        Maximum error of the chords arcs are split into. Defaults to a
+        hundredth of the ring.
+
+    Returns
+    -------
+    violations : list of :class:`Violation`
+        One violation per drill hit. Its primitives are the drill and the
+        copper shape measured, if any.
+    """
+    if tolerance is None:
+        tolerance = ring / 100.0
+    scale = _unit_scale(drill_layer, layer)
+    index = _spatial_index(layer)
+    violations = []
+    parts = {}
+    for drill in drill_layer.primitives:
+        if not isinstance(drill, Drill):
+            continue
+        x, y = drill.position[0] * scale, drill.position[1] * scale
+        radius = drill.radius * scale
+        best = None
+        best_ring = None
+        for i in index.window_indices(((x, x), (y, y))):
+            primitive = index.primitives[i]
+            if not _is_copper(primitive):
+                continue
+            if i not in parts:
+                parts[i] = _Geometry([primitive], tolerance)
+            inside = parts[i].inside_distance(x, y)
+            if inside > 0 and (best_ring is None or inside - radius > best_ring):
+                best, best_ring = primitive, inside - radius
+        if best_ring is None:
+            violations.append(Violation('annular_ring', (drill,), None, (x, y)))
+        elif best_ring < ring:
+            violations.append(Violation('annular_ring', (drill, best),
+                                        best_ring, (x, y)))
+    return violations
+
+
+def check_layer(layer, clearance=None, trace_width=None, annular_ring=None,
+                drill_layer=None):
+    """ Run the checks whose minimums are given
+
+    Returns
+    -------
+    violations : list of :class:`Violation`
+        Clearance, then trace width, then annular ring violations
+    """
+    violations = []
+    if clearance is not None:
+        violations.extend(check_clearance(layer, clearance))
+    if trace_width is not None:
+        violations.extend(check_trace_width(layer, trace_width))
+    if annular_ring is not None:
+        if drill_layer is None:
+            raise ValueError('Checking the annular ring requires a drill layer')
+        violations.extend(check_annular_ring(layer, drill_layer, annular_ring))
+    return violations
+
+
+class _Geometry(object):
+    """ Copper of a list of primitives as capsules and polygon edges
+
+    Attributes
+    ----------
+    segments : numpy.ndarray
+        (n, 4) array of element segments as x0, y0, x1, y1
+
+    radius : numpy.ndarray
+        Radius of each element. Polygon edges have no radius.
+
+    owner : numpy.ndarray
+        Index of the primitive of each element. Elements are sorted by owner.
+
+    edge : numpy.ndarray
+        True for the edges of filled polygons
+    """
+
+    def __init__(self, primitives, tolerance):
+        rows = []
+        counts = []
+        apertures = {}
+        for primitive in primitives:
+            if (isinstance(primitive, Line) and
+                    isinstance(primitive.aperture, Circle)):
+                # Most of the copper is traces, skip the general case
+                (x0, y0), (x1, y1) = primitive.start, primitive.end
+                rows.append((x0, y0, x1, y1,
+                             primitive.aperture.diameter / 2.0, 0))
+                counts.append(1)
+                continue
+            if isinstance(primitive, Flash):
+                # Flashes share the elements of their aperture
+                aperture = primitive.aperture
+                try:
+                    parts = apertures[id(aperture)][0]
+                except KeyError:
+                    parts = _parts(aperture, tolerance)
+                    apertures[id(aperture)] = (parts, aperture)
+                dx, dy = primitive._aperture_offset
+                parts = [(x0 + dx, y0 + dy, x1 + dx, y1 + dy, r, edge)
+                         for x0, y0, x1, y1, r, edge in parts]
+            else:
+                parts = _parts(primitive, tolerance)
+            rows.extend(parts)
+            counts.append(len(parts))
+        table = np.array(rows, dtype=float).reshape(-1, 6)
+        self.segments = table[:, :4]
+        self.radius = table[:, 4]
+        self.edge = table[:, 5] > 0
+        self.count = len(primitives)
+        self.owner = np.repeat(np.arange(self.count),
+                               np.array(counts, dtype=np.intp))
+
+    @property
+    def boxes(self):
+        """ (n, 4) array of element bounding boxes as xmin, xmax, ymin, ymax
+        """
+        s, r = self.segments, self.radius
+        return np.column_stack((np.minimum(s[:, 0], s[:, 2]) - r,
+                                np.maximum(s[:, 0], s[:, 2]) + r,
+                                np.minimum(s[:, 1], s[:, 3]) - r,
+                                np.maximum(s[:, 1], s[:, 3]) + r))
+
+    def primitive_boxes(self):
+        """ (n, 4) array of the bounding boxes of the primitives' copper
+        """
+        boxes = np.empty((self.count, 4))
+        boxes[:, ::2] = np.inf
+        boxes[:, 1::2] = -np.inf
+        elements = self.boxes
+        for column, reduce in enumerate((np.minimum, np.maximum) * 2):
+            reduce.at(boxes[:, column], self.owner, elements[:, column])
+        return boxes
+
+    def elements(self, owner):
+        """ Slice of the elements of a primitive
+        """
+        start, end = np.searchsorted(self.owner, [owner, owner + 1])
+        return slice(start, end)
+
+    def inside_distance(self, x, y, owner=0):
+        """ Distance from a point to the edge of a primitive's copper
+
+        Positive inside the copper, negative outside.
+        """
+        elements = self.elements(owner)
+        segments = self.segments[elements]
+        radius = self.radius[elements]
+        edge = self.edge[elements]
+        points = np.array([[x, y]] * len(segments)).reshape(-1, 2)
+        distance = point_segment_distance(points, segments)[0]
+        best = -np.inf
+        capsules = ~edge
+        if capsules.any():
+            best = np.max(radius[capsules] - distance[capsules])
+        if edge.any():
+            edge_distance = distance[edge].min()
+            if _inside(segments[edge], np.array([[x, y]]))[0]:
+                best = max(best, edge_distance)
+            else:
+                best = max(best, -edge_distance)
+        return best
+
+
+def _is_copper(primitive):
+    return (primitive.level_polarity == 'dark' and
+            not isinstance(primitive, TestRecord))
+
+
+def _parts(primitive, tolerance):
+    """ Elements of a primitive as (x0, y0, x1, y1, radius, edge) tuples
+    """
+    if isinstance(primitive, Line):
+        aperture = primitive.aperture
+        if isinstance(aperture, Circle):
+            return [_segment(primitive.start, primitive.end, aperture.radius)]
+        segments = primitive.segments
+        if segments is not None:
+            return _edges(segments)
+        radius = max(aperture.bounding_box[0][1] - aperture.bounding_box[0][0],
+                     aperture.bounding_box[1][1] - aperture.bounding_box[1][0])
+        return [_segment(primitive.start, primitive.end, radius / 2.0)]
+    elif isinstance(primitive, Arc):
+        aperture = primitive.aperture
+        if isinstance(aperture, Circle):
+            radius = aperture.radius
+        else:
+            radius = max(aperture.width, aperture.height) / 2.0
+        points = _arc_points(primitive, tolerance)
+        return [_segment(start, end, radius)
+                for start, end in zip(points, points[1:])]
+    elif isinstance(primitive, (Region, Outline)):
+        points = [primitive.primitives[0].start]
+        for segment in primitive.primitives:
+            if isinstance(segment, Arc):
+                points.extend(_arc_points(segment, tolerance)[1:])
+            else:
+                points.append(segment.end)
+        return _polygon(points)
+    elif isinstance(primitive, (Circle, Drill)):
+        return [_segment(primitive.position, primitive.position,
+                         primitive.radius)]
+    elif isinstance(primitive, Slot):
+        return [_segment(primitive.start, primitive.end,
+                         primitive.diameter / 2.0)]
+    elif isinstance(primitive, Obround):
+        x, y = primitive.position
+        if primitive.orientation == 'vertical':
+            dx, dy = 0.0, (primitive.height - primitive.width) / 2.0
+            radius = primitive.width / 2.0
+        else:
+            dx, dy = (primitive.width - primitive.height) / 2.0, 0.0
+            radius = primitive.height / 2.0
+        return [(x - dx, y - dy, x + dx, y + dy, radius, 0)]
+    elif isinstance(primitive, AMGroup):
+        parts = []
+        for part in primitive.primitives:
+            if part.level_polarity == 'dark':
+                parts.extend(_parts(part, tolerance))
+        return parts
+    elif isinstance(primitive, Flash):
+        dx, dy = primitive._aperture_offset
+        return [(x0 + dx, y0 + dy, x1 + dx, y1 + dy, r, edge) for
+                x0, y0, x1, y1, r, edge in _parts(primitive.aperture, tolerance)]
+    segments = getattr(primitive, 'segments', None)
+    if segments is not None:
+        return _edges(segments)
+    # Anything else counts as its bounding box
+    (xmin, xmax), (ymin, ymax) = primitive.bounding_box
+    return _polygon([(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)])
+
+
+def _segment(start, end, radius):
+    return (start[0], start[1], end[0], end[1], radius, 0)
+
+
+def _polygon(points):
+    points = [tuple(point) for point in points]
+    if points[0] != points[-1]:
+        points.append(points[0])
+    return [(start[0], start[1], end[0], end[1], 0.0, 1)
+            for start, end in zip(points, points[1:]) if start != end]
+
+
+def _edges(segments):
+    return [(x0, y0, x1, y1, 0.0, 1) for (x0, y0), (x1, y1) in segments.tolist()
+            if (x0, y0) != (x1, y1)]
+
+
+def _arc_points(arc, tolerance):
+    """ Points along an arc, at most `tolerance` from it
+    """
+    two_pi = 2 * math.pi
+    if arc.direction == 'counterclockwise':
+        sweep = (arc.end_angle - arc.start_angle) % two_pi
+    else:
+        sweep = -((arc.start_angle - arc.end_angle) % two_pi)
+    if sweep == 0 and arc.quadrant_mode != 'single-quadrant':
+        sweep = two_pi if arc.direction == 'counterclockwise' else -two_pi
+    radius = arc.radius
+    if radius > tolerance:
+        step = 2 * math.acos(1 - tolerance / radius)
+        count = max(int(math.ceil(abs(sweep) / step)), 2)
+    else:
+        count = 2
+    cx, cy = arc.center
+    start = arc.start_angle
+    return ([tuple(arc.start)] +
+            [(cx + radius * math.cos(start + sweep * i / count),
+              cy + radius * math.sin(start + sweep * i / count))
+             for i in range(1, count)] + [tuple(arc.end)])
+
+
+def _near_pairs(geometry, clearance):
+    """ Closest elements of each pair of primitives within the clearance
+
+    Returns
+    -------
+    pairs : tuple
+        (first, second, gap, location): indices of the primitives, with
+        first < second, the gap between their copper (0 where they touch)
+        and the (n, 2) midpoints of the gaps.
+    """
+    boxes = geometry.boxes
+    boxes[:, ::2] -= clearance / 2.0
+    boxes[:, 1::2] += clearance / 2.0
+    owner = geometry.owner
+    found = []
+    for a, b in _sweep(boxes):
+        keep = owner[a] != owner[b]
+        a, b = a[keep], b[keep]
+        distance, point_a, point_b = segment_distance(geometry.segments[a],
+                                                      geometry.segments[b])
+        radius_a = geometry.radius[a]
+        gap = np.maximum(distance - radius_a - geometry.radius[b], 0.0)
+        near = gap < clearance
+        # Middle of the gap between the edges of the copper
+        with np.errstate(invalid='ignore', divide='ignore'):
+            along = np.where(distance > 0,
+                             (radius_a + gap / 2.0) / distance, 0.0)
+        location = point_a + (point_b - point_a) * along[:, None]
+        found.append((owner[a][near], owner[b][near], gap[near],
+                      location[near]))
+    if not sum(len(batch[0]) for batch in found):
+        return (np.zeros(0, np.intp), np.zeros(0, np.intp), np.zeros(0),
+                np.zeros((0, 2)))
+    first, second, gap, location = (np.concatenate(column)
+                                    for column in zip(*found))
+    first, second = np.minimum(first, second), np.maximum(first, second)
+
+    # Keep the closest pair of elements of each pair of primitives
+    key = first * geometry.count + second
+    order = np.lexsort((gap, key))
+    key = key[order]
+    closest = order[np.concatenate(([True], key[1:] != key[:-1]))]
+    return first[closest], second[closest], gap[closest], location[closest]
+
+
+def _sweep(boxes):
+    """ Generate batches of pairs of overlapping boxes
+
+    Sweep and prune along x, in horizontal strips about as high as the
+    boxes, so that the boxes only meet the few others in their strip over
+    the sweep. Each pair is reported in the strip its overlap starts in.
+
+    Parameters
+    ----------
+    boxes : numpy.ndarray
+        (n, 4) array of boxes as xmin, xmax, ymin, ymax
+
+    Yields
+    ------
+    pairs : tuple
+        (a, b) arrays of the indices of overlapping boxes
+    """
+    count = len(boxes)
+    if count < 2:
+        return
+    xmin, xmax, ymin, ymax = boxes.T
+    x0, y0 = xmin.min(), ymin.min()
+    height = max(np.median(np.maximum(xmax - xmin, ymax - ymin)), 1e-9)
+    strips = max(min(int((ymax.max() - y0) / height) + 1, count), 1)
+    height = max((ymax.max() - y0) / strips, 1e-9)
+    strip0 = np.minimum(((ymin - y0) // height).astype(np.intp), strips - 1)
+    strip1 = np.minimum(((ymax - y0) // height).astype(np.intp), strips - 1)
+
+    # List each box in each of its strips, sorted by strip then xmin
+    spans = strip1 - strip0 + 1
+    index = np.repeat(np.arange(count), spans)
+    starts = np.cumsum(spans) - spans
+    strip = strip0[index] + np.arange(len(index)) - np.repeat(starts, spans)
+    order = np.lexsort((xmin[index], strip))
+    index, strip = index[order], strip[order]
+
+    # Boxes after each one in its strip that start before it ends
+    stride = xmax.max() - x0 + 1.0
+    key = strip * stride + (xmin[index] - x0)
+    end = np.searchsorted(key, strip * stride + (xmax[index] - x0), 'right')
+    counts = end - np.arange(len(index)) - 1
+
+    total = np.cumsum(counts)
+    position = 0
+    while position < len(index):
+        done = total[position - 1] if position else 0
+        stop = max(np.searchsorted(total, done + BATCH_SIZE, 'right'),
+                   position + 1)
+        batch = np.arange(position, stop)
+        batch_counts = counts[batch]
+        a = np.repeat(batch, batch_counts)
+        batch_starts = np.cumsum(batch_counts) - batch_counts
+        b = a + 1 + np.arange(len(a)) - np.repeat(batch_starts, batch_counts)
+        position = stop
+        if not len(a):
+            continue
+        first, second = index[a], index[b]
+        keep = ((ymin[first] <= ymax[second]) & (ymin[second] <= ymax[first]) &
+                (strip[a] == np.maximum(strip0[first], strip0[second])))
+        yield first[keep], second[keep]
+
+
+def _inside(edges, points):
+    """ Whether points are inside a polygon, by the even-odd rule
+    """
+    inside = np.zeros(len(points), dtype=bool)
+    chunk = max(BATCH_SIZE // max(len(edges), 1), 1)
+    x0, y0, x1, y1 = edges.T
+    for start in range(0, len(points), chunk):
+        px = points[start:start + chunk, 0:1]
+        py = points[start:start + chunk, 1:2]
+        straddle = (y0 > py) != (y1 > py)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        crossings = (straddle & (px < x)).sum(axis=1)
+        inside[start:start + chunk] = crossings % 2 == 1
+    return inside
+
+
+def _contained(geometry, labels):
+    """ Pairs of primitives where one lies inside a polygon of the other
+    without touching its edges
+
+    Returns
+    -------
+    pairs : tuple
+        (polygons, contents) arrays of primitive indices
+    """
+    polygons = np.unique(geometry.owner[geometry.edge])
+    if not len(polygons):
+        return np.zeros(0, np.intp), np.zeros(0, np.intp)
+    boxes = geometry.primitive_boxes()
+    has_parts = np.bincount(geometry.owner, minlength=geometry.count) > 0
+    index = SpatialIndex(np.nonzero(has_parts)[0], boxes[has_parts])
+    firsts = np.searchsorted(geometry.owner, np.arange(geometry.count))
+    found_polygons, found_contents = [], []
+    for polygon in polygons:
+        (xmin, xmax, ymin, ymax) = boxes[polygon]
+        contents = index.primitives[index.window_indices(((xmin, xmax),
+                                                          (ymin, ymax)))]
+        contents = contents[labels[contents] != labels[polygon]]
+        if not len(contents):
+            continue
+        elements = geometry.elements(polygon)
+        edges = geometry.segments[elements][geometry.edge[elements]]
+        inside = _inside(edges, geometry.segments[firsts[contents], :2])
+        found_polygons.append(np.full(inside.sum(), polygon, dtype=np.intp))
+        found_contents.append(contents[inside])
+    if not found_polygons:
+        return np.zeros(0, np.intp), np.zeros(0, np.intp)
+    return np.concatenate(found_polygons), np.concatenate(found_contents)
+
+
+def _connected(geometry, first, second):
+    """ Label the connected copper of a geometry
+
+    Copper that touches is connected, and so is copper inside a polygon
+    without touching its edges.
+
+    Parameters
+    ----------
+    first, second : numpy.ndarray
+        Indices of the pairs of primitives that touch
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        Component of each primitive, see :func:`_components`
+    """
+    labels = _components(geometry.count, first, second)
+    inside = _contained(geometry, labels)
+    if not len(inside[0]):
+        return labels
+    return _components(geometry.count, np.concatenate((first, inside[0])),
+                       np.concatenate((second, inside[1])))
+
+
+def _components(count, first, second):
+    """ Label connected components of a graph
+
+    Parameters
+    ----------
+    count : int
+        Number of nodes
+
+    first, second : numpy.ndarray
+        Node indices of the edges
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        The smallest node index of the component of each node
+    """
+    labels = np.arange(count)
+    while True:
+        a, b = labels[first], labels[second]
+        joined = a != b
+        if not joined.any():
+            return labels
+        # Hook the larger root onto the smaller one, then flatten the trees
+        np.minimum.at(labels, np.maximum(a, b)[joined],
+                      np.minimum(a, b)[joined])
+        while True:
+            flat = labels[labels]
+            if (flat == labels).all():
+                break
+            labels = flat
+
+
+def _spatial_index(layer):
+    index = getattr(layer, 'spatial_index', None)
+    return index if index is not None else SpatialIndex(layer.primitives)
+
+
+def _unit_scale(source, target):
+    """ Factor converting the coordinates of `source` to the units of `target`
+    """
+    def units(layer):
+        return getattr(getattr(layer, 'cam_source', layer), 'units', None)
+    source_units, target_units = units(source), units(target)
+    if source_units == target_units or None in (source_units, target_units):
+        return 1.0
+    return 25.4 if target_units == 'metric' else 1 / 25.4
@@ -30,7 +30,8 @@ from .cam import CamFile, FileSettings
 from .excellon_statements import *
 from .excellon_tool import ExcellonToolDefinitionParser
 from .primitives import Drill, Slot
-from .utils import inch, metric
+from .reader import read_text
+from .utils import inch, metric, instance_attributes, parse_gerber_values
 
 
 try:
@@ -54,8 +55,7 @@ def read(filename):
 
     """
     # File object should use settings from source file by default.
-    with open(filename, 'rU') as f:
-        data = f.read()
+    data = read_text(filename)
     settings = FileSettings(**detect_excellon_format(data))
     return ExcellonParser(settings).parse(filename)
 
@@ -95,6 +95,9 @@ class DrillHit(object):
         Center position of the drill.
 
     """
+
+    __slots__ = ('tool', 'position')
+
     def __init__(self, tool, position):
         self.tool = tool
         self.position = position
@@ -123,6 +126,13 @@ class DrillHit(object):
     def offset(self, x_offset=0, y_offset=0):
         self.position = tuple(map(operator.add, self.position, (x_offset, y_offset)))
 
+    def __getstate__(self):
+        return dict(instance_attributes(self))
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __str__(self):
         return 'Hit (%f, %f) {%s}' % (self.position[0], self.position[1], self.tool)
 
@@ -134,6 +144,8 @@ class DrillSlot(object):
     TYPE_ROUT = 1
     TYPE_G85 = 2
 
+    __slots__ = ('tool', 'start', 'end', 'slot_type')
+
     def __init__(self, tool, start, end, slot_type):
         self.tool = tool
         self.start = start
@@ -167,6 +179,13 @@ class DrillSlot(object):
         self.start = tuple(map(operator.add, self.start, (x_offset, y_offset)))
         self.end = tuple(map(operator.add, self.end, (x_offset, y_offset)))
 
+    def __getstate__(self):
+        return dict(instance_attributes(self))
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
 
 class ExcellonFile(CamFile):
     """ A class representing a single excellon file
@@ -207,7 +226,8 @@ class ExcellonFile(CamFile):
     @property
     def primitives(self):
         """
-        Gets the primitives. Note that unlike Gerber, this generates new objects
+        Gets the primitives. Note that unlike Gerber, this generates new objects,
+        and the spatial index holds its own set of them
         """
         primitives = []
         for hit in self.hits:
@@ -293,6 +313,7 @@ class ExcellonFile(CamFile):
             #for hit in self.hits:
             #    hit.to_inch()
             self.units = 'inch'
+            self.invalidate_spatial_index()
 
     def to_metric(self):
         """  Convert units to metric
@@ -309,6 +330,7 @@ class ExcellonFile(CamFile):
             for hit in self.hits:
                 hit.to_metric()
             self.units = 'metric'
+            self.invalidate_spatial_index()
 
     def offset(self, x_offset=0, y_offset=0):
         for statement in self.statements:
@@ -317,6 +339,7 @@ class ExcellonFile(CamFile):
             primitive.offset(x_offset, y_offset)
         for hit in self. hits:
             hit.offset(x_offset, y_offset)
+        self.invalidate_spatial_index()
 
     def path_length(self, tool_number=None):
         """ Return the path length for a given tool
@@ -377,6 +400,12 @@ class ExcellonParser(object):
     settings : FileSettings or dict-like
         Excellon file settings to use when interpreting the excellon file.
     """
+    # Number of converted coordinate values kept for reuse
+    COORDINATE_CACHE_SIZE = 1 << 16
+
+    # Maximum number of lines whose coordinates are converted together
+    COORDINATE_BATCH_SIZE = 1 << 10
+
     def __init__(self, settings=None, ext_tools=None):
         self.notation = 'absolute'
         self.units = 'inch'
@@ -392,6 +421,10 @@ class ExcellonParser(object):
         self.pos = [0., 0.]
         self.drill_down = False
         self._previous_line = ''
+        # Converted coordinate values, valid for _coordinate_format. Missing
+        # coordinates are None.
+        self._coordinates = {None: None}
+        self._coordinate_format = None
         # Default for plated is None, which means we don't know
         self.plated = ExcellonTool.PLATED_UNKNOWN
         if settings is not None:
@@ -426,18 +459,65 @@ class ExcellonParser(object):
         return len(self.hits)
 
     def parse(self, filename):
-        with open(filename, 'rU') as f:
-            data = f.read()
+        data = read_text(filename)
         return self.parse_raw(data, filename)
 
     def parse_raw(self, data, filename=None):
-        for line in StringIO(data):
-            self._parse_line(line.strip())
+        for line in self._convert_ahead(StringIO(data)):
+            self._parse_line(line)
         for stmt in self.statements:
             stmt.units = self.units
         return ExcellonFile(self.statements, self.tools, self.hits,
                             self._settings(), filename)
 
+    def _convert_ahead(self, lines):
+        """ Convert the coordinates of upcoming lines in batches
+
+        Lines are stripped and buffered up to the next line that isn't a
+        plain coordinate line, which may change the coordinate format, or
+        COORDINATE_BATCH_SIZE lines. Coordinate values in the buffer that
+        haven't been converted yet are converted with a single
+        parse_gerber_values() call before the lines are passed on.
+        """
+        block = []
+        for line in lines:
+            line = line.strip()
+            block.append(line)
+            if (not line or line[0] not in 'XY'
+                    or len(block) >= self.COORDINATE_BATCH_SIZE):
+                self._convert_coordinates(block)
+                for line in block:
+                    yield line
+                block = []
+        self._convert_coordinates(block)
+        for line in block:
+            yield line
+
+    def _convert_coordinates(self, block):
+        settings = self._settings()
+        fmt = (settings.format, settings.zero_suppression)
+        if fmt != self._coordinate_format:
+            self._coordinates = {None: None}
+            self._coordinate_format = fmt
+        coordinates = self._coordinates
+        values = set()
+        for line in block:
+            if line and line[0] in 'XY' and 'G85' not in line:
+                values.update(CoordinateStmt.split_excellon(line))
+        values = [value for value in values if value not in coordinates]
+        if not values:
+            return
+        if len(coordinates) + len(values) > self.COORDINATE_CACHE_SIZE:
+            coordinates.clear()
+            coordinates[None] = None
+        try:
+            converted = parse_gerber_values(values, settings.format,
+                                            settings.zero_suppression)
+        except ValueError:
+            # Left to the line's own conversion, which reports the error
+            return
+        coordinates.update(zip(values, converted.tolist()))
+
     def _parse_line(self, line):
         # skip empty lines
         # Prepend previous line's data...
@@ -709,7 +789,9 @@ class ExcellonParser(object):
                     self.hits.append(DrillSlot(self.active_tool, (stmt.x_start, stmt.y_start), (stmt.x_end, stmt.y_end), DrillSlot.TYPE_G85))
                     self.active_tool._hit()
             else:
-                stmt = CoordinateStmt.from_excellon(line, self._settings())
+                # Values were converted by _convert_ahead()
+                stmt = CoordinateStmt.from_excellon(line, self._settings(),
+                                                    self._coordinates)
 
                 # We need this in case we are in rout mode
                 start = (self.pos[0], self.pos[1])
@@ -818,8 +900,7 @@ def detect_excellon_format(data=None, filename=None):
     if data is None and filename is None:
         raise ValueError('Either data or filename arguments must be provided')
     if data is None:
-        with open(filename, 'rU') as f:
-            data = f.read()
+        data = read_text(filename)
 
     # Check for obvious clues:
     p = ExcellonParser()
@@ -24,7 +24,7 @@ Excellon Statements
 import re
 import uuid
 from .utils import (parse_gerber_value, write_gerber_value, decimal_string,
-                    inch, metric)
+                    inch, metric, instance_attributes)
 
 
 __all__ = ['ExcellonTool', 'ToolSelectionStmt', 'CoordinateStmt',
@@ -44,6 +44,11 @@ class ExcellonStatement(object):
     """ Excellon Statement abstract base class
     """
 
+    # Coordinate statements make up most of a file, so they and this base
+    # class use __slots__. The base class keeps a __dict__, which is only
+    # allocated for instances given attributes outside the slots.
+    __slots__ = ('units', 'id', '__dict__')
+
     @classmethod
     def from_excellon(cls, line):
         raise NotImplementedError('from_excellon must be implemented in a '
@@ -67,7 +72,15 @@ class ExcellonStatement(object):
         pass
 
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return (dict(instance_attributes(self)) ==
+                dict(instance_attributes(other)))
+
+    def __getstate__(self):
+        return dict(instance_attributes(self))
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
 
 
 class ExcellonTool(ExcellonStatement):
@@ -367,6 +380,8 @@ class ZAxisInfeedRateStmt(ExcellonStatement):
 
 class CoordinateStmt(ExcellonStatement):
 
+    __slots__ = ('x', 'y', 'mode')
+
     @classmethod
     def from_point(cls, point, mode=None):
 
@@ -376,23 +391,35 @@ class CoordinateStmt(ExcellonStatement):
         return stmt
 
     @classmethod
-    def from_excellon(cls, line, settings, **kwargs):
-        x_coord = None
-        y_coord = None
-        if line[0] == 'X':
-            splitline = line.strip('X').split('Y')
-            x_coord = parse_gerber_value(splitline[0], settings.format,
-                                         settings.zero_suppression)
-            if len(splitline) == 2:
-                y_coord = parse_gerber_value(splitline[1], settings.format,
-                                             settings.zero_suppression)
-        else:
-            y_coord = parse_gerber_value(line.strip(' Y'), settings.format,
-                                         settings.zero_suppression)
-        c = cls(x_coord, y_coord, **kwargs)
+    def from_excellon(cls, line, settings, values=None, **kwargs):
+        """ Create a coordinate statement from an excellon line
+
+        `values` optionally maps coordinate strings to their values, as
+        converted ahead of time by the parser.
+        """
+        coords = []
+        for value in cls.split_excellon(line):
+            if value is not None:
+                try:
+                    value = values[value]
+                except (KeyError, TypeError):
+                    value = parse_gerber_value(value, settings.format,
+                                               settings.zero_suppression)
+            coords.append(value)
+        c = cls(coords[0], coords[1], **kwargs)
         c.units = settings.units
         return c
 
+    @staticmethod
+    def split_excellon(line):
+        """ The X and Y coordinate strings of an excellon line, or None
+        """
+        if line[0] == 'X':
+            splitline = line.strip('X').split('Y')
+            return (splitline[0],
+                    splitline[1] if len(splitline) == 2 else None)
+        return (None, line.strip(' Y'))
+
     def __init__(self, x=None, y=None, **kwargs):
         super(CoordinateStmt, self).__init__(**kwargs)
         self.x = x
@@ -975,4 +1002,8 @@ def pairwise(iterator):
     """
     itr = iter(iterator)
     while True:
-        yield tuple([next(itr) for i in range(2)])
+        try:
+            yield tuple([next(itr) for i in range(2)])
+        except StopIteration:
+            # Generators may not raise StopIteration (PEP 479)
+            return
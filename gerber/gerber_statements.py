@@ -21,7 +21,7 @@ Gerber (RS-274X) Statements
 
 """
 from .utils import (parse_gerber_value, write_gerber_value, decimal_string,
-                    inch, metric)
+                    inch, metric, instance_attributes)
 
 from .am_statements import *
 from .am_read import read_macro
@@ -45,6 +45,11 @@ class Statement(object):
         String identifying the statement type.
     """
 
+    # Coordinate and aperture statements make up most of a file, so they and
+    # this base class use __slots__. The base class keeps a __dict__, which
+    # is only allocated for instances given attributes outside the slots.
+    __slots__ = ('type', 'units', '__dict__')
+
     def __init__(self, stype, units='inch'):
         self.type = stype
         self.units = units
@@ -52,7 +57,7 @@ class Statement(object):
     def __str__(self):
         s = "<{0} ".format(self.__class__.__name__)
 
-        for key, value in self.__dict__.items():
+        for key, value in instance_attributes(self):
             s += "{0}={1} ".format(key, value)
 
         s = s.rstrip() + ">"
@@ -68,7 +73,15 @@ class Statement(object):
         pass
 
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return (dict(instance_attributes(self)) ==
+                dict(instance_attributes(other)))
+
+    def __getstate__(self):
+        return dict(instance_attributes(self))
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
 
 
 class ParamStmt(Statement):
@@ -891,6 +904,8 @@ class CoordStmt(Statement):
     FUNC_ARC_CW = 'G02'
     FUNC_ARC_CCW = 'G03'
 
+    __slots__ = ('function', 'x', 'y', 'i', 'j', 'op')
+
     @classmethod
     def from_dict(cls, stmt_dict, settings):
         function = stmt_dict['function']
@@ -1078,6 +1093,8 @@ class ApertureStmt(Statement):
     """ Aperture Statement
     """
 
+    __slots__ = ('d', 'deprecated')
+
     def __init__(self, d, deprecated=None):
         Statement.__init__(self, "APERTURE")
         self.d = int(d)
@@ -20,6 +20,7 @@ import math
 import re
 from .cam import CamFile, FileSettings
 from .primitives import TestRecord
+from .reader import read_text
 
 # Net Name Variables
 _NNAME = re.compile(r'^NNAME\d+$')
@@ -163,8 +164,7 @@ class IPCNetlistParser(object):
         return FileSettings(units=self.units, angle_units=self.angle_units)
 
     def parse(self, filename):
-        with open(filename, 'rU') as f:
-            data = f.read()
+        data = read_text(filename)
         return self.parse_raw(data, filename)
 
     def parse_raw(self, data, filename=None):
@@ -21,7 +21,11 @@ from collections import namedtuple
 
 from . import common
 from .excellon import ExcellonFile
+from .exceptions import ParseError
 from .ipc356 import IPCNetlist
+from .reader import read_head
+from .spatial import SpatialIndex
+from .utils import detect_file_format
 
 
 Hint = namedtuple('Hint', 'layer ext name regex content')
@@ -138,14 +142,17 @@ def guess_layer_class(filename):
 
 
 def guess_layer_class_by_content(filename):
+    content_hints = [hint for hint in hints if len(hint.content) > 0]
+    # Don't read the file if there is nothing to look for
+    if not content_hints:
+        return False
     try:
         file = open(filename, 'r')
         for line in file:
-            for hint in hints:
-                if len(hint.content) > 0:
-                    patterns = [r'^(.*){}(.*)$'.format(x) for x in hint.content]
-                    if any(re.findall(p, line, re.IGNORECASE) for p in patterns):
-                        return hint.layer
+            for hint in content_hints:
+                patterns = [r'^(.*){}(.*)$'.format(x) for x in hint.content]
+                if any(re.findall(p, line, re.IGNORECASE) for p in patterns):
+                    return hint.layer
     except:
         pass
 
@@ -190,6 +197,10 @@ class PCBLayer(object):
     source : CAMFile
         CAMFile representing the layer
 
+    loader : callable, optional
+        Function returning the CAMFile, called the first time the layer's
+        cam_source is needed. Used instead of passing cam_source.
+
 
     Attributes
     ----------
@@ -209,13 +220,91 @@ class PCBLayer(object):
             layer_class = 'ipc_netlist'
         return cls(filename, layer_class, camfile)
 
-    def __init__(self, filename=None, layer_class=None, cam_source=None, **kwargs):
+    @classmethod
+    def from_file(cls, filename, cache=None):
+        """ Create a layer that parses filename the first time it is used
+
+        Only the start of the file is read to check its format; the layer
+        class is guessed as for :meth:`from_cam`. Errors in the rest of the
+        file are raised when the layer is first used.
+        """
+        fmt = detect_file_format(read_head(filename))
+        if fmt == 'unknown':
+            raise ParseError('Unable to detect file format')
+
+        def loader():
+            return common.read(filename, cache=cache)
+
+        layer_class = guess_layer_class(filename)
+        if fmt == 'excellon' or (layer_class == 'drill'):
+            return DrillLayer(filename, loader=loader)
+        elif layer_class == 'internal':
+            return InternalLayer(filename, order=_internal_order(filename),
+                                 loader=loader)
+        if fmt == 'ipc_d_356':
+            layer_class = 'ipc_netlist'
+        return cls(filename, layer_class, loader=loader)
+
+    def __init__(self, filename=None, layer_class=None, cam_source=None,
+                 loader=None, **kwargs):
         super(PCBLayer, self).__init__(**kwargs)
         self.filename = filename
         self.layer_class = layer_class
-        self.cam_source = cam_source
+        self._cam_source = cam_source
+        self._loader = loader if cam_source is None else None
+        self._primitives = None
+        self._spatial_index = None
         self.surface = None
-        self.primitives = cam_source.primitives if cam_source is not None else []
+
+    @property
+    def cam_source(self):
+        if self._loader is not None:
+            self._cam_source = self._loader()
+            self._loader = None
+        return self._cam_source
+
+    @cam_source.setter
+    def cam_source(self, cam_source):
+        self._cam_source = cam_source
+        self._loader = None
+
+    @property
+    def loaded(self):
+        """ True if the layer's source file has been parsed
+        """
+        return self._loader is None
+
+    @property
+    def primitives(self):
+        if self._primitives is None:
+            cam_source = self.cam_source
+            self._primitives = (cam_source.primitives
+                                if cam_source is not None else [])
+        return self._primitives
+
+    @primitives.setter
+    def primitives(self, primitives):
+        self._primitives = primitives
+        self._spatial_index = None
+
+    @property
+    def spatial_index(self):
+        """ Spatial index of the layer's primitives
+
+        Layers that share their source file's list of primitives share its
+        index too, which is rebuilt when the file is offset or converted.
+        Otherwise (drill files generate new primitives on each access, or the
+        primitives may have been replaced) the layer indexes its own list.
+        """
+        primitives = self.primitives
+        cam_source = self.cam_source
+        if (cam_source is not None and
+                primitives is vars(cam_source).get('primitives')):
+            return cam_source.spatial_index
+        if (self._spatial_index is None or
+                self._spatial_index.primitives is not primitives):
+            self._spatial_index = SpatialIndex(primitives)
+        return self._spatial_index
 
     @property
     def bounds(self):
@@ -224,6 +313,12 @@ class PCBLayer(object):
         else:
             return None
 
+    def preload(self):
+        """ Parse the layer's source file now rather than on first use
+        """
+        self.cam_source
+        return self
+
     def __repr__(self):
         return '<PCBLayer: {}>'.format(self.layer_class)
 
@@ -243,11 +338,7 @@ class InternalLayer(PCBLayer):
     @classmethod
     def from_cam(cls, camfile):
         filename = camfile.filename
-        try:
-            order = int(re.search(r'\d+', filename).group())
-        except AttributeError:
-            order = 0
-        return cls(filename, camfile, order)
+        return cls(filename, camfile, _internal_order(filename))
 
     def __init__(self, filename=None, cam_source=None, order=0, **kwargs):
         super(InternalLayer, self).__init__(filename, 'internal', cam_source, **kwargs)
@@ -282,3 +373,10 @@ class InternalLayer(PCBLayer):
         if not hasattr(other, 'order'):
             raise TypeError()
         return (self.order <= other.order)
+
+
+def _internal_order(filename):
+    try:
+        return int(re.search(r'\d+', filename).group())
+    except AttributeError:
+        return 0
@@ -20,7 +20,7 @@ CAM File Operations
 **Transformations and other operations performed on Gerber and Excellon files**
 
 """
-import copy
+from .transform import copy_file, rotation, scaling, transform, translation
 
 
 def to_inch(cam_file):
@@ -34,9 +34,9 @@ def to_inch(cam_file):
     Returns
     -------
     cam_file : :class:`gerber.cam.CamFile` subclass
-        A deep copy of the source file with units converted to imperial.
+        A copy of the source file with units converted to imperial.
     """
-    cam_file = copy.deepcopy(cam_file)
+    cam_file = copy_file(cam_file)
     cam_file.to_inch()
     return cam_file
 
@@ -52,9 +52,9 @@ def to_metric(cam_file):
     Returns
     -------
     cam_file : :class:`gerber.cam.CamFile` subclass
-        A deep copy of the source file with units converted to metric.
+        A copy of the source file with units converted to metric.
     """
-    cam_file = copy.deepcopy(cam_file)
+    cam_file = copy_file(cam_file)
     cam_file.to_metric()
     return cam_file
 
@@ -76,11 +76,9 @@ def offset(cam_file, x_offset, y_offset):
     Returns
     -------
     cam_file : :class:`gerber.cam.CamFile` subclass
-        An offset deep copy of the source file.
+        An offset copy of the source file.
     """
-    cam_file = copy.deepcopy(cam_file)
-    cam_file.offset(x_offset, y_offset)
-    return cam_file
+    return transform(cam_file, translation(x_offset, y_offset))
 
 
 def scale(cam_file, x_scale, y_scale):
@@ -100,10 +98,9 @@ def scale(cam_file, x_scale, y_scale):
     Returns
     -------
     cam_file : :class:`gerber.cam.CamFile` subclass
-        An scaled deep copy of the source file.
+        A scaled copy of the source file.
     """
-    # TODO
-    pass
+    return transform(cam_file, scaling(x_scale, y_scale))
 
 
 def rotate(cam_file, angle):
@@ -120,7 +117,6 @@ def rotate(cam_file, angle):
     Returns
     -------
     cam_file : :class:`gerber.cam.CamFile` subclass
-        An rotated deep copy of the source file.
+        A rotated copy of the source file.
     """
-    # TODO
-    pass
+    return transform(cam_file, rotation(angle))
@@ -16,6 +16,7 @@
 # limitations under the License.
 
 
+import multiprocessing
 import os
 from .exceptions import ParseError
 from .layers import PCBLayer, sort_layers
@@ -26,7 +27,34 @@ from .utils import listdir
 class PCB(object):
 
     @classmethod
-    def from_directory(cls, directory, board_name=None, verbose=False):
+    def from_directory(cls, directory, board_name=None, verbose=False,
+                       cache=None, workers=None, lazy=False):
+        """ Load every CAM file in a directory
+
+        Parameters
+        ----------
+        directory : string
+            Directory containing the board's CAM files.
+
+        board_name : string, optional
+            Name of the board. Guessed from the filenames by default.
+
+        verbose : bool, optional
+            Print the files that were added and skipped.
+
+        cache : :class:`gerber.cache.ParseCache`, optional
+            Cache of parsed files to read through.
+
+        workers : int, optional
+            Number of processes to parse the files in. By default the files
+            are parsed one after another in this process. Files that cannot
+            be parsed are skipped either way, and the layers are the same.
+
+        lazy : bool, optional
+            Only check the format of each file, and parse a layer's file the
+            first time its primitives or bounds are used (see
+            :meth:`PCBLayer.from_file`). `workers` is not used in this mode.
+        """
         layers = []
         names = set()
 
@@ -35,11 +63,24 @@ class PCB(object):
         if not os.path.isdir(directory):
             raise TypeError('{} is not a directory.'.format(directory))
 
+        filenames = listdir(directory, True, True)
+        paths = [os.path.join(directory, filename) for filename in filenames]
+        if lazy:
+            sources = paths
+        elif workers is not None and workers > 1:
+            sources = _read_parallel(paths, cache, workers)
+        else:
+            sources = (_read_cam(path, cache) for path in paths)
+
         # Load gerber files
-        for filename in listdir(directory, True, True):
+        for filename, source in zip(filenames, sources):
             try:
-                camfile = gerber_read(os.path.join(directory, filename))
-                layer = PCBLayer.from_cam(camfile)
+                if lazy:
+                    layer = PCBLayer.from_file(source, cache=cache)
+                elif isinstance(source, Exception):
+                    raise source
+                else:
+                    layer = PCBLayer.from_cam(source)
                 layers.append(layer)
                 names.add(os.path.splitext(filename)[0])
                 if verbose:
@@ -68,6 +109,13 @@ class PCB(object):
     def __len__(self):
         return len(self.layers)
 
+    def preload(self):
+        """ Parse every layer that has not been parsed yet
+        """
+        for layer in self.layers:
+            layer.preload()
+        return self
+
     @property
     def top_layers(self):
         board_layers = [l for l in reversed(self.layers) if l.layer_class in
@@ -109,3 +157,44 @@ class PCB(object):
         for layer in self.layers:
             if layer.layer_class == 'top':
                 return layer.bounds
+
+
+def _read_cam(path, cache=None):
+    """ Read a CAM file, returning the ParseError or IOError if it can't be
+    read so the caller can decide to skip it.
+    """
+    try:
+        return gerber_read(path, cache=cache)
+    except (ParseError, IOError) as e:
+        return e
+
+
+def _read_cam_star(args):
+    return _read_cam(*args)
+
+
+def _read_parallel(paths, cache, workers):
+    """ Read CAM files in a pool of worker processes
+
+    The largest files are started first so the pool finishes as early as
+    possible. The results are returned in the order of paths.
+    """
+    order = sorted(range(len(paths)), key=lambda i: -_file_size(paths[i]))
+    pool = multiprocessing.Pool(min(workers, max(len(paths), 1)))
+    try:
+        results = pool.map(_read_cam_star, [(paths[i], cache) for i in order],
+                           chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    camfiles = [None] * len(paths)
+    for i, camfile in zip(order, results):
+        camfiles[i] = camfile
+    return camfiles
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
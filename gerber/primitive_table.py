@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.primitive_table
+======================
+**Array-backed storage for layer primitives**
+
+This module provides :class:`PrimitiveTable`, which stores the lines, arcs
+and flashes of a layer as NumPy columns instead of one Python object per
+primitive.
+
+    >>> table = PrimitiveTable.from_primitives(gerber_file.primitives,
+    ...                                        gerber_file.units)
+    >>> table.bounding_box
+    >>> table.to_metric()
+    >>> table.render(ctx)
+"""
+
+import copy
+
+import numpy as np
+
+from .primitives import Arc, Circle, Flash, Line
+from .utils import MILLIMETERS_PER_INCH
+
+LINE, ARC, FLASH, OTHER = range(4)
+
+
+class PrimitiveTable(object):
+    """ Struct-of-arrays store of a layer's primitives
+
+    Lines, arcs and flashes are stored by kind in NumPy columns. Apertures
+    are stored once in `apertures` and referenced by index, and level
+    polarity is stored as a boolean `dark` column. Primitives of other types
+    (regions, macros, drills, ...) and primitives with a net name are kept
+    as objects in `others`.
+
+    Primitive objects are only created when the table is iterated or
+    indexed, and they are new objects each time: changing them does not
+    change the table. Bounds, unit conversion and offsets work on the
+    columns directly.
+
+    The table holds copies of the apertures and of the primitives in
+    `others`, so converting or offsetting it leaves the source primitives
+    unchanged.
+
+    Parameters
+    ----------
+    units : string
+        Units of all the primitives in the table. 'inch' or 'metric'
+
+    Attributes
+    ----------
+    kind : numpy.ndarray of int8
+        Kind of each primitive in drawing order (LINE, ARC, FLASH or OTHER)
+
+    index : numpy.ndarray of int
+        Row of each primitive in the columns of its kind, in drawing order
+
+    line_start, line_end : numpy.ndarray, shape (n, 2)
+        Line end points
+
+    arc_start, arc_end, arc_center : numpy.ndarray, shape (n, 2)
+        Arc end points and centers
+
+    arc_clockwise, arc_single_quadrant : numpy.ndarray of bool
+        Arc direction and quadrant mode
+
+    flash_position : numpy.ndarray, shape (n, 2)
+        Flash positions
+
+    line_aperture, arc_aperture, flash_aperture : numpy.ndarray of int
+        Index into `apertures` of each line, arc and flash
+
+    line_dark, arc_dark, flash_dark : numpy.ndarray of bool
+        True where the level polarity is dark
+    """
+
+    @classmethod
+    def from_primitives(cls, primitives, units=None):
+        """ Create a table holding primitives
+
+        Parameters
+        ----------
+        primitives : iterable of :class:`gerber.primitives.Primitive`
+            Primitives, in drawing order.
+
+        units : string, optional
+            Units of the primitives. Taken from the first primitive by
+            default.
+        """
+        table = cls(units)
+        # Copies of shared apertures are shared too
+        memo = {}
+        lines = ([], [], [], [])
+        arcs = ([], [], [], [], [], [], [])
+        flashes = ([], [], [])
+        kind = []
+        index = []
+        for primitive in primitives:
+            if table.units is None:
+                table.units = primitive.units
+            if getattr(primitive, 'net_name', None) is not None:
+                rows, row = None, None
+            elif type(primitive) is Line:
+                rows = lines
+                row = (primitive.start, primitive.end,
+                       table._aperture_id(primitive.aperture, memo),
+                       primitive.level_polarity == 'dark')
+                kind.append(LINE)
+            elif type(primitive) is Arc:
+                rows = arcs
+                row = (primitive.start, primitive.end, primitive.center,
+                       primitive.direction == 'clockwise',
+                       primitive.quadrant_mode == 'single-quadrant',
+                       table._aperture_id(primitive.aperture, memo),
+                       primitive.level_polarity == 'dark')
+                kind.append(ARC)
+            elif type(primitive) is Flash:
+                rows = flashes
+                row = (primitive.position,
+                       table._aperture_id(primitive.aperture, memo),
+                       primitive.level_polarity == 'dark')
+                kind.append(FLASH)
+            else:
+                rows = None
+            if rows is None:
+                kind.append(OTHER)
+                index.append(len(table.others))
+                table.others.append(copy.deepcopy(primitive, memo))
+            else:
+                index.append(len(rows[0]))
+                for column, value in zip(rows, row):
+                    column.append(value)
+
+        table.kind = np.array(kind, dtype=np.int8)
+        table.index = np.array(index, dtype=np.intp)
+        table.line_start = _points(lines[0])
+        table.line_end = _points(lines[1])
+        table.line_aperture = np.array(lines[2], dtype=np.intp)
+        table.line_dark = np.array(lines[3], dtype=bool)
+        table.arc_start = _points(arcs[0])
+        table.arc_end = _points(arcs[1])
+        table.arc_center = _points(arcs[2])
+        table.arc_clockwise = np.array(arcs[3], dtype=bool)
+        table.arc_single_quadrant = np.array(arcs[4], dtype=bool)
+        table.arc_aperture = np.array(arcs[5], dtype=np.intp)
+        table.arc_dark = np.array(arcs[6], dtype=bool)
+        table.flash_position = _points(flashes[0])
+        table.flash_aperture = np.array(flashes[1], dtype=np.intp)
+        table.flash_dark = np.array(flashes[2], dtype=bool)
+        return table
+
+    def __init__(self, units=None):
+        self.units = units
+        self.apertures = []
+        self.others = []
+        self._aperture_ids = {}
+        self.kind = np.zeros(0, dtype=np.int8)
+        self.index = np.zeros(0, dtype=np.intp)
+        self.line_start = _points([])
+        self.line_end = _points([])
+        self.line_aperture = np.zeros(0, dtype=np.intp)
+        self.line_dark = np.zeros(0, dtype=bool)
+        self.arc_start = _points([])
+        self.arc_end = _points([])
+        self.arc_center = _points([])
+        self.arc_clockwise = np.zeros(0, dtype=bool)
+        self.arc_single_quadrant = np.zeros(0, dtype=bool)
+        self.arc_aperture = np.zeros(0, dtype=np.intp)
+        self.arc_dark = np.zeros(0, dtype=bool)
+        self.flash_position = _points([])
+        self.flash_aperture = np.zeros(0, dtype=np.intp)
+        self.flash_dark = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __iter__(self):
+        views = self._views()
+        for kind, index in zip(self.kind.tolist(), self.index.tolist()):
+            yield views[kind](index)
+
+    def __getitem__(self, i):
+        return self._views()[self.kind[i]](self.index[i])
+
+    @property
+    def primitives(self):
+        """ List of primitive objects for every row of the table
+        """
+        return list(self)
+
+    @property
+    def bounding_box(self):
+        """ Bounding box of all the primitives
+
+        Return ((min x, max x), (min y, max y))
+        """
+        mins = []
+        maxs = []
+
+        if len(self.line_start):
+            half = np.array([_line_extent(aperture)
+                             for aperture in self.apertures]).reshape(-1, 2)
+            half = half[self.line_aperture]
+            mins.append(np.minimum(self.line_start, self.line_end) - half)
+            maxs.append(np.maximum(self.line_start, self.line_end) + half)
+
+        if len(self.arc_start):
+            arc_min, arc_max = self._arc_bounds()
+            mins.append(arc_min)
+            maxs.append(arc_max)
+
+        if len(self.flash_position):
+            bounds = np.array([_flash_bounds(aperture)
+                               for aperture in self.apertures]).reshape(-1, 4)
+            bounds = bounds[self.flash_aperture]
+            mins.append(bounds[:, 0:2] + self.flash_position)
+            maxs.append(bounds[:, 2:4] + self.flash_position)
+
+        for primitive in self.others:
+            (min_x, max_x), (min_y, max_y) = primitive.bounding_box
+            mins.append(np.array([[min_x, min_y]]))
+            maxs.append(np.array([[max_x, max_y]]))
+
+        if not mins:
+            return None
+        min_x, min_y = np.concatenate(mins).min(axis=0).tolist()
+        max_x, max_y = np.concatenate(maxs).max(axis=0).tolist()
+        return ((min_x, max_x), (min_y, max_y))
+
+    def to_inch(self):
+        if self.units == 'metric':
+            self._scale(1. / MILLIMETERS_PER_INCH)
+            for obj in self.apertures + self.others:
+                obj.to_inch()
+            self.units = 'inch'
+
+    def to_metric(self):
+        if self.units == 'inch':
+            self._scale(MILLIMETERS_PER_INCH)
+            for obj in self.apertures + self.others:
+                obj.to_metric()
+            self.units = 'metric'
+
+    def offset(self, x_offset=0, y_offset=0):
+        """ Move every primitive by the specified x and y offset amount.
+        """
+        delta = np.array([x_offset, y_offset], dtype=float)
+        for column in (self.line_start, self.line_end, self.arc_start,
+                       self.arc_end, self.arc_center, self.flash_position):
+            column += delta
+        for primitive in self.others:
+            primitive.offset(x_offset, y_offset)
+
+    def render(self, ctx=None, invert=False, filename=None):
+        """ Generate image of the primitives in the table.
+
+        Parameters
+        ----------
+        ctx : :class:`GerberContext`
+            GerberContext subclass used for rendering the image
+
+        filename : string <optional>
+            If provided, save the rendered image to `filename`
+        """
+        if ctx is None:
+            from .render import GerberCairoContext
+            ctx = GerberCairoContext()
+        ctx.set_bounds(self.bounding_box)
+        ctx._paint_background()
+        ctx.invert = invert
+        ctx._new_render_layer()
+        ctx.render_many(self)
+        ctx._flatten()
+
+        if filename is not None:
+            ctx.dump(filename)
+
+    def _aperture_id(self, aperture, memo):
+        key = id(aperture)
+        if key not in self._aperture_ids:
+            self._aperture_ids[key] = len(self.apertures)
+            self.apertures.append(copy.deepcopy(aperture, memo))
+        return self._aperture_ids[key]
+
+    def _scale(self, factor):
+        for column in (self.line_start, self.line_end, self.arc_start,
+                       self.arc_end, self.arc_center, self.flash_position):
+            column *= factor
+
+    def _views(self):
+        return (self._line, self._arc, self._flash, self.others.__getitem__)
+
+    def _line(self, i):
+        return Line(tuple(self.line_start[i].tolist()),
+                    tuple(self.line_end[i].tolist()),
+                    self.apertures[self.line_aperture[i]],
+                    level_polarity=_polarity(self.line_dark[i]),
+                    units=self.units)
+
+    def _arc(self, i):
+        return Arc(tuple(self.arc_start[i].tolist()),
+                   tuple(self.arc_end[i].tolist()),
+                   tuple(self.arc_center[i].tolist()),
+                   'clockwise' if self.arc_clockwise[i] else 'counterclockwise',
+                   self.apertures[self.arc_aperture[i]],
+                   ('single-quadrant' if self.arc_single_quadrant[i]
+                    else 'multi-quadrant'),
+                   level_polarity=_polarity(self.arc_dark[i]),
+                   units=self.units)
+
+    def _flash(self, i):
+        return Flash(self.apertures[self.flash_aperture[i]],
+                     tuple(self.flash_position[i].tolist()),
+                     level_polarity=_polarity(self.flash_dark[i]),
+                     units=self.units)
+
+    def _arc_bounds(self):
+        """ Arc bounds, computed the same way as Arc.bounding_box
+        """
+        start = self.arc_start
+        end = self.arc_end
+        center = self.arc_center
+        two_pi = 2 * np.pi
+        theta0 = np.mod(np.arctan2(start[:, 1] - center[:, 1],
+                                   start[:, 0] - center[:, 0]) + two_pi, two_pi)
+        theta1 = np.mod(np.arctan2(end[:, 1] - center[:, 1],
+                                   end[:, 0] - center[:, 0]) + two_pi, two_pi)
+        radius = np.hypot(start[:, 0] - center[:, 0], start[:, 1] - center[:, 1])
+
+        # Clockwise arcs pass through an angle if the counterclockwise arc
+        # with the end points swapped does
+        ccw = ~self.arc_clockwise
+        a = np.where(ccw, theta0, theta1)
+        b = np.where(ccw, theta1, theta0)
+        multi = ~self.arc_single_quadrant
+
+        def passes(angle):
+            return multi & (((a <= angle) & ((b >= angle) | (b <= a))) |
+                            ((b > angle) & (b <= a)))
+
+        min_xy = np.minimum(start, end)
+        max_xy = np.maximum(start, end)
+        # 0 degrees
+        max_xy[:, 0] = np.where(multi & (a >= b), np.maximum(
+            max_xy[:, 0], center[:, 0] + radius), max_xy[:, 0])
+        # 90 degrees
+        max_xy[:, 1] = np.where(passes(np.pi / 2.), np.maximum(
+            max_xy[:, 1], center[:, 1] + radius), max_xy[:, 1])
+        # 180 degrees
+        min_xy[:, 0] = np.where(passes(np.pi), np.minimum(
+            min_xy[:, 0], center[:, 0] - radius), min_xy[:, 0])
+        # 270 degrees
+        min_xy[:, 1] = np.where(passes(np.pi * 1.5), np.minimum(
+            min_xy[:, 1], center[:, 1] - radius), min_xy[:, 1])
+
+        extent = np.array([_arc_extent(aperture)
+                           for aperture in self.apertures]).reshape(-1, 2)
+        extent = extent[self.arc_aperture]
+        return (min_xy - extent, max_xy + extent)
+
+
+def _points(points):
+    return np.array(points, dtype=float).reshape(-1, 2)
+
+
+def _polarity(dark):
+    return 'dark' if dark else 'clear'
+
+
+def _line_extent(aperture):
+    """ Half size of a line's aperture, as used by Line.bounding_box
+    """
+    if isinstance(aperture, Circle):
+        return (aperture.radius, aperture.radius)
+    try:
+        return (aperture.width / 2., aperture.height / 2.)
+    except AttributeError:
+        return (0., 0.)
+
+
+def _arc_extent(aperture):
+    """ Aperture extent added to an arc, as used by Arc.bounding_box
+    """
+    if hasattr(aperture, 'radius'):
+        return (aperture.radius, aperture.radius)
+    try:
+        return (aperture.width, aperture.height)
+    except AttributeError:
+        return (0., 0.)
+
+
+def _flash_bounds(aperture):
+    """ Bounds of an aperture relative to a flash position
+    """
+    try:
+        (min_x, max_x), (min_y, max_y) = aperture.bounding_box
+    except (AttributeError, TypeError):
+        return (0., 0., 0., 0.)
+    x, y = aperture.position or (0, 0)
+    return (min_x - x, min_y - y, max_x - x, max_y - y)
@@ -16,15 +16,25 @@
 # limitations under the License.
 
 
+import copy
 import math
 from operator import add
-from itertools import combinations
 from .utils import validate_coordinates, inch, metric, convex_hull
-from .utils import rotate_point, nearly_equal
+from .utils import rotate_point, nearly_equal, instance_attributes
+from .utils import polygon_edges, segment_bounding_boxes
 
 
 
 
+def _compared_attributes(primitive):
+    # Memoized attributes are derived from the others, and arrays can't be
+    # compared with ==
+    memoized = ('_bounding_box', '_vertices', '_segments', '_segment_boxes')
+    memoized += primitive._memoized
+    return dict((name, value) for name, value in instance_attributes(primitive)
+                if name not in memoized)
+
+
 class Primitive(object):
     """ Base class for all Cam file primitives
 
@@ -48,18 +58,26 @@ class Primitive(object):
         Name of the electrical net the primitive belongs to
     """
 
+    # Attributes converted by to_inch() and to_metric(), and memoized
+    # attributes cleared by _changed(). These are class-level so instances
+    # don't carry their own copies.
+    _to_convert = ()
+    _memoized = ()
+
+    # Subclasses that are created in large numbers (lines, arcs, flashes and
+    # drills) declare __slots__ too, so their instances have no __dict__.
+    __slots__ = ('level_polarity', 'net_name', '_units', '_rotation',
+                 '_bounding_box', '_vertices', '_segments', '_segment_boxes')
+
     def __init__(self, level_polarity='dark', rotation=0, units=None, net_name=None):
         self.level_polarity = level_polarity
         self.net_name = net_name
-        self._to_convert = list()
-        self._memoized = list()
         self._units = units
         self._rotation = rotation
-        self._cos_theta = math.cos(math.radians(rotation))
-        self._sin_theta = math.sin(math.radians(rotation))
         self._bounding_box = None
         self._vertices = None
         self._segments = None
+        self._segment_boxes = None
 
     @property
     def flashed(self):
@@ -68,7 +86,14 @@ class Primitive(object):
                                   'implemented in subclass')
 
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return _compared_attributes(self) == _compared_attributes(other)
+
+    def __getstate__(self):
+        return dict(instance_attributes(self))
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
 
     @property
     def units(self):
@@ -87,8 +112,14 @@ class Primitive(object):
     def rotation(self, value):
         self._changed()
         self._rotation = value
-        self._cos_theta = math.cos(math.radians(value))
-        self._sin_theta = math.sin(math.radians(value))
+
+    @property
+    def _cos_theta(self):
+        return math.cos(math.radians(self._rotation))
+
+    @property
+    def _sin_theta(self):
+        return math.sin(math.radians(self._rotation))
 
     @property
     def vertices(self):
@@ -96,12 +127,37 @@ class Primitive(object):
 
     @property
     def segments(self):
+        """ Edges of the primitive's outline
+
+        Returns
+        -------
+        segments : numpy.ndarray
+            (n, 2, 2) array of the edges from each vertex to the next, the
+            last one closing the outline. None if the primitive has no
+            vertices.
+        """
         if self._segments is None:
-            if self.vertices is not None and len(self.vertices):
-                self._segments = [segment for segment in
-                                  combinations(self.vertices, 2)]
+            vertices = self.vertices
+            if vertices is not None and len(vertices):
+                self._segments = polygon_edges(vertices)
         return self._segments
 
+    @property
+    def segment_boxes(self):
+        """ Bounding boxes of the edges in :attr:`segments`
+
+        Returns
+        -------
+        boxes : numpy.ndarray
+            (n, 4) array of each edge's (xmin, xmax, ymin, ymax). None if the
+            primitive has no vertices.
+        """
+        if self._segment_boxes is None:
+            segments = self.segments
+            if segments is not None:
+                self._segment_boxes = segment_bounding_boxes(segments)
+        return self._segment_boxes
+
     @property
     def bounding_box(self):
         """ Calculate axis-aligned bounding box
@@ -199,6 +255,7 @@ class Primitive(object):
         self._bounding_box = None
         self._vertices = None
         self._segments = None
+        self._segment_boxes = None
         for attr in self._memoized:
             setattr(self, attr, None)
 
@@ -206,12 +263,14 @@ class Line(Primitive):
     """
     """
 
+    _to_convert = ('start', 'end', 'aperture')
+    __slots__ = ('_start', '_end', 'aperture')
+
     def __init__(self, start, end, aperture, **kwargs):
         super(Line, self).__init__(**kwargs)
         self._start = start
         self._end = end
         self.aperture = aperture
-        self._to_convert = ['start', 'end', 'aperture']
 
     @property
     def flashed(self):
@@ -289,7 +348,7 @@ class Line(Primitive):
                 # The line is defined by the convex hull of the points
                 self._vertices = convex_hull((start_ll, start_lr, start_ul, start_ur, end_ll, end_lr, end_ul, end_ur))
             elif isinstance(self.aperture, Polygon):
-                points = [map(add, point, vertex)
+                points = [tuple(map(add, point, vertex))
                           for vertex in self.aperture.vertices
                           for point in (start, end)]
                 self._vertices = convex_hull(points)
@@ -323,6 +382,10 @@ class Arc(Primitive):
     """
     """
 
+    _to_convert = ('start', 'end', 'center', 'aperture')
+    __slots__ = ('_start', '_end', '_center', 'direction', 'aperture',
+                 '_quadrant_mode')
+
     def __init__(self, start, end, center, direction, aperture, quadrant_mode,
                  **kwargs):
         super(Arc, self).__init__(**kwargs)
@@ -332,7 +395,6 @@ class Arc(Primitive):
         self.direction = direction
         self.aperture = aperture
         self._quadrant_mode = quadrant_mode
-        self._to_convert = ['start', 'end', 'center', 'aperture']
 
     @property
     def flashed(self):
@@ -521,6 +583,9 @@ class Circle(Primitive):
     """
     """
 
+    _to_convert = ('position', 'diameter', 'hole_diameter', 'hole_width',
+                   'hole_height')
+
     def __init__(self, position, diameter, hole_diameter=None,
                  hole_width=0, hole_height=0, **kwargs):
         super(Circle, self).__init__(**kwargs)
@@ -530,7 +595,6 @@ class Circle(Primitive):
         self.hole_diameter = hole_diameter
         self.hole_width = hole_width
         self.hole_height = hole_height
-        self._to_convert = ['position', 'diameter', 'hole_diameter', 'hole_width', 'hole_height']
 
     @property
     def flashed(self):
@@ -594,13 +658,15 @@ class Circle(Primitive):
 class Ellipse(Primitive):
     """
     """
+
+    _to_convert = ('position', 'width', 'height')
+
     def __init__(self, position, width, height, **kwargs):
         super(Ellipse, self).__init__(**kwargs)
         validate_coordinates(position)
         self._position = position
         self._width = width
         self._height = height
-        self._to_convert = ['position', 'width', 'height']
 
     @property
     def flashed(self):
@@ -666,6 +732,9 @@ class Rectangle(Primitive):
     then you don't need to worry about rotation
     """
 
+    _to_convert = ('position', 'width', 'height', 'hole_diameter',
+                   'hole_width', 'hole_height')
+
     def __init__(self, position, width, height, hole_diameter=0,
                  hole_width=0, hole_height=0, **kwargs):
         super(Rectangle, self).__init__(**kwargs)
@@ -676,8 +745,6 @@ class Rectangle(Primitive):
         self.hole_diameter = hole_diameter
         self.hole_width = hole_width
         self.hole_height = hole_height
-        self._to_convert = ['position', 'width', 'height', 'hole_diameter',
-                            'hole_width', 'hole_height']
         # TODO These are probably wrong when rotated
         self._lower_left = None
         self._upper_right = None
@@ -756,11 +823,13 @@ class Rectangle(Primitive):
 
     @property
     def axis_aligned_width(self):
-        return (self._cos_theta * self.width + self._sin_theta * self.height)
+        return (abs(self._cos_theta) * self.width +
+                abs(self._sin_theta) * self.height)
 
     @property
     def axis_aligned_height(self):
-        return (self._cos_theta * self.height + self._sin_theta * self.width)
+        return (abs(self._cos_theta) * self.height +
+                abs(self._sin_theta) * self.width)
 
     def equivalent(self, other, offset):
         """Is this the same as the other rect, ignoring the offset?"""
@@ -786,13 +855,14 @@ class Diamond(Primitive):
     """
     """
 
+    _to_convert = ('position', 'width', 'height')
+
     def __init__(self, position, width, height, **kwargs):
         super(Diamond, self).__init__(**kwargs)
         validate_coordinates(position)
         self._position = position
         self._width = width
         self._height = height
-        self._to_convert = ['position', 'width', 'height']
 
     @property
     def flashed(self):
@@ -851,16 +921,21 @@ class Diamond(Primitive):
 
     @property
     def axis_aligned_width(self):
-        return (self._cos_theta * self.width + self._sin_theta * self.height)
+        return (abs(self._cos_theta) * self.width +
+                abs(self._sin_theta) * self.height)
 
     @property
     def axis_aligned_height(self):
-        return (self._cos_theta * self.height + self._sin_theta * self.width)
+        return (abs(self._cos_theta) * self.height +
+                abs(self._sin_theta) * self.width)
 
 
 class ChamferRectangle(Primitive):
     """
     """
+
+    _to_convert = ('position', 'width', 'height', 'chamfer')
+
     def __init__(self, position, width, height, chamfer, corners=None, **kwargs):
         super(ChamferRectangle, self).__init__(**kwargs)
         validate_coordinates(position)
@@ -869,7 +944,6 @@ class ChamferRectangle(Primitive):
         self._height = height
         self._chamfer = chamfer
         self._corners = corners if corners is not None else [True] * 4
-        self._to_convert = ['position', 'width', 'height', 'chamfer']
 
     @property
     def flashed(self):
@@ -948,14 +1022,14 @@ class ChamferRectangle(Primitive):
                 x, y = corner
                 if chamfered:
                     if idx == 0:
-                        vertices.append((x - self.chamfer, y))
                         vertices.append((x, y - self.chamfer))
+                        vertices.append((x - self.chamfer, y))
                     elif idx == 1:
                         vertices.append((x + self.chamfer, y))
                         vertices.append((x, y - self.chamfer))
                     elif idx == 2:
-                        vertices.append((x + self.chamfer, y))
                         vertices.append((x, y + self.chamfer))
+                        vertices.append((x + self.chamfer, y))
                     elif idx == 3:
                         vertices.append((x - self.chamfer, y))
                         vertices.append((x, y + self.chamfer))
@@ -968,19 +1042,21 @@ class ChamferRectangle(Primitive):
 
     @property
     def axis_aligned_width(self):
-        return (self._cos_theta * self.width +
-                self._sin_theta * self.height)
+        return (abs(self._cos_theta) * self.width +
+                abs(self._sin_theta) * self.height)
 
     @property
     def axis_aligned_height(self):
-        return (self._cos_theta * self.height +
-                self._sin_theta * self.width)
+        return (abs(self._cos_theta) * self.height +
+                abs(self._sin_theta) * self.width)
 
 
 class RoundRectangle(Primitive):
     """
     """
 
+    _to_convert = ('position', 'width', 'height', 'radius')
+
     def __init__(self, position, width, height, radius, corners, **kwargs):
         super(RoundRectangle, self).__init__(**kwargs)
         validate_coordinates(position)
@@ -989,7 +1065,6 @@ class RoundRectangle(Primitive):
         self._height = height
         self._radius = radius
         self._corners = corners
-        self._to_convert = ['position', 'width', 'height', 'radius']
 
     @property
     def flashed(self):
@@ -1052,19 +1127,22 @@ class RoundRectangle(Primitive):
 
     @property
     def axis_aligned_width(self):
-        return (self._cos_theta * self.width +
-                self._sin_theta * self.height)
+        return (abs(self._cos_theta) * self.width +
+                abs(self._sin_theta) * self.height)
 
     @property
     def axis_aligned_height(self):
-        return (self._cos_theta * self.height +
-                self._sin_theta * self.width)
+        return (abs(self._cos_theta) * self.height +
+                abs(self._sin_theta) * self.width)
 
 
 class Obround(Primitive):
     """
     """
 
+    _to_convert = ('position', 'width', 'height', 'hole_diameter',
+                   'hole_width', 'hole_height')
+
     def __init__(self, position, width, height, hole_diameter=0,
                  hole_width=0,hole_height=0, **kwargs):
         super(Obround, self).__init__(**kwargs)
@@ -1075,8 +1153,6 @@ class Obround(Primitive):
         self.hole_diameter = hole_diameter
         self.hole_width = hole_width
         self.hole_height = hole_height
-        self._to_convert = ['position', 'width', 'height', 'hole_diameter',
-                            'hole_width', 'hole_height' ]
 
     @property
     def flashed(self):
@@ -1153,19 +1229,23 @@ class Obround(Primitive):
 
     @property
     def axis_aligned_width(self):
-        return (self._cos_theta * self.width +
-                self._sin_theta * self.height)
+        return (abs(self._cos_theta) * self.width +
+                abs(self._sin_theta) * self.height)
 
     @property
     def axis_aligned_height(self):
-        return (self._cos_theta * self.height +
-                self._sin_theta * self.width)
+        return (abs(self._cos_theta) * self.height +
+                abs(self._sin_theta) * self.width)
 
 
 class Polygon(Primitive):
     """
     Polygon flash defined by a set number of sides.
     """
+
+    _to_convert = ('position', 'radius', 'hole_diameter', 'hole_width',
+                   'hole_height')
+
     def __init__(self, position, sides, radius, hole_diameter=0,
                  hole_width=0, hole_height=0, **kwargs):
         super(Polygon, self).__init__(**kwargs)
@@ -1176,8 +1256,6 @@ class Polygon(Primitive):
         self.hole_diameter = hole_diameter
         self.hole_width = hole_width
         self.hole_height = hole_height
-        self._to_convert = ['position', 'radius', 'hole_diameter',
-                            'hole_width', 'hole_height']
 
     @property
     def flashed(self):
@@ -1254,6 +1332,9 @@ class Polygon(Primitive):
 class AMGroup(Primitive):
     """
     """
+
+    _to_convert = ('_position', 'primitives')
+
     def __init__(self, amprimitives, stmt = None, **kwargs):
         """
 
@@ -1270,7 +1351,6 @@ class AMGroup(Primitive):
             elif prim:
                 self.primitives.append(prim)
         self._position = None
-        self._to_convert = ['_position', 'primitives']
         self.stmt = stmt
 
     def to_inch(self):
@@ -1296,21 +1376,23 @@ class AMGroup(Primitive):
 
     @property
     def bounding_box(self):
-        # TODO Make this cached like other items
-        xlims, ylims = zip(*[p.bounding_box for p in self.primitives])
-        minx, maxx = zip(*xlims)
-        miny, maxy = zip(*ylims)
-        min_x = min(minx)
-        max_x = max(maxx)
-        min_y = min(miny)
-        max_y = max(maxy)
-        return ((min_x, max_x), (min_y, max_y))
+        if self._bounding_box is None:
+            xlims, ylims = zip(*[p.bounding_box for p in self.primitives])
+            minx, maxx = zip(*xlims)
+            miny, maxy = zip(*ylims)
+            min_x = min(minx)
+            max_x = max(maxx)
+            min_y = min(miny)
+            max_y = max(maxy)
+            self._bounding_box = ((min_x, max_x), (min_y, max_y))
+        return self._bounding_box
 
     @property
     def position(self):
         return self._position
 
     def offset(self, x_offset=0, y_offset=0):
+        self._changed()
         self._position = tuple(map(add, self._position, (x_offset, y_offset)))
 
         for primitive in self.primitives:
@@ -1323,6 +1405,7 @@ class AMGroup(Primitive):
         This offset all of the objects by the specified distance.
         '''
 
+        self._changed()
         if self._position:
             dx = new_pos[0] - self._position[0]
             dy = new_pos[1] - self._position[1]
@@ -1357,10 +1440,11 @@ class Outline(Primitive):
     They don't exist outside of AMGroup objects
     """
 
+    _to_convert = ('primitives',)
+
     def __init__(self, primitives, **kwargs):
         super(Outline, self).__init__(**kwargs)
         self.primitives = primitives
-        self._to_convert = ['primitives']
 
         if self.primitives[0].start != self.primitives[-1].end:
             raise ValueError('Outline must be closed')
@@ -1390,13 +1474,7 @@ class Outline(Primitive):
     @property
     def vertices(self):
         if self._vertices is None:
-            theta = math.radians(360/self.sides)
-            vertices = [(self.position[0] + (math.cos(theta * side) * self.radius),
-                         self.position[1] + (math.sin(theta * side) * self.radius))
-                        for side in range(self.sides)]
-            self._vertices = [(((x * self._cos_theta) - (y * self._sin_theta)),
-                               ((x * self._sin_theta) + (y * self._cos_theta)))
-                              for x, y in vertices]
+            self._vertices = [p.start for p in self.primitives]
         return self._vertices
 
     @property
@@ -1423,10 +1501,11 @@ class Region(Primitive):
     """
     """
 
+    _to_convert = ('primitives',)
+
     def __init__(self, primitives, **kwargs):
         super(Region, self).__init__(**kwargs)
         self.primitives = primitives
-        self._to_convert = ['primitives']
 
     @property
     def flashed(self):
@@ -1455,12 +1534,13 @@ class RoundButterfly(Primitive):
     """ A circle with two diagonally-opposite quadrants removed
     """
 
+    _to_convert = ('position', 'diameter')
+
     def __init__(self, position, diameter, **kwargs):
         super(RoundButterfly, self).__init__(**kwargs)
         validate_coordinates(position)
         self.position = position
         self.diameter = diameter
-        self._to_convert = ['position', 'diameter']
 
         # TODO This does not reset bounding box correctly
 
@@ -1487,12 +1567,13 @@ class SquareButterfly(Primitive):
     """ A square with two diagonally-opposite quadrants removed
     """
 
+    _to_convert = ('position', 'side')
+
     def __init__(self, position, side, **kwargs):
         super(SquareButterfly, self).__init__(**kwargs)
         validate_coordinates(position)
         self.position = position
         self.side = side
-        self._to_convert = ['position', 'side']
 
         # TODO This does not reset bounding box correctly
 
@@ -1515,6 +1596,9 @@ class Donut(Primitive):
     """ A Shape with an identical concentric shape removed from its center
     """
 
+    _to_convert = ('position', 'width', 'height', 'inner_diameter',
+                   'outer_diameter')
+
     def __init__(self, position, shape, inner_diameter,
                  outer_diameter, **kwargs):
         super(Donut, self).__init__(**kwargs)
@@ -1537,9 +1621,6 @@ class Donut(Primitive):
             self.width = 0.5 * math.sqrt(3.) * outer_diameter
             self.height = outer_diameter
 
-        self._to_convert = ['position', 'width',
-                            'height', 'inner_diameter', 'outer_diameter']
-
         # TODO This does not reset bounding box correctly
 
     @property
@@ -1571,6 +1652,8 @@ class SquareRoundDonut(Primitive):
     """ A Square with a circular cutout in the center
     """
 
+    _to_convert = ('position', 'inner_diameter', 'outer_diameter')
+
     def __init__(self, position, inner_diameter, outer_diameter, **kwargs):
         super(SquareRoundDonut, self).__init__(**kwargs)
         validate_coordinates(position)
@@ -1580,7 +1663,6 @@ class SquareRoundDonut(Primitive):
                 'Outer diameter must be larger than inner diameter.')
         self.inner_diameter = inner_diameter
         self.outer_diameter = outer_diameter
-        self._to_convert = ['position', 'inner_diameter', 'outer_diameter']
 
     @property
     def flashed(self):
@@ -1598,12 +1680,15 @@ class SquareRoundDonut(Primitive):
 class Drill(Primitive):
     """ A drill hole
     """
+
+    _to_convert = ('position', 'diameter')
+    __slots__ = ('_position', '_diameter')
+
     def __init__(self, position, diameter, **kwargs):
         super(Drill, self).__init__('dark', **kwargs)
         validate_coordinates(position)
         self._position = position
         self._diameter = diameter
-        self._to_convert = ['position', 'diameter']
 
     @property
     def flashed(self):
@@ -1652,6 +1737,10 @@ class Drill(Primitive):
 class Slot(Primitive):
     """ A drilled slot
     """
+
+    _to_convert = ('start', 'end', 'diameter')
+    __slots__ = ('start', 'end', 'diameter')
+
     def __init__(self, start, end, diameter, **kwargs):
         super(Slot, self).__init__('dark', **kwargs)
         validate_coordinates(start)
@@ -1659,7 +1748,6 @@ class Slot(Primitive):
         self.start = start
         self.end = end
         self.diameter = diameter
-        self._to_convert = ['start', 'end', 'diameter']
 
 
     @property
@@ -1682,14 +1770,134 @@ class Slot(Primitive):
         self.end = tuple(map(add, self.end, (x_offset, y_offset)))
 
 
+class Flash(Primitive):
+    """ A flashed aperture
+
+    Flashes are flyweights: every flash of a given D code holds a reference to
+    the same aperture definition and only stores its own position, polarity
+    and units. The aperture is positioned at the origin (or at its own
+    `position`, if it has one) and is never modified by the flash.
+
+    Parameters
+    ----------
+    aperture : Primitive
+        Shared aperture definition, e.g. a :class:`Circle` or
+        :class:`AMGroup` from `GerberFile.apertures`
+
+    position : tuple (<float>, <float>)
+        Location of the flash
+    """
+
+    _to_convert = ('position', 'aperture')
+    __slots__ = ('aperture', '_position')
+
+    def __init__(self, aperture, position, level_polarity='dark', units=None,
+                 net_name=None):
+        validate_coordinates(position)
+        self.aperture = aperture
+        self.level_polarity = level_polarity
+        self.net_name = net_name
+        self._units = units
+        self._position = position
+
+    @property
+    def flashed(self):
+        return True
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, value):
+        self._position = value
+
+    @property
+    def rotation(self):
+        return self.aperture.rotation
+
+    @property
+    def _aperture_offset(self):
+        origin = self.aperture.position or (0, 0)
+        return (self._position[0] - origin[0], self._position[1] - origin[1])
+
+    @property
+    def bounding_box(self):
+        (min_x, max_x), (min_y, max_y) = self.aperture.bounding_box
+        dx, dy = self._aperture_offset
+        return ((min_x + dx, max_x + dx), (min_y + dy, max_y + dy))
+
+    @property
+    def vertices(self):
+        vertices = self.aperture.vertices
+        if vertices is None:
+            return None
+        dx, dy = self._aperture_offset
+        return [(x + dx, y + dy) for x, y in vertices]
+
+    @property
+    def segments(self):
+        segments = self.aperture.segments
+        if segments is None:
+            return None
+        return segments + self._aperture_offset
+
+    @property
+    def segment_boxes(self):
+        boxes = self.aperture.segment_boxes
+        if boxes is None:
+            return None
+        dx, dy = self._aperture_offset
+        return boxes + (dx, dx, dy, dy)
+
+    def offset(self, x_offset=0, y_offset=0):
+        self._position = tuple(map(add, self._position, (x_offset, y_offset)))
+
+    def to_primitive(self):
+        """ Create a standalone primitive for this flash
+
+        Returns
+        -------
+        primitive : Primitive
+            A copy of the aperture placed at the flash position, with the
+            flash's polarity and units.
+        """
+        primitive = copy.deepcopy(self.aperture)
+        primitive.position = self.position
+        primitive.level_polarity = self.level_polarity
+        primitive.units = self.units
+        return primitive
+
+    def _changed(self):
+        # Nothing is memoized per flash, all geometry comes from the aperture
+        pass
+
+    def equivalent(self, other, offset):
+        """ Is this the same as the other flash, ignoring the offset?
+        """
+        if not isinstance(other, Flash) or self.aperture is not other.aperture:
+            return False
+
+        equiv_position = tuple(map(add, other.position, offset))
+
+        return nearly_equal(self.position, equiv_position)
+
+    def __str__(self):
+        return '<Flash {} at {}>'.format(self.aperture, self.position)
+
+    def __repr__(self):
+        return str(self)
+
+
 class TestRecord(Primitive):
     """ Netlist Test record
     """
 
+    _to_convert = ('position',)
+
     def __init__(self, position, net_name, layer, **kwargs):
         super(TestRecord, self).__init__(**kwargs)
         validate_coordinates(position)
         self.position = position
         self.net_name = net_name
         self.layer = layer
-        self._to_convert = ['position']
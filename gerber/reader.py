@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.reader
+=============
+**File input for the Gerber, Excellon and IPC-D-356 parsers**
+
+This module provides the functions the parsers use to read their source
+files. Files are memory-mapped and decoded straight from the mapping, either
+all at once or in chunks, so the file contents are never held as both bytes
+and text. Newlines are normalized to '\\n' like a file opened in universal
+newlines mode.
+"""
+
+import codecs
+import mmap
+
+ENCODING = 'utf-8'
+
+# Number of bytes decoded at a time by iter_text()
+CHUNK_SIZE = 1 << 16
+
+# Number of bytes read by read_head()
+HEAD_SIZE = 1 << 14
+
+
+def read_text(filename, encoding=ENCODING):
+    """ Read the contents of a file as text
+
+    Parameters
+    ----------
+    filename : string
+        Filename of the file to read.
+
+    encoding : string, optional
+        Encoding of the file.
+
+    Returns
+    -------
+    text : string
+        The file contents, with universal newlines.
+    """
+    with open(filename, 'rb') as f:
+        buf = _map(f)
+        if buf is None:
+            return u''
+        try:
+            # Decode from the mapping itself rather than a bytes copy of it
+            return _normalize_newlines(codecs.decode(buf, encoding))
+        finally:
+            buf.close()
+
+
+def read_head(filename, size=HEAD_SIZE, encoding=ENCODING):
+    """ Read the start of a file as text
+
+    This is meant for sniffing the file type without reading the whole file.
+
+    Parameters
+    ----------
+    filename : string
+        Filename of the file to read.
+
+    size : int, optional
+        Number of bytes to read.
+
+    encoding : string, optional
+        Encoding of the file.
+
+    Returns
+    -------
+    text : string
+        Up to `size` bytes from the start of the file, with universal
+        newlines. A character cut off at the end is dropped.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read(size)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    return _normalize_newlines(decoder.decode(data))
+
+
+def iter_text(source, chunk_size=CHUNK_SIZE, encoding=ENCODING):
+    """ Generate the contents of a file as text, a chunk at a time
+
+    Parameters
+    ----------
+    source : string or file object
+        Filename, or file object opened in text or binary mode, to read.
+        File objects are not closed.
+
+    chunk_size : int, optional
+        Number of bytes (or characters for text file objects) to read at a
+        time.
+
+    encoding : string, optional
+        Encoding of the file, for filenames and binary file objects.
+
+    Returns
+    -------
+    chunks : generator of strings
+        Consecutive pieces of the file contents, with universal newlines.
+    """
+    if hasattr(source, 'read'):
+        for chunk in _iter_decoded(_iter_file(source, chunk_size), encoding):
+            yield chunk
+    else:
+        with open(source, 'rb') as f:
+            buf = _map(f)
+            if buf is None:
+                return
+            try:
+                for chunk in _iter_decoded(_iter_buffer(buf, chunk_size),
+                                           encoding):
+                    yield chunk
+            finally:
+                buf.close()
+
+
+def _map(f):
+    """ Memory-map an open file, or return None if it is empty
+    """
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files can't be mapped
+        return None
+
+
+def _iter_file(f, chunk_size):
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _iter_buffer(buf, chunk_size):
+    for start in range(0, len(buf), chunk_size):
+        yield buf[start:start + chunk_size]
+
+
+def _iter_decoded(chunks, encoding):
+    """ Decode byte chunks incrementally and normalize their newlines
+
+    A '\\r' at the end of a chunk is held back until the next chunk is seen,
+    so a '\\r\\n' pair split between chunks is still a single newline.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = u''
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        text = pending + chunk
+        if text.endswith(u'\r'):
+            text, pending = text[:-1], u'\r'
+        else:
+            pending = u''
+        if text:
+            yield _normalize_newlines(text)
+    text = pending + decoder.decode(b'', True)
+    if text:
+        yield _normalize_newlines(text)
+
+
+def _normalize_newlines(text):
+    if u'\r' in text:
+        text = text.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+    return text
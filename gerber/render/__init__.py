@@ -19,10 +19,20 @@ gerber.render
 ============
 **Gerber Renderers**
 
-This module provides contexts for rendering images of gerber layers. Currently
-SVG is the only supported format.
+This module provides contexts for rendering images of gerber layers.
+GerberCairoContext renders SVG and PNG images using cairo. GerberNumpyContext
+renders PNG images and boolean layer masks using only NumPy. GerberSvgContext
+streams SVG images to a file without any dependency.
 """
 
 
-from .cairo_backend import GerberCairoContext
 from .render import RenderSettings
+from .numpy_backend import GerberNumpyContext
+from .svg_backend import GerberSvgContext
+
+try:
+    from .cairo_backend import GerberCairoContext, LayerCache
+    from .tiled import render_tiled
+except ImportError:
+    # Cairo is optional, GerberNumpyContext renders images without it
+    pass
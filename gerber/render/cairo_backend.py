@@ -21,12 +21,14 @@ try:
 except ImportError:
     import cairocffi as cairo
 
+from collections import OrderedDict
 from operator import mul
 import tempfile
 import copy
 import os
 
-from .render import GerberContext, RenderSettings
+from .render import (GerberContext, RenderSettings, _arc_sweep,
+                     _layers_bounds, _region_points)
 from .theme import THEMES
 from ..primitives import *
 from ..utils import rotate_point
@@ -35,10 +37,56 @@ from io import BytesIO
 
 
 class GerberCairoContext(GerberContext):
-
-    def __init__(self, scale=300):
+    """ Cairo rendering context
+
+    Parameters
+    ----------
+    scale : int
+        Rendering scale in pixels per unit
+
+    raster : bool
+        If True, render onto `cairo.ImageSurface` bitmaps instead of SVG
+        recording surfaces. Layers and masks are then A8 surfaces reused from
+        one layer to the next, so memory stays bounded by the image size.
+        A raster render can only be written out as PNG.
+
+    sprite_cache_size : int
+        Maximum number of flashed aperture images kept in raster mode. Each
+        distinct aperture is drawn once per polarity and sub-pixel offset, and
+        its image is then stamped at every flash position. The least recently
+        used images are dropped first.
+
+    layer_cache : :class:`LayerCache` <optional>
+        Cache of rendered layer masks used in raster mode. A layer rendered
+        again at the same scale, bounds, mirroring and inversion, e.g. with
+        another theme, is then only composited from its cached mask. The
+        cache may be shared by several contexts.
+
+    Attributes
+    ----------
+    window : tuple
+        (x, y, width, height) region of the image to render, in pixels from
+        the top left corner, or None to render the whole image. Only used in
+        raster mode. The pixels of the window are the same as those at the
+        same place in a full render.
+
+    lod : float
+        Level of detail threshold in pixels, or None to draw every primitive
+        in full. Primitives smaller than `lod` pixels are drawn as a single
+        pixel, merged with any other such primitive on the same pixel, and
+        region outlines are simplified to within `lod` pixels. Meant for
+        previews at a low scale.
+    """
+
+    def __init__(self, scale=300, raster=False, sprite_cache_size=1024,
+                 layer_cache=None):
         super(GerberCairoContext, self).__init__()
         self.scale = (scale, scale)
+        self.raster = raster
+        self.sprite_cache_size = sprite_cache_size
+        self.layer_cache = layer_cache
+        self.window = None
+        self.lod = None
         self.surface = None
         self.surface_buffer = None
         self.ctx = None
@@ -50,6 +98,14 @@ class GerberCairoContext(GerberContext):
         self.size_in_inch = None
         self._xform_matrix = None
         self._render_count = 0
+        self._mask_run = None
+        self._layer_surface = None
+        self._mask_surface = None
+        self._sprites = OrderedDict()
+        self._sprite_run = None
+        # Position and polarity of the flash whose aperture is being drawn
+        self._offset = (0.0, 0.0)
+        self._polarity = None
 
     @property
     def origin_in_pixels(self):
@@ -72,12 +128,22 @@ class GerberCairoContext(GerberContext):
                                           x0=-self.origin_in_pixels[0],
                                           y0=self.size_in_pixels[1])
         if (self.surface is None) or new_surface:
-            self.surface_buffer = tempfile.NamedTemporaryFile()
-            self.surface = cairo.SVGSurface(self.surface_buffer, size_in_pixels[0], size_in_pixels[1])
+            if self.raster:
+                self.surface_buffer = None
+                self.surface = self._new_image_surface(cairo.FORMAT_ARGB32,
+                                                       size_in_pixels)
+            else:
+                self.surface_buffer = tempfile.NamedTemporaryFile()
+                self.surface = cairo.SVGSurface(self.surface_buffer, size_in_pixels[0], size_in_pixels[1])
             self.output_ctx = cairo.Context(self.surface)
 
     def render_layer(self, layer, filename=None, settings=None, bgsettings=None,
-                     verbose=False, bounds=None):
+                     verbose=False, bounds=None, lod=None):
+        """ Render a layer
+
+        If `lod` is given, it is used instead of the context's `lod` for this
+        layer.
+        """
         if settings is None:
             settings = THEMES['default'].get(layer.layer_class, RenderSettings())
         if bgsettings is None:
@@ -95,25 +161,27 @@ class GerberCairoContext(GerberContext):
         if verbose:
             print('[Render]: Rendering {} Layer.'.format(layer.layer_class))
         self._render_count += 1
-        self._render_layer(layer, settings)
+        context_lod = self.lod
+        if lod is not None:
+            self.lod = lod
+        try:
+            self._render_layer(layer, settings)
+        finally:
+            self.lod = context_lod
         if filename is not None:
             self.dump(filename, verbose)
 
     def render_layers(self, layers, filename, theme=THEMES['default'],
-                      verbose=False, max_width=800, max_height=600):
+                      verbose=False, max_width=800, max_height=600, lod=None):
         """ Render a set of layers
+
+        If `filename` is not an SVG file, the layers are rendered in raster
+        mode regardless of the `raster` setting, as the image is going to be
+        written out as a bitmap anyway. `lod` is passed on to
+        :meth:`render_layer`.
         """
         # Calculate scale parameter
-        x_range = [10000, -10000]
-        y_range = [10000, -10000]
-        for layer in layers:
-            bounds = layer.bounds
-            if bounds is not None:
-                layer_x, layer_y = bounds
-                x_range[0] = min(x_range[0], layer_x[0])
-                x_range[1] = max(x_range[1], layer_x[1])
-                y_range[0] = min(y_range[0], layer_y[0])
-                y_range[1] = max(y_range[1], layer_y[1])
+        x_range, y_range = _layers_bounds(layers)
         width = x_range[1] - x_range[0]
         height = y_range[1] - y_range[0]
 
@@ -123,20 +191,25 @@ class GerberCairoContext(GerberContext):
         self.clear()
 
         # Render layers
-        bgsettings = theme['background']
-        for layer in layers:
-            settings = theme.get(layer.layer_class, RenderSettings())
-            self.render_layer(layer, settings=settings, bgsettings=bgsettings,
-                              verbose=verbose)
-        self.dump(filename, verbose)
+        raster = self.raster
+        self.raster = raster or not _is_svg(filename)
+        try:
+            bgsettings = theme['background']
+            for layer in layers:
+                settings = theme.get(layer.layer_class, RenderSettings())
+                self.render_layer(layer, settings=settings,
+                                  bgsettings=bgsettings, verbose=verbose,
+                                  lod=lod)
+            self.dump(filename, verbose)
+        finally:
+            self.raster = raster
 
     def dump(self, filename=None, verbose=False):
         """ Save image as `filename`
         """
-        try:
-            is_svg = os.path.splitext(filename.lower())[1] == '.svg'
-        except:
-            is_svg = False
+        is_svg = _is_svg(filename)
+        if is_svg and self.surface_buffer is None:
+            raise ValueError('A raster render can only be saved as PNG')
         if verbose:
             print('[Render]: Writing image to {}'.format(filename))
         if is_svg:
@@ -159,6 +232,8 @@ class GerberCairoContext(GerberContext):
     def dump_svg_str(self):
         """ Return a string containg the rendered SVG.
         """
+        if self.surface_buffer is None:
+            raise ValueError('A raster render can only be saved as PNG')
         self.surface.finish()
         self.surface_buffer.flush()
         return self.surface_buffer.read()
@@ -172,13 +247,64 @@ class GerberCairoContext(GerberContext):
         self._xform_matrix = None
         self._render_count = 0
         self.surface_buffer = None
+        self._mask_run = None
+        self._layer_surface = None
+        self._mask_surface = None
+        # Sprites are keyed on the aperture's id, which survives in-place
+        # unit conversions of the aperture
+        self._sprites.clear()
+
+    def _new_surface(self, size_in_pixels, window=None):
+        """ Create an intermediate surface for a layer or a mask
+
+        In raster mode this is an alpha-only image surface, otherwise an SVG
+        recording surface.
+        """
+        if self.raster:
+            return self._new_image_surface(cairo.FORMAT_A8, size_in_pixels,
+                                           window)
+        return cairo.SVGSurface(None, size_in_pixels[0], size_in_pixels[1])
+
+    def _new_image_surface(self, format, size_in_pixels, window=None):
+        """ Create an image surface covering `window` of an image
+
+        `window` defaults to the context's window. The surface's device offset
+        is set so that drawing on it uses the same device coordinates as a
+        surface covering the whole image.
+        """
+        window = window if window is not None else self.window
+        if window is None:
+            return cairo.ImageSurface(format, *_image_size(size_in_pixels))
+        x, y, width, height = window
+        surface = cairo.ImageSurface(format, width, height)
+        surface.set_device_offset(-x, -y)
+        return surface
+
+    def _mask_window(self):
+        """ Part of the mask surface needed to render the context's window
+
+        The mask is composited through the layer's matrix, which may flip or
+        shift it by a fraction of a pixel, so the window is mapped back onto
+        the mask and grown by a margin covering the filter's footprint.
+        """
+        matrix = copy.copy(self.active_matrix)
+        matrix.invert()
+        x, y, width, height = self.window
+        corners = [matrix.transform_point(px, py)
+                   for px in (x, x + width) for py in (y, y + height)]
+        xs = [px - self.origin_in_pixels[0] for px, _ in corners]
+        ys = [py for _, py in corners]
+        mask_width, mask_height = _image_size(self.size_in_pixels)
+        xmin = max(int(math.floor(min(xs))) - 2, 0)
+        ymin = max(int(math.floor(min(ys))) - 2, 0)
+        xmax = min(int(math.ceil(max(xs))) + 2, mask_width)
+        ymax = min(int(math.ceil(max(ys))) + 2, mask_height)
+        return (xmin, ymin, max(xmax - xmin, 1), max(ymax - ymin, 1))
 
     def _new_mask(self):
         class Mask:
             def __enter__(msk):
-                size_in_pixels = self.size_in_pixels
-                msk.surface = cairo.SVGSurface(None, size_in_pixels[0],
-                                               size_in_pixels[1])
+                msk.surface = self._new_surface(self.size_in_pixels)
                 msk.ctx = cairo.Context(msk.surface)
                 msk.ctx.translate(-self.origin_in_pixels[0], -self.origin_in_pixels[1])
                 return msk
@@ -190,330 +316,461 @@ class GerberCairoContext(GerberContext):
 
         return Mask()
 
+    def _mask_primitive(self, primitive, stroke=None):
+        """ Get the mask context to draw `primitive` on
+
+        Consecutive primitives with the same polarity share a single mask
+        surface, which is only composited onto the layer when the polarity
+        changes (or the layer is flattened). Primitives with a hole are
+        drawn on a mask of their own, as clearing the hole would otherwise
+        also clear any overlapping primitive in the same run.
+
+        Parameters
+        ----------
+        primitive : :class:`gerber.primitives.Primitive`
+            Primitive about to be drawn
+
+        stroke : tuple <optional>
+            (line width, line cap) if the primitive is drawn by stroking its
+            path. Strokes sharing the same parameters are accumulated into a
+            single path and stroked at once.
+
+        Returns
+        -------
+        ctx : cairo.Context
+            Context of the mask surface to draw the primitive on.
+        """
+        if self._sprite_run is not None:
+            # Drawing a flashed aperture's sprite
+            run = self._sprite_run
+            if stroke is not None:
+                run.set_stroke(*stroke)
+            else:
+                run.end_stroke()
+            return run.ctx
+        operator = (cairo.OPERATOR_OVER
+                    if (not self.invert)
+                    and self._level_polarity(primitive) == 'dark'
+                    else cairo.OPERATOR_CLEAR)
+        isolated = _has_hole(primitive)
+        run = self._mask_run
+        if run is not None and (isolated or run.isolated
+                                or run.operator != operator):
+            self._flush_mask()
+            run = None
+        if run is None:
+            surface = None
+            if self.raster:
+                # Masks are cleared after use, so all runs can share a
+                # single scratch surface
+                if self._mask_surface is None:
+                    self._mask_surface = self._new_surface(
+                        self.size_in_pixels,
+                        self._mask_window() if self.window is not None
+                        else None)
+                surface = self._mask_surface
+            run = _MaskRun(self.size_in_pixels, self.origin_in_pixels,
+                           operator, isolated, surface)
+            self._mask_run = run
+        (xmin, xmax), (ymin, ymax) = primitive.bounding_box
+        dx, dy = self._offset
+        run.add(((xmin + dx, xmax + dx), (ymin + dy, ymax + dy)))
+        if stroke is not None:
+            run.set_stroke(*stroke)
+        else:
+            run.end_stroke()
+        run.set_offset(self.scale_point(self._offset))
+        return run.ctx
+
+    def _level_polarity(self, primitive):
+        """ Polarity of `primitive`, or of the flash it is the aperture of
+        """
+        if self._polarity is not None:
+            return self._polarity
+        return primitive.level_polarity
+
+    def _flush_mask(self):
+        """ Composite the pending mask run onto the active layer
+        """
+        run = self._mask_run
+        if run is None:
+            return
+        self._mask_run = None
+        run.end_stroke()
+        self.ctx.set_operator(run.operator)
+        with self._clip_bounds(run.bounds):
+            self.ctx.mask_surface(run.surface, self.origin_in_pixels[0])
+        run.close()
+
     def _render_layer(self, layer, settings):
+        if self.layer_cache is None or not self.raster:
+            return self._render_primitives(layer.primitives, settings)
+
+        primitives = layer.primitives
+        # The source file's version changes whenever it is converted,
+        # offset or transformed in place
+        cam_source = getattr(layer, 'cam_source', None)
+        version = cam_source.version if cam_source is not None else None
+        key = (id(primitives), len(primitives), version, self.scale,
+               self.origin_in_inch, self.size_in_inch, settings.mirror,
+               settings.invert, self.window, self.lod)
+        mask = self.layer_cache.get(key)
+        if mask is None:
+            self.invert = settings.invert
+            self._new_render_layer(mirror=settings.mirror)
+            self.render_many(primitives)
+            self._flush_mask()
+            # The layer surface is reused by the next layer, so cache a copy
+            mask = self._new_surface(self.size_in_pixels)
+            ctx = cairo.Context(mask)
+            ctx.set_source_surface(self.active_layer)
+            ctx.paint()
+            mask.flush()
+            self.layer_cache.put(key, mask, primitives)
+            self._flatten(settings.color, settings.alpha)
+        else:
+            self._composite(mask, settings.color, settings.alpha)
+
+    def _render_primitives(self, primitives, settings):
         self.invert = settings.invert
         # Get a new clean layer to render on
         self._new_render_layer(mirror=settings.mirror)
-        for prim in layer.primitives:
-            self.render(prim)
+        self.render_many(primitives)
         # Add layer to image
         self._flatten(settings.color, settings.alpha)
 
+    def render_many(self, primitives):
+        if not self.lod or self._sprite_run is not None:
+            return super(GerberCairoContext, self).render_many(primitives)
+        threshold = float(self.lod) / self.scale[0]
+        for primitive in primitives:
+            if not primitive:
+                continue
+            if not isinstance(primitive, TestRecord):
+                (xmin, xmax), (ymin, ymax) = primitive.bounding_box
+                if xmax - xmin < threshold and ymax - ymin < threshold:
+                    self._render_dot(primitive, ((xmin + xmax) / 2.0,
+                                                 (ymin + ymax) / 2.0))
+                    continue
+            self.render(primitive)
+
+    def _render_dot(self, primitive, center):
+        """ Draw a primitive too small to show as the pixel at `center`
+
+        A pixel is only drawn once per mask run.
+        """
+        x, y = self.scale_point((center[0] + self._offset[0],
+                                 center[1] + self._offset[1]))
+        x = math.floor(x - self.origin_in_pixels[0])
+        y = math.floor(y - self.origin_in_pixels[1])
+        ctx = self._mask_primitive(primitive)
+        run = self._mask_run
+        if (x, y) not in run.pixels:
+            run.pixels.add((x, y))
+            # The run's context is translated to the flash being drawn
+            ctx.rectangle(x + self.origin_in_pixels[0] - run.offset[0],
+                          y + self.origin_in_pixels[1] - run.offset[1], 1, 1)
+            ctx.fill()
+
     def _render_line(self, line, color):
         start = self.scale_point(line.start)
         end = self.scale_point(line.end)
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if (not self.invert)
-                                 and line.level_polarity == 'dark'
-                              else cairo.OPERATOR_CLEAR)
-
-        with self._clip_primitive(line):
-            with self._new_mask() as mask:
-                if isinstance(line.aperture, Circle):
-                    width = line.aperture.diameter
-                    mask.ctx.set_line_width(width * self.scale[0])
-                    mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-                    mask.ctx.move_to(*start)
-                    mask.ctx.line_to(*end)
-                    mask.ctx.stroke()
-
-                elif hasattr(line, 'vertices') and line.vertices is not None:
-                    points = [self.scale_point(x) for x in line.vertices]
-                    mask.ctx.set_line_width(0)
-                    mask.ctx.move_to(*points[-1])
-                    for point in points:
-                        mask.ctx.line_to(*point)
-                    mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        if isinstance(line.aperture, Circle):
+            width = line.aperture.diameter
+            ctx = self._mask_primitive(
+                line, stroke=(width * self.scale[0], cairo.LINE_CAP_ROUND))
+            ctx.move_to(*start)
+            ctx.line_to(*end)
+
+        elif hasattr(line, 'vertices') and line.vertices is not None:
+            ctx = self._mask_primitive(line)
+            points = [self.scale_point(x) for x in line.vertices]
+            ctx.move_to(*points[-1])
+            for point in points:
+                ctx.line_to(*point)
+            ctx.fill()
 
     def _render_arc(self, arc, color):
         center = self.scale_point(arc.center)
         start = self.scale_point(arc.start)
         end = self.scale_point(arc.end)
         radius = self.scale[0] * arc.radius
-        two_pi = 2 * math.pi
-        angle1 = (arc.start_angle + two_pi) % two_pi
-        angle2 = (arc.end_angle + two_pi) % two_pi
-        if angle1 == angle2 and arc.quadrant_mode != 'single-quadrant':
-            # Make the angles slightly different otherwise Cario will draw nothing
-            angle2 -= 0.000000001
+        angle1 = arc.start_angle
+        angle2 = angle1 + _arc_sweep(arc)
         if isinstance(arc.aperture, Circle):
             width = arc.aperture.diameter if arc.aperture.diameter != 0 else 0.001
         else:
             width = max(arc.aperture.width, arc.aperture.height, 0.001)
 
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if (not self.invert)
-                                 and arc.level_polarity == 'dark'
-                              else cairo.OPERATOR_CLEAR)
-        with self._clip_primitive(arc):
-            with self._new_mask() as mask:
-                mask.ctx.set_line_width(width * self.scale[0])
-                mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND if isinstance(arc.aperture, Circle) else cairo.LINE_CAP_SQUARE)
-                mask.ctx.move_to(*start)  # You actually have to do this...
-                if arc.direction == 'counterclockwise':
-                    mask.ctx.arc(center[0], center[1], radius, angle1, angle2)
-                else:
-                    mask.ctx.arc_negative(center[0], center[1], radius,
-                                          angle1, angle2)
-                mask.ctx.move_to(*end)  # ...lame
-                mask.ctx.stroke()
-
-                #if isinstance(arc.aperture, Rectangle):
-                #    print("Flash Rectangle Ends")
-                #    print(arc.aperture.rotation * 180/math.pi)
-                #    rect = arc.aperture
-                #    width = self.scale[0] * rect.width
-                #    height = self.scale[1] * rect.height
-                #    for point, angle in zip((start, end), (angle1, angle2)):
-                #        print("{} w {} h{}".format(point, rect.width, rect.height))
-                #        mask.ctx.rectangle(point[0] - width/2.0,
-                #                           point[1] - height/2.0, width, height)
-                #        mask.ctx.fill()
-
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        ctx = self._mask_primitive(
+            arc, stroke=(width * self.scale[0],
+                         cairo.LINE_CAP_ROUND if isinstance(arc.aperture, Circle)
+                         else cairo.LINE_CAP_SQUARE))
+        ctx.move_to(*start)  # You actually have to do this...
+        if arc.direction == 'counterclockwise':
+            ctx.arc(center[0], center[1], radius, angle1, angle2)
+        else:
+            ctx.arc_negative(center[0], center[1], radius, angle1, angle2)
+        ctx.move_to(*end)  # ...lame
 
     def _render_region(self, region, color):
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if (not self.invert) and region.level_polarity == 'dark'
-                              else cairo.OPERATOR_CLEAR)
-        with self._clip_primitive(region):
-            with self._new_mask() as mask:
-                mask.ctx.set_line_width(0)
-                mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-                mask.ctx.move_to(*self.scale_point(region.primitives[0].start))
-                for prim in region.primitives:
-                    if isinstance(prim, Line):
-                        mask.ctx.line_to(*self.scale_point(prim.end))
-                    else:
-                        center = self.scale_point(prim.center)
-                        radius = self.scale[0] * prim.radius
-                        angle1 = prim.start_angle
-                        angle2 = prim.end_angle
-                        if prim.direction == 'counterclockwise':
-                            mask.ctx.arc(center[0], center[1], radius,
-                                         angle1, angle2)
-                        else:
-                            mask.ctx.arc_negative(center[0], center[1], radius,
-                                                  angle1, angle2)
-                mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        ctx = self._mask_primitive(region)
+        if self.lod:
+            points = _simplify(_region_points(region, self.lod, self.scale[0]),
+                               self.lod)
+            ctx.move_to(*points[0])
+            for point in points[1:]:
+                ctx.line_to(*point)
+            ctx.fill()
+            return
+        ctx.move_to(*self.scale_point(region.primitives[0].start))
+        for prim in region.primitives:
+            if isinstance(prim, Line):
+                ctx.line_to(*self.scale_point(prim.end))
+            else:
+                center = self.scale_point(prim.center)
+                radius = self.scale[0] * prim.radius
+                angle1 = prim.start_angle
+                angle2 = prim.end_angle
+                if prim.direction == 'counterclockwise':
+                    ctx.arc(center[0], center[1], radius, angle1, angle2)
+                else:
+                    ctx.arc_negative(center[0], center[1], radius,
+                                     angle1, angle2)
+        ctx.fill()
 
     def _render_circle(self, circle, color):
         center = self.scale_point(circle.position)
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if (not self.invert)
-                                 and circle.level_polarity == 'dark'
-                              else cairo.OPERATOR_CLEAR)
-        with self._clip_primitive(circle):
-            with self._new_mask() as mask:
-                mask.ctx.set_line_width(0)
-                mask.ctx.arc(center[0], center[1], (circle.radius * self.scale[0]), 0, (2 * math.pi))
-                mask.ctx.fill()
-
-                if hasattr(circle, 'hole_diameter') and circle.hole_diameter is not None and circle.hole_diameter > 0:
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR)
-                    mask.ctx.arc(center[0], center[1], circle.hole_radius * self.scale[0], 0, 2 * math.pi)
-                    mask.ctx.fill()
-
-                if (hasattr(circle, 'hole_width') and hasattr(circle, 'hole_height')
-                        and circle.hole_width is not None and circle.hole_height is not None
-                        and circle.hole_width > 0 and circle.hole_height > 0):
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR
-                                          if circle.level_polarity == 'dark'
-                                             and (not self.invert)
-                                          else cairo.OPERATOR_OVER)
-                    width, height = self.scale_point((circle.hole_width, circle.hole_height))
-                    lower_left = rotate_point(
-                        (center[0] - width / 2.0, center[1] - height / 2.0),
-                                              circle.rotation, center)
-                    lower_right = rotate_point((center[0] + width / 2.0, center[1] - height / 2.0),
-                                               circle.rotation, center)
-                    upper_left = rotate_point((center[0] - width / 2.0, center[1] + height / 2.0),
-                                              circle.rotation, center)
-                    upper_right = rotate_point((center[0] + width / 2.0, center[1] + height / 2.0),
-                                               circle.rotation, center)
-                    points = (lower_left, lower_right, upper_right, upper_left)
-                    mask.ctx.move_to(*points[-1])
-                    for point in points:
-                        mask.ctx.line_to(*point)
-                    mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        ctx = self._mask_primitive(circle)
+        ctx.arc(center[0], center[1], (circle.radius * self.scale[0]), 0, (2 * math.pi))
+        ctx.fill()
+
+        if hasattr(circle, 'hole_diameter') and circle.hole_diameter is not None and circle.hole_diameter > 0:
+            ctx.set_operator(cairo.OPERATOR_CLEAR)
+            ctx.arc(center[0], center[1], circle.hole_radius * self.scale[0], 0, 2 * math.pi)
+            ctx.fill()
+
+        if (hasattr(circle, 'hole_width') and hasattr(circle, 'hole_height')
+                and circle.hole_width is not None and circle.hole_height is not None
+                and circle.hole_width > 0 and circle.hole_height > 0):
+            ctx.set_operator(cairo.OPERATOR_CLEAR
+                             if self._level_polarity(circle) == 'dark'
+                                and (not self.invert)
+                             else cairo.OPERATOR_OVER)
+            width, height = self.scale_point((circle.hole_width, circle.hole_height))
+            self._fill_hole_rectangle(ctx, center, width, height,
+                                      circle.rotation)
 
     def _render_rectangle(self, rectangle, color):
         lower_left = self.scale_point(rectangle.lower_left)
         width, height = tuple([abs(coord) for coord in
                                self.scale_point((rectangle.width,
                                                  rectangle.height))])
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if (not self.invert)
-                                 and rectangle.level_polarity == 'dark'
-                              else cairo.OPERATOR_CLEAR)
-        with self._clip_primitive(rectangle):
-            with self._new_mask() as mask:
-                mask.ctx.set_line_width(0)
-                mask.ctx.rectangle(lower_left[0], lower_left[1], width, height)
-                mask.ctx.fill()
-
-                center = self.scale_point(rectangle.position)
-                if rectangle.hole_diameter > 0:
-                    # Render the center clear
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR
-                                          if rectangle.level_polarity == 'dark'
-                                             and (not self.invert)
-                                          else cairo.OPERATOR_OVER)
-
-                    mask.ctx.arc(center[0], center[1], rectangle.hole_radius * self.scale[0], 0, 2 * math.pi)
-                    mask.ctx.fill()
-
-                if rectangle.hole_width > 0 and rectangle.hole_height > 0:
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR
-                                          if rectangle.level_polarity == 'dark'
-                                             and (not self.invert)
-                                          else cairo.OPERATOR_OVER)
-                    width, height = self.scale_point((rectangle.hole_width, rectangle.hole_height))
-                    lower_left = rotate_point((center[0] - width/2.0, center[1] - height/2.0), rectangle.rotation, center)
-                    lower_right = rotate_point((center[0] + width/2.0, center[1] - height/2.0), rectangle.rotation, center)
-                    upper_left = rotate_point((center[0] - width / 2.0, center[1] + height / 2.0), rectangle.rotation, center)
-                    upper_right = rotate_point((center[0] + width / 2.0, center[1] + height / 2.0), rectangle.rotation, center)
-                    points = (lower_left, lower_right, upper_right, upper_left)
-                    mask.ctx.move_to(*points[-1])
-                    for point in points:
-                        mask.ctx.line_to(*point)
-                    mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        ctx = self._mask_primitive(rectangle)
+        ctx.rectangle(lower_left[0], lower_left[1], width, height)
+        ctx.fill()
+
+        center = self.scale_point(rectangle.position)
+        if rectangle.hole_diameter > 0:
+            # Render the center clear
+            ctx.set_operator(cairo.OPERATOR_CLEAR
+                             if self._level_polarity(rectangle) == 'dark'
+                                and (not self.invert)
+                             else cairo.OPERATOR_OVER)
+
+            ctx.arc(center[0], center[1], rectangle.hole_radius * self.scale[0], 0, 2 * math.pi)
+            ctx.fill()
+
+        if rectangle.hole_width > 0 and rectangle.hole_height > 0:
+            ctx.set_operator(cairo.OPERATOR_CLEAR
+                             if self._level_polarity(rectangle) == 'dark'
+                                and (not self.invert)
+                             else cairo.OPERATOR_OVER)
+            width, height = self.scale_point((rectangle.hole_width, rectangle.hole_height))
+            self._fill_hole_rectangle(ctx, center, width, height,
+                                      rectangle.rotation)
 
     def _render_obround(self, obround, color):
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if (not self.invert)
-                                 and obround.level_polarity == 'dark'
-                              else cairo.OPERATOR_CLEAR)
-        with self._clip_primitive(obround):
-            with self._new_mask() as mask:
-                mask.ctx.set_line_width(0)
-
-                # Render circles
-                for circle in (obround.subshapes['circle1'], obround.subshapes['circle2']):
-                    center = self.scale_point(circle.position)
-                    mask.ctx.arc(center[0], center[1], (circle.radius * self.scale[0]), 0, (2 * math.pi))
-                    mask.ctx.fill()
-
-                # Render Rectangle
-                rectangle = obround.subshapes['rectangle']
-                lower_left = self.scale_point(rectangle.lower_left)
-                width, height = tuple([abs(coord) for coord in
-                                       self.scale_point((rectangle.width,
-                                                         rectangle.height))])
-                mask.ctx.rectangle(lower_left[0], lower_left[1], width, height)
-                mask.ctx.fill()
-
-                center = self.scale_point(obround.position)
-                if obround.hole_diameter > 0:
-                    # Render the center clear
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR)
-                    mask.ctx.arc(center[0], center[1], obround.hole_radius * self.scale[0], 0, 2 * math.pi)
-                    mask.ctx.fill()
-
-                if obround.hole_width > 0 and obround.hole_height > 0:
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR
-                                          if rectangle.level_polarity == 'dark'
-                                             and (not self.invert)
-                                          else cairo.OPERATOR_OVER)
-                    width, height =self.scale_point((obround.hole_width, obround.hole_height))
-                    lower_left = rotate_point((center[0] - width / 2.0, center[1] - height / 2.0),
-                                              obround.rotation, center)
-                    lower_right = rotate_point((center[0] + width / 2.0, center[1] - height / 2.0),
-                                               obround.rotation, center)
-                    upper_left = rotate_point((center[0] - width / 2.0, center[1] + height / 2.0),
-                                              obround.rotation, center)
-                    upper_right = rotate_point((center[0] + width / 2.0, center[1] + height / 2.0),
-                                               obround.rotation, center)
-                    points = (lower_left, lower_right, upper_right, upper_left)
-                    mask.ctx.move_to(*points[-1])
-                    for point in points:
-                        mask.ctx.line_to(*point)
-                    mask.ctx.fill()
-
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        ctx = self._mask_primitive(obround)
+
+        # Render circles
+        for circle in (obround.subshapes['circle1'], obround.subshapes['circle2']):
+            center = self.scale_point(circle.position)
+            ctx.arc(center[0], center[1], (circle.radius * self.scale[0]), 0, (2 * math.pi))
+            ctx.fill()
+
+        # Render Rectangle
+        rectangle = obround.subshapes['rectangle']
+        lower_left = self.scale_point(rectangle.lower_left)
+        width, height = tuple([abs(coord) for coord in
+                               self.scale_point((rectangle.width,
+                                                 rectangle.height))])
+        ctx.rectangle(lower_left[0], lower_left[1], width, height)
+        ctx.fill()
+
+        center = self.scale_point(obround.position)
+        if obround.hole_diameter > 0:
+            # Render the center clear
+            ctx.set_operator(cairo.OPERATOR_CLEAR)
+            ctx.arc(center[0], center[1], obround.hole_radius * self.scale[0], 0, 2 * math.pi)
+            ctx.fill()
+
+        if obround.hole_width > 0 and obround.hole_height > 0:
+            ctx.set_operator(cairo.OPERATOR_CLEAR
+                             if self._level_polarity(rectangle) == 'dark'
+                                and (not self.invert)
+                             else cairo.OPERATOR_OVER)
+            width, height = self.scale_point((obround.hole_width, obround.hole_height))
+            self._fill_hole_rectangle(ctx, center, width, height,
+                                      obround.rotation)
 
     def _render_polygon(self, polygon, color):
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if (not self.invert)
-                                 and polygon.level_polarity == 'dark'
-                              else cairo.OPERATOR_CLEAR)
-        with self._clip_primitive(polygon):
-            with self._new_mask() as mask:
-
-                vertices = polygon.vertices
-                mask.ctx.set_line_width(0)
-                mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-                # Start from before the end so it is easy to iterate and make sure
-                # it is closed
-                mask.ctx.move_to(*self.scale_point(vertices[-1]))
-                for v in vertices:
-                    mask.ctx.line_to(*self.scale_point(v))
-                mask.ctx.fill()
-
-                center = self.scale_point(polygon.position)
-                if polygon.hole_radius > 0:
-                    # Render the center clear
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR
-                                          if polygon.level_polarity == 'dark'
-                                             and (not self.invert)
-                                          else cairo.OPERATOR_OVER)
-                    mask.ctx.set_line_width(0)
-                    mask.ctx.arc(center[0],
-                                 center[1],
-                                 polygon.hole_radius * self.scale[0], 0, 2 * math.pi)
-                    mask.ctx.fill()
-
-                if polygon.hole_width > 0 and polygon.hole_height > 0:
-                    mask.ctx.set_operator(cairo.OPERATOR_CLEAR
-                                          if polygon.level_polarity == 'dark'
-                                             and (not self.invert)
-                                          else cairo.OPERATOR_OVER)
-                    width, height = self.scale_point((polygon.hole_width, polygon.hole_height))
-                    lower_left = rotate_point((center[0] - width / 2.0, center[1] - height / 2.0),
-                                              polygon.rotation, center)
-                    lower_right = rotate_point((center[0] + width / 2.0, center[1] - height / 2.0),
-                                               polygon.rotation, center)
-                    upper_left = rotate_point((center[0] - width / 2.0, center[1] + height / 2.0),
-                                              polygon.rotation, center)
-                    upper_right = rotate_point((center[0] + width / 2.0, center[1] + height / 2.0),
-                                               polygon.rotation, center)
-                    points = (lower_left, lower_right, upper_right, upper_left)
-                    mask.ctx.move_to(*points[-1])
-                    for point in points:
-                        mask.ctx.line_to(*point)
-                    mask.ctx.fill()
-
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        ctx = self._mask_primitive(polygon)
+
+        vertices = polygon.vertices
+        # Start from before the end so it is easy to iterate and make sure
+        # it is closed
+        ctx.move_to(*self.scale_point(vertices[-1]))
+        for v in vertices:
+            ctx.line_to(*self.scale_point(v))
+        ctx.fill()
+
+        center = self.scale_point(polygon.position)
+        if polygon.hole_radius > 0:
+            # Render the center clear
+            ctx.set_operator(cairo.OPERATOR_CLEAR
+                             if self._level_polarity(polygon) == 'dark'
+                                and (not self.invert)
+                             else cairo.OPERATOR_OVER)
+            ctx.arc(center[0],
+                    center[1],
+                    polygon.hole_radius * self.scale[0], 0, 2 * math.pi)
+            ctx.fill()
+
+        if polygon.hole_width > 0 and polygon.hole_height > 0:
+            ctx.set_operator(cairo.OPERATOR_CLEAR
+                             if self._level_polarity(polygon) == 'dark'
+                                and (not self.invert)
+                             else cairo.OPERATOR_OVER)
+            width, height = self.scale_point((polygon.hole_width, polygon.hole_height))
+            self._fill_hole_rectangle(ctx, center, width, height,
+                                      polygon.rotation)
+
+    def _fill_hole_rectangle(self, ctx, center, width, height, rotation):
+        lower_left = rotate_point((center[0] - width / 2.0, center[1] - height / 2.0),
+                                  rotation, center)
+        lower_right = rotate_point((center[0] + width / 2.0, center[1] - height / 2.0),
+                                   rotation, center)
+        upper_left = rotate_point((center[0] - width / 2.0, center[1] + height / 2.0),
+                                  rotation, center)
+        upper_right = rotate_point((center[0] + width / 2.0, center[1] + height / 2.0),
+                                   rotation, center)
+        points = (lower_left, lower_right, upper_right, upper_left)
+        ctx.move_to(*points[-1])
+        for point in points:
+            ctx.line_to(*point)
+        ctx.fill()
 
     def _render_drill(self, circle, color=None):
         color = color if color is not None else self.drill_color
         self._render_circle(circle, color)
 
     def _render_slot(self, slot, color):
-        start = map(mul, slot.start, self.scale)
-        end = map(mul, slot.end, self.scale)
+        start = tuple(map(mul, slot.start, self.scale))
+        end = tuple(map(mul, slot.end, self.scale))
 
         width = slot.diameter
 
-        self.ctx.set_operator(cairo.OPERATOR_OVER
-                              if slot.level_polarity == 'dark' and
-                                 (not self.invert) else cairo.OPERATOR_CLEAR)
-        with self._clip_primitive(slot):
-            with self._new_mask() as mask:
-                mask.ctx.set_line_width(width * self.scale[0])
-                mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-                mask.ctx.move_to(*start)
-                mask.ctx.line_to(*end)
-                mask.ctx.stroke()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
+        ctx = self._mask_primitive(
+            slot, stroke=(width * self.scale[0], cairo.LINE_CAP_ROUND))
+        ctx.move_to(*start)
+        ctx.line_to(*end)
+
+    def _render_flash(self, flash, color):
+        if self._sprite_run is not None:
+            return super(GerberCairoContext, self)._render_flash(flash, color)
+        if not self.raster:
+            # Draw the shared aperture offset to the flash position, rather
+            # than a positioned copy of it
+            aperture = flash.aperture
+            offset, polarity = self._offset, self._polarity
+            dx, dy = flash._aperture_offset
+            self._offset = (offset[0] + dx, offset[1] + dy)
+            if not isinstance(aperture, AMGroup):
+                self._polarity = flash.level_polarity
+            try:
+                self.render(aperture)
+            finally:
+                self._offset, self._polarity = offset, polarity
+            return
+
+        # Split the flash's offset on the mask into whole pixels and a
+        # sub-pixel phase, which is rounded so that the sprite can be reused
+        x, y = self.scale_point(flash.position)
+        x -= self.origin_in_pixels[0]
+        y -= self.origin_in_pixels[1]
+        phase_x = int(round((x - math.floor(x)) * _SPRITE_SUBPIXELS))
+        phase_y = int(round((y - math.floor(y)) * _SPRITE_SUBPIXELS))
+        key = (id(flash.aperture), flash.level_polarity, self.invert,
+               self.scale, phase_x, phase_y)
+        sprite = self._sprites.pop(key, None)
+        if sprite is None:
+            sprite = self._new_sprite(flash, float(phase_x) / _SPRITE_SUBPIXELS,
+                                      float(phase_y) / _SPRITE_SUBPIXELS)
+        self._sprites[key] = sprite
+        while len(self._sprites) > self.sprite_cache_size:
+            self._sprites.popitem(last=False)
+
+        surface, offset = sprite[1:]
+        ctx = self._mask_primitive(flash)
+        # The mask context is shared with the rest of the run, so put its
+        # source back once the sprite is stamped
+        ctx.save()
+        ctx.set_source_surface(surface,
+                               math.floor(x) + offset[0] + self.origin_in_pixels[0],
+                               math.floor(y) + offset[1] + self.origin_in_pixels[1])
+        ctx.paint()
+        ctx.restore()
+
+    def _new_sprite(self, flash, phase_x, phase_y):
+        """ Draw a flashed aperture on a surface of its own
+
+        The aperture is drawn with the flash's polarity, offset by
+        (`phase_x`, `phase_y`) pixels from a whole pixel position.
+
+        Returns
+        -------
+        sprite : tuple
+            (aperture, surface, offset): the aperture, kept alive so that its
+            id is not reused, the sprite surface and the position of the
+            sprite's top left corner relative to the flash, in whole pixels.
+        """
+        aperture = flash.aperture
+        (xmin, xmax), (ymin, ymax) = aperture.bounding_box
+        origin = aperture.position or (0, 0)
+        xmin, ymin = self.scale_point((xmin - origin[0], ymin - origin[1]))
+        xmax, ymax = self.scale_point((xmax - origin[0], ymax - origin[1]))
+        # Leave a margin for antialiasing
+        left = int(math.floor(xmin)) - 2
+        top = int(math.floor(ymin)) - 2
+        width = int(math.ceil(xmax)) + 3 - left
+        height = int(math.ceil(ymax)) + 3 - top
+
+        primitive = flash.to_primitive()
+        x, y = self.scale_point(primitive.position)
+        surface = cairo.ImageSurface(cairo.FORMAT_A8, width, height)
+        self._sprite_run = _MaskRun(None, (x - phase_x + left, y - phase_y + top),
+                                    cairo.OPERATOR_OVER, surface=surface)
+        try:
+            self.render(primitive)
+            self._sprite_run.end_stroke()
+        finally:
+            self._sprite_run = None
+        surface.flush()
+        return (aperture, surface, (left, top))
 
     def _render_amgroup(self, amgroup, color):
-        for primitive in amgroup.primitives:
-            self.render(primitive)
+        self.render_many(amgroup.primitives)
 
     def _render_test_record(self, primitive, color):
         position = [pos + origin for pos, origin in
@@ -522,6 +779,7 @@ class GerberCairoContext(GerberContext):
             'monospace', cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
         self.ctx.set_font_size(13)
         self._render_circle(Circle(position, 0.015), color)
+        self._flush_mask()
         self.ctx.set_operator(cairo.OPERATOR_OVER
                               if primitive.level_polarity == 'dark' and
                               (not self.invert) else cairo.OPERATOR_CLEAR)
@@ -532,32 +790,56 @@ class GerberCairoContext(GerberContext):
 
     def _new_render_layer(self, color=None, mirror=False):
         size_in_pixels = self.scale_point(self.size_in_inch)
-        matrix = copy.copy(self._xform_matrix)
-        layer = cairo.SVGSurface(None, size_in_pixels[0], size_in_pixels[1])
-        ctx = cairo.Context(layer)
+        matrix = self._layer_matrix(mirror)
+        if self.raster:
+            # Reuse the layer bitmap of the previous layer, if any
+            if self._layer_surface is None:
+                self._layer_surface = self._new_surface(size_in_pixels)
+            layer = self._layer_surface
+            ctx = cairo.Context(layer)
+            ctx.set_operator(cairo.OPERATOR_CLEAR)
+            ctx.paint()
+        else:
+            layer = self._new_surface(size_in_pixels)
+            ctx = cairo.Context(layer)
 
         if self.invert:
             ctx.set_source_rgba(0.0, 0.0, 0.0, 1.0)
             ctx.set_operator(cairo.OPERATOR_OVER)
             ctx.paint()
-        if mirror:
-            matrix.xx = -1.0
-            matrix.x0 = self.origin_in_pixels[0] + self.size_in_pixels[0]
         self.ctx = ctx
         self.ctx.set_matrix(matrix)
         self.active_layer = layer
         self.active_matrix = matrix
+        if self.window is not None:
+            # The part of the mask needed depends on the layer's matrix
+            self._mask_surface = None
 
 
+    def _layer_matrix(self, mirror=False):
+        """ Matrix mapping scaled board coordinates to image pixels
+        """
+        matrix = copy.copy(self._xform_matrix)
+        if mirror:
+            matrix.xx = -1.0
+            matrix.x0 = self.origin_in_pixels[0] + self.size_in_pixels[0]
+        return matrix
+
     def _flatten(self, color=None, alpha=None):
-        color = color if color is not None else self.color
-        alpha = alpha if alpha is not None else self.alpha
-        self.output_ctx.set_source_rgba(color[0], color[1], color[2], alpha)
-        self.output_ctx.mask_surface(self.active_layer)
+        self._flush_mask()
+        self._composite(self.active_layer, color, alpha)
         self.ctx = None
         self.active_layer = None
         self.active_matrix = None
 
+    def _composite(self, layer, color=None, alpha=None):
+        """ Paint the output with `color` through the `layer` mask
+        """
+        color = color if color is not None else self.color
+        alpha = alpha if alpha is not None else self.alpha
+        self.output_ctx.set_source_rgba(color[0], color[1], color[2], alpha)
+        self.output_ctx.mask_surface(layer)
+
     def _paint_background(self, settings=None):
         color = settings.color if settings is not None else self.background_color
         alpha = settings.alpha if settings is not None else 1.0
@@ -567,13 +849,20 @@ class GerberCairoContext(GerberContext):
             self.output_ctx.paint()
 
     def _clip_primitive(self, primitive):
+        """ Clip rendering context to the primitive's pixel-aligned bounding box
+
+        See :meth:`_clip_bounds`.
+        """
+        return self._clip_bounds(primitive.bounding_box)
+
+    def _clip_bounds(self, bounds):
         """ Clip rendering context to pixel-aligned bounding box
 
         Calculates pixel- and axis- aligned bounding box, and clips current
         context to that region. Improves rendering speed significantly. This
         returns a context manager, use as follows:
 
-            with self._clip_primitive(some_primitive):
+            with self._clip_bounds(some_primitive.bounding_box):
                 do_rendering_stuff()
                 do_more_rendering stuff(with, arguments)
 
@@ -582,8 +871,8 @@ class GerberCairoContext(GerberContext):
 
         """
         class Clip:
-            def __init__(clp, primitive):
-                x_range, y_range = primitive.bounding_box
+            def __init__(clp, bounds):
+                x_range, y_range = bounds
                 xmin, xmax = x_range
                 ymin, ymax = y_range
 
@@ -611,7 +900,202 @@ class GerberCairoContext(GerberContext):
                 # Reset context clip region
                 self.ctx.reset_clip()
 
-        return Clip(primitive)
+        return Clip(bounds)
 
     def scale_point(self, point):
         return tuple([coord * scale for coord, scale in zip(point, self.scale)])
+
+
+class LayerCache(object):
+    """ Size-bounded in-memory cache of rendered layer masks
+
+    Layers are identified by their list of primitives and the version of
+    their source file, so a file that is offset, converted or transformed in
+    place is rendered again. After editing primitives directly, call the
+    file's `invalidate_spatial_index` (or :meth:`clear` the cache).
+    When the masks take more than `max_size` bytes, the least recently used
+    ones are dropped.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum total size of the cached masks in bytes.
+    """
+
+    def __init__(self, max_size=128 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """ Return the mask cached under key, or None if there is none
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        # Mark the entry as recently used
+        self._entries[key] = entry
+        return entry[0]
+
+    def put(self, key, mask, owner=None):
+        """ Store `mask` under key
+
+        `owner` is kept alive along with the mask, so that the id it is
+        keyed by cannot be reused by another object.
+        """
+        mask_size = mask.get_stride() * mask.get_height()
+        if mask_size > self.max_size:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[2]
+        self._entries[key] = (mask, owner, mask_size)
+        self.size += mask_size
+        while self.size > self.max_size:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.size -= size
+
+    def clear(self):
+        """ Remove every cached mask
+        """
+        self._entries.clear()
+        self.size = 0
+
+
+# Sub-pixel positions a flashed aperture's sprite is drawn at, per axis
+_SPRITE_SUBPIXELS = 16
+
+
+
+def _simplify(points, tolerance):
+    """ Drop the points closer than `tolerance` to the last point kept
+
+    The first and last points are always kept.
+    """
+    if len(points) < 3:
+        return points
+    tolerance_sq = tolerance * tolerance
+    simplified = [points[0]]
+    last_x, last_y = points[0]
+    for x, y in points[1:-1]:
+        if (x - last_x) ** 2 + (y - last_y) ** 2 >= tolerance_sq:
+            simplified.append((x, y))
+            last_x, last_y = x, y
+    simplified.append(points[-1])
+    return simplified
+
+
+def _is_svg(filename):
+    """ Check whether `filename` names an SVG file
+    """
+    try:
+        return os.path.splitext(filename.lower())[1] == '.svg'
+    except AttributeError:
+        return False
+
+
+def _image_size(size_in_pixels):
+    """ Round a (width, height) size in pixels up to whole pixels
+    """
+    return tuple(max(int(math.ceil(dim)), 1) for dim in size_in_pixels)
+
+
+def _has_hole(primitive):
+    """ Check whether a flashed primitive has a hole cut out of it
+    """
+    hole_diameter = getattr(primitive, 'hole_diameter', None)
+    if hole_diameter is not None and hole_diameter > 0:
+        return True
+    hole_width = getattr(primitive, 'hole_width', None)
+    hole_height = getattr(primitive, 'hole_height', None)
+    return (hole_width is not None and hole_height is not None
+            and hole_width > 0 and hole_height > 0)
+
+
+class _MaskRun(object):
+    """ Mask surface shared by a run of same-polarity primitives
+
+    Parameters
+    ----------
+    size : tuple
+        Mask (width, height) in pixels
+
+    origin : tuple
+        Board origin in pixels
+
+    operator : int
+        Cairo operator used to composite the mask onto the layer
+
+    isolated : bool
+        If True, no further primitives may be added to this run
+
+    surface : cairo.Surface <optional>
+        Blank surface to draw the mask on. It is cleared again when the run
+        is closed, so that it can be reused. If not given, a new SVG surface
+        is created and finished when the run is closed.
+    """
+
+    def __init__(self, size, origin, operator, isolated=False, surface=None):
+        self.owns_surface = surface is None
+        if surface is None:
+            surface = cairo.SVGSurface(None, size[0], size[1])
+        self.surface = surface
+        self.ctx = cairo.Context(self.surface)
+        self.ctx.translate(-origin[0], -origin[1])
+        self.operator = operator
+        self.isolated = isolated
+        self.bounds = None
+        self.stroke = None
+        self.pixels = set()
+        # Translation of the context, in pixels
+        self.offset = (0.0, 0.0)
+
+    def add(self, bounds):
+        """ Grow the run's bounding box to include `bounds`
+        """
+        if self.bounds is None:
+            self.bounds = bounds
+        else:
+            (xmin, xmax), (ymin, ymax) = self.bounds
+            self.bounds = ((min(xmin, bounds[0][0]), max(xmax, bounds[0][1])),
+                           (min(ymin, bounds[1][0]), max(ymax, bounds[1][1])))
+
+    def set_offset(self, offset):
+        """ Translate what is drawn next by `offset` pixels
+
+        Paths already drawn keep their position, as cairo stores them in
+        device space.
+        """
+        if offset != self.offset:
+            self.ctx.translate(offset[0] - self.offset[0],
+                               offset[1] - self.offset[1])
+            self.offset = offset
+
+    def set_stroke(self, width, cap):
+        """ Start or continue a path stroked with the given width and cap
+        """
+        if self.stroke != (width, cap):
+            self.end_stroke()
+            self.ctx.set_line_width(width)
+            self.ctx.set_line_cap(cap)
+            self.stroke = (width, cap)
+
+    def end_stroke(self):
+        """ Stroke the accumulated path, if any
+        """
+        if self.stroke is not None:
+            self.ctx.stroke()
+            self.stroke = None
+
+    def close(self):
+        """ Release the mask surface once it has been composited
+        """
+        if self.owns_surface:
+            if hasattr(self.surface, 'finish'):
+                self.surface.finish()
+        else:
+            self.ctx.set_operator(cairo.OPERATOR_CLEAR)
+            self.ctx.paint()
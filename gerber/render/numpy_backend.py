@@ -0,0 +1,409 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+NumPy rendering
+===============
+**Cairo-free raster backend**
+
+Rasterizes primitives into NumPy boolean masks, one layer at a time, and
+composites the layers into an RGB image. Every pixel is either in or out of
+a primitive (no antialiasing), which makes the masks suitable for image
+diffs and design rule checks.
+"""
+
+import math
+
+import numpy as np
+
+from .render import (GerberContext, RenderSettings, _arc_sweep,
+                     _layers_bounds, _region_points)
+from .theme import THEMES
+from .png import write_png
+from ..primitives import *
+from ..utils import rotate_point
+
+
+class GerberNumpyContext(GerberContext):
+    """ NumPy rendering context
+
+    Parameters
+    ----------
+    scale : int
+        Rendering scale in pixels per unit
+
+    Attributes
+    ----------
+    image : numpy.ndarray
+        (height, width, 3) float array of the composited RGB image, with
+        values between 0.0 and 1.0
+
+    mask : numpy.ndarray
+        (height, width) boolean mask of the layer being rendered, or of the
+        last rendered layer once it has been composited. Row 0 is the top of
+        the board.
+    """
+
+    def __init__(self, scale=300):
+        super(GerberNumpyContext, self).__init__()
+        self.scale = (scale, scale)
+        self.image = None
+        self.mask = None
+        self.origin_in_inch = None
+        self.size_in_inch = None
+        self.mirror = False
+        self._render_count = 0
+        # Offset and polarity of the flash being rendered, if any
+        self._offset = (0.0, 0.0)
+        self._polarity = None
+
+    @property
+    def size_in_pixels(self):
+        if self.size_in_inch is None:
+            return (0, 0)
+        return tuple(max(int(math.ceil(size * scale)), 1)
+                     for size, scale in zip(self.size_in_inch, self.scale))
+
+    def set_bounds(self, bounds, new_surface=False):
+        origin_in_inch = (bounds[0][0], bounds[1][0])
+        size_in_inch = (abs(bounds[0][1] - bounds[0][0]),
+                        abs(bounds[1][1] - bounds[1][0]))
+        self.origin_in_inch = origin_in_inch if self.origin_in_inch is None else self.origin_in_inch
+        self.size_in_inch = size_in_inch if self.size_in_inch is None else self.size_in_inch
+        if (self.image is None) or new_surface:
+            width, height = self.size_in_pixels
+            self.image = np.zeros((height, width, 3))
+
+    def render_layer(self, layer, filename=None, settings=None, bgsettings=None,
+                     verbose=False, bounds=None):
+        if settings is None:
+            settings = THEMES['default'].get(layer.layer_class, RenderSettings())
+        if bgsettings is None:
+            bgsettings = THEMES['default'].get('background', RenderSettings())
+
+        if self._render_count == 0:
+            if verbose:
+                print('[Render]: Rendering Background.')
+            self.clear()
+            if bounds is not None:
+                self.set_bounds(bounds)
+            else:
+                self.set_bounds(layer.bounds)
+            self._paint_background(bgsettings)
+        if verbose:
+            print('[Render]: Rendering {} Layer.'.format(layer.layer_class))
+        self._render_count += 1
+        self._render_layer(layer, settings)
+        if filename is not None:
+            self.dump(filename, verbose)
+
+    def render_layers(self, layers, filename, theme=THEMES['default'],
+                      verbose=False, max_width=800, max_height=600):
+        """ Render a set of layers
+        """
+        # Calculate scale parameter
+        x_range, y_range = _layers_bounds(layers)
+        width = x_range[1] - x_range[0]
+        height = y_range[1] - y_range[0]
+
+        scale = math.floor(min(float(max_width)/width, float(max_height)/height))
+        self.scale = (scale, scale)
+
+        self.clear()
+
+        # Render layers
+        bgsettings = theme['background']
+        for layer in layers:
+            settings = theme.get(layer.layer_class, RenderSettings())
+            self.render_layer(layer, settings=settings, bgsettings=bgsettings,
+                              verbose=verbose)
+        self.dump(filename, verbose)
+
+    def dump(self, filename=None, verbose=False):
+        """ Save image as PNG file `filename`
+        """
+        if verbose:
+            print('[Render]: Writing image to {}'.format(filename))
+        write_png(filename, self.pixels())
+
+    def dump_str(self):
+        """ Return a byte-string containing the rendered image.
+        """
+        from io import BytesIO
+        fobj = BytesIO()
+        write_png(fobj, self.pixels())
+        return fobj.getvalue()
+
+    def pixels(self):
+        """ Return the image as a (height, width, 3) uint8 array
+        """
+        return np.round(np.clip(self.image, 0.0, 1.0) * 255).astype(np.uint8)
+
+    def clear(self):
+        self.image = None
+        self.mask = None
+        self.origin_in_inch = None
+        self.size_in_inch = None
+        self._render_count = 0
+
+    def _render_layer(self, layer, settings):
+        self.invert = settings.invert
+        self._new_render_layer(mirror=settings.mirror)
+        self.render_many(layer.primitives)
+        self._flatten(settings.color, settings.alpha)
+
+    def _new_render_layer(self, color=None, mirror=False):
+        width, height = self.size_in_pixels
+        self.mask = np.zeros((height, width), dtype=bool)
+        if self.invert:
+            self.mask[:] = True
+        self.mirror = mirror
+
+    def _flatten(self, color=None, alpha=None):
+        color = color if color is not None else self.color
+        alpha = alpha if alpha is not None else self.alpha
+        covered = self.image[self.mask]
+        self.image[self.mask] = (covered * (1.0 - alpha)
+                                 + np.asarray(color) * alpha)
+
+    def _paint_background(self, settings=None):
+        color = settings.color if settings is not None else self.background_color
+        alpha = settings.alpha if settings is not None else 1.0
+        self.image[:] = self.image * (1.0 - alpha) + np.asarray(color) * alpha
+
+    def _window(self, bounds):
+        """ Pixels of the image covering `bounds`
+
+        Returns
+        -------
+        window : tuple
+            (rows, cols, x, y): the row and column slices of the image, and the
+            board coordinates of the centers of the window's columns and rows,
+            relative to the current offset. None if `bounds` is outside the
+            image.
+        """
+        (xmin, xmax), (ymin, ymax) = bounds
+        dx, dy = self._offset
+        ox, oy = self.origin_in_inch
+        sx, sy = self.size_in_inch
+        scale_x, scale_y = self.scale
+        width, height = self.size_in_pixels
+        if self.mirror:
+            col0 = (ox + sx - (xmax + dx)) * scale_x
+            col1 = (ox + sx - (xmin + dx)) * scale_x
+        else:
+            col0 = (xmin + dx - ox) * scale_x
+            col1 = (xmax + dx - ox) * scale_x
+        row0 = (oy + sy - (ymax + dy)) * scale_y
+        row1 = (oy + sy - (ymin + dy)) * scale_y
+        col0 = max(int(math.floor(col0)), 0)
+        col1 = min(int(math.ceil(col1)), width)
+        row0 = max(int(math.floor(row0)), 0)
+        row1 = min(int(math.ceil(row1)), height)
+        if col0 >= col1 or row0 >= row1:
+            return None
+        cols = (np.arange(col0, col1) + 0.5) / scale_x
+        x = (ox + sx - cols if self.mirror else ox + cols) - dx
+        y = oy + sy - (np.arange(row0, row1) + 0.5) / scale_y - dy
+        return slice(row0, row1), slice(col0, col1), x, y
+
+    def _draw(self, primitive, inside, bounds=None):
+        """ Draw the shape `inside(x, y)` of `primitive` on the layer mask
+
+        `inside` is called with the board coordinates of the window's column
+        and row centers and returns a (rows, cols) boolean array.
+        """
+        window = self._window(bounds if bounds is not None
+                              else primitive.bounding_box)
+        if window is None:
+            return
+        rows, cols, x, y = window
+        covered = inside(x, y)
+        polarity = (self._polarity if self._polarity is not None
+                    else primitive.level_polarity)
+        if polarity == 'dark' and not self.invert:
+            self.mask[rows, cols] |= covered
+        else:
+            self.mask[rows, cols] &= ~covered
+
+    def _render_line(self, line, color):
+        if isinstance(line.aperture, Circle):
+            radius = line.aperture.diameter / 2.0
+            self._draw(line, lambda x, y: _in_capsule(x, y, line.start,
+                                                      line.end, radius))
+        elif hasattr(line, 'vertices') and line.vertices is not None:
+            vertices = line.vertices
+            self._draw(line, lambda x, y: _in_polygon(x, y, vertices))
+
+    def _render_arc(self, arc, color):
+        if isinstance(arc.aperture, Circle):
+            width = arc.aperture.diameter if arc.aperture.diameter != 0 else 0.001
+        else:
+            width = max(arc.aperture.width, arc.aperture.height, 0.001)
+        sweep = _arc_sweep(arc)
+        self._draw(arc, lambda x, y: _in_arc(x, y, arc.center, arc.radius,
+                                             arc.start_angle, sweep,
+                                             width / 2.0))
+
+    def _render_region(self, region, color):
+        points = _region_points(region, 0.25 / self.scale[0])
+        self._draw(region, lambda x, y: _in_polygon(x, y, points))
+
+    def _render_circle(self, circle, color):
+        def inside(x, y):
+            covered = _in_circle(x, y, circle.position, circle.radius)
+            return covered & ~_in_hole(x, y, circle)
+        self._draw(circle, inside)
+
+    def _render_rectangle(self, rectangle, color):
+        def inside(x, y):
+            (xmin, ymin), (xmax, ymax) = rectangle.lower_left, rectangle.upper_right
+            covered = (((x >= xmin) & (x <= xmax))[np.newaxis, :]
+                       & ((y >= ymin) & (y <= ymax))[:, np.newaxis])
+            return covered & ~_in_hole(x, y, rectangle)
+        self._draw(rectangle, inside)
+
+    def _render_obround(self, obround, color):
+        def inside(x, y):
+            rectangle = obround.subshapes['rectangle']
+            (xmin, ymin), (xmax, ymax) = rectangle.lower_left, rectangle.upper_right
+            covered = (((x >= xmin) & (x <= xmax))[np.newaxis, :]
+                       & ((y >= ymin) & (y <= ymax))[:, np.newaxis])
+            for circle in (obround.subshapes['circle1'],
+                           obround.subshapes['circle2']):
+                covered |= _in_circle(x, y, circle.position, circle.radius)
+            return covered & ~_in_hole(x, y, obround)
+        self._draw(obround, inside)
+
+    def _render_polygon(self, polygon, color):
+        def inside(x, y):
+            covered = _in_polygon(x, y, polygon.vertices)
+            return covered & ~_in_hole(x, y, polygon)
+        self._draw(polygon, inside)
+
+    def _render_drill(self, circle, color=None):
+        self._render_circle(circle, color)
+
+    def _render_slot(self, slot, color):
+        radius = slot.diameter / 2.0
+        self._draw(slot, lambda x, y: _in_capsule(x, y, slot.start, slot.end,
+                                                  radius))
+
+    def _render_amgroup(self, amgroup, color):
+        self.render_many(amgroup.primitives)
+
+    def _render_flash(self, flash, color):
+        # Draw the shared aperture in place, offset to the flash position,
+        # rather than a positioned copy of it
+        aperture = flash.aperture
+        offset, polarity = self._offset, self._polarity
+        dx, dy = flash._aperture_offset
+        self._offset = (offset[0] + dx, offset[1] + dy)
+        if not isinstance(aperture, AMGroup):
+            self._polarity = flash.level_polarity
+        try:
+            self.render(aperture)
+        finally:
+            self._offset, self._polarity = offset, polarity
+
+
+def _in_circle(x, y, center, radius):
+    dx = (x - center[0])[np.newaxis, :]
+    dy = (y - center[1])[:, np.newaxis]
+    return dx * dx + dy * dy <= radius * radius
+
+
+def _in_capsule(x, y, start, end, radius):
+    """ Points within `radius` of the segment from `start` to `end`
+    """
+    px = (x - start[0])[np.newaxis, :]
+    py = (y - start[1])[:, np.newaxis]
+    vx, vy = end[0] - start[0], end[1] - start[1]
+    length_sq = vx * vx + vy * vy
+    if length_sq == 0:
+        return px * px + py * py <= radius * radius
+    t = np.clip((px * vx + py * vy) / length_sq, 0.0, 1.0)
+    dx = px - t * vx
+    dy = py - t * vy
+    return dx * dx + dy * dy <= radius * radius
+
+
+def _in_arc(x, y, center, radius, start_angle, sweep, half_width):
+    """ Points within `half_width` of an arc, with round ends
+    """
+    px = (x - center[0])[np.newaxis, :]
+    py = (y - center[1])[:, np.newaxis]
+    distance = np.sqrt(px * px + py * py)
+    # Angle of each point from the start of the arc, in the arc's direction
+    angle = np.arctan2(py, px) - start_angle
+    if sweep < 0:
+        angle = -angle
+    angle = np.mod(angle, 2 * math.pi)
+    covered = (angle <= abs(sweep)) & (np.abs(distance - radius) <= half_width)
+    end_angle = start_angle + sweep
+    for angle in (start_angle, end_angle):
+        end = (center[0] + radius * math.cos(angle),
+               center[1] + radius * math.sin(angle))
+        covered |= _in_circle(x, y, end, half_width)
+    return covered
+
+
+def _in_polygon(x, y, vertices):
+    """ Points inside a polygon, using the nonzero winding rule
+
+    Scans the rows one at a time: the crossings of every edge with the row
+    are computed at once and sorted, and the winding number of each pixel is
+    looked up from the running sum of the crossing directions.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    start = vertices
+    end = np.roll(vertices, -1, axis=0)
+    x0, y0 = start[:, 0], start[:, 1]
+    x1, y1 = end[:, 0], end[:, 1]
+    direction = np.where(y1 > y0, 1, -1)
+    covered = np.zeros((len(y), len(x)), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (x1 - x0) / (y1 - y0)
+    for row, row_y in enumerate(y):
+        crossing = (y0 <= row_y) != (y1 <= row_y)
+        if not crossing.any():
+            continue
+        xs = x0[crossing] + (row_y - y0[crossing]) * slope[crossing]
+        order = np.argsort(xs)
+        winding = np.concatenate(([0], np.cumsum(direction[crossing][order])))
+        covered[row] = winding[np.searchsorted(xs[order], x)] != 0
+    return covered
+
+
+def _in_hole(x, y, primitive):
+    """ Points inside the hole of a flashed primitive
+    """
+    covered = np.zeros((len(y), len(x)), dtype=bool)
+    hole_diameter = getattr(primitive, 'hole_diameter', None)
+    if hole_diameter is not None and hole_diameter > 0:
+        covered |= _in_circle(x, y, primitive.position, hole_diameter / 2.0)
+    hole_width = getattr(primitive, 'hole_width', None)
+    hole_height = getattr(primitive, 'hole_height', None)
+    if (hole_width is not None and hole_height is not None
+            and hole_width > 0 and hole_height > 0):
+        cx, cy = primitive.position
+        corners = [(cx - hole_width / 2.0, cy - hole_height / 2.0),
+                   (cx + hole_width / 2.0, cy - hole_height / 2.0),
+                   (cx + hole_width / 2.0, cy + hole_height / 2.0),
+                   (cx - hole_width / 2.0, cy + hole_height / 2.0)]
+        corners = [rotate_point(corner, primitive.rotation, (cx, cy))
+                   for corner in corners]
+        covered |= _in_polygon(x, y, corners)
+    return covered
+
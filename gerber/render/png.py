@@ -0,0 +1,108 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+PNG output
+==========
+**Minimal streaming PNG encoder**
+
+Writes 8-bit grayscale, RGB or RGBA images from NumPy arrays, one band of
+rows at a time, without depending on cairo.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+# PNG color type for each number of channels
+_COLOR_TYPES = {1: 0, 3: 2, 4: 6}
+
+
+class PNGWriter(object):
+    """ Write a PNG image row by row
+
+    Parameters
+    ----------
+    filename : string or file
+        File to write
+
+    width, height : int
+        Image size in pixels
+
+    channels : int
+        1 for grayscale, 3 for RGB or 4 for RGBA
+    """
+
+    def __init__(self, filename, width, height, channels=4):
+        if channels not in _COLOR_TYPES:
+            raise ValueError('PNG images have 1, 3 or 4 channels')
+        if hasattr(filename, 'write'):
+            self.file = filename
+            self.owns_file = False
+        else:
+            self.file = open(filename, 'wb')
+            self.owns_file = True
+        self.channels = channels
+        self.compressor = zlib.compressobj()
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8,
+                                         _COLOR_TYPES[channels], 0, 0, 0))
+
+    def write_rows(self, rows):
+        """ Append rows of pixels
+
+        `rows` is a (height, width, channels) uint8 array, or a
+        (height, width) array for grayscale images.
+        """
+        rows = np.asarray(rows, dtype=np.uint8)
+        # Prefix every row with filter type 0 (none)
+        filtered = np.zeros((rows.shape[0], rows.shape[1] * self.channels + 1),
+                            dtype=np.uint8)
+        filtered[:, 1:] = rows.reshape(rows.shape[0], -1)
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+
+    def close(self):
+        self._chunk(b'IDAT', self.compressor.flush())
+        self._chunk(b'IEND', b'')
+        if self.owns_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.owns_file:
+            self.file.close()
+
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(kind + data)
+                                    & 0xffffffff))
+
+
+def write_png(filename, pixels):
+    """ Write a whole image, a (height, width[, channels]) uint8 array
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    channels = pixels.shape[2] if pixels.ndim == 3 else 1
+    with PNGWriter(filename, pixels.shape[1], pixels.shape[0],
+                   channels) as png:
+        png.write_rows(pixels)
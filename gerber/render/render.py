@@ -24,6 +24,7 @@ Render Gerber and Excellon files to a variety of formats. The render module
 currently supports SVG rendering using the `svgwrite` library.
 """
 
+import math
 
 from ..primitives import *
 from ..gerber_statements import (CommentStmt, UnknownStmt, EofStmt, ParamStmt,
@@ -31,6 +32,11 @@ from ..gerber_statements import (CommentStmt, UnknownStmt, EofStmt, ParamStmt,
                                  QuadrantModeStmt,)
 
 
+# Dispatch tables of each context class, mapping primitive classes to their
+# renderer. Cleared whenever a renderer is registered.
+_DISPATCH_CACHE = {}
+
+
 class GerberContext(object):
     """ Gerber rendering context base class
 
@@ -57,8 +63,27 @@ class GerberContext(object):
 
     alpha : float
         Rendering opacity. Between 0.0 (transparent) and 1.0 (opaque.)
+
+    Primitives are rendered by the renderer registered for their class, or
+    for the nearest base class that has one. See :meth:`register_renderer`.
     """
 
+    _renderers = {
+        Line: '_render_line',
+        Arc: '_render_arc',
+        Region: '_render_region',
+        Circle: '_render_circle',
+        Rectangle: '_render_rectangle',
+        Obround: '_render_obround',
+        Polygon: '_render_polygon',
+        Drill: '_render_drill',
+        Slot: '_render_slot',
+        AMGroup: '_render_amgroup',
+        Flash: '_render_flash',
+        Outline: '_render_region',
+        TestRecord: '_render_test_record',
+    }
+
     def __init__(self, units='inch'):
         self._units = units
         self._color = (0.7215, 0.451, 0.200)
@@ -135,39 +160,106 @@ class GerberContext(object):
     def invert(self, invert):
         self._invert = invert
 
+    @classmethod
+    def register_renderer(cls, primitive_type, renderer):
+        """ Register the renderer for a primitive class
+
+        The renderer is used for this context class and its subclasses, for
+        `primitive_type` and any subclass of it that has no renderer of its
+        own.
+
+        Parameters
+        ----------
+        primitive_type : type
+            Primitive class
+
+        renderer : string or callable
+            Name of the context method rendering the primitive, or a function
+            called as ``renderer(context, primitive, color)``
+        """
+        if '_renderers' not in cls.__dict__:
+            cls._renderers = {}
+        cls._renderers[primitive_type] = renderer
+        _DISPATCH_CACHE.clear()
+
     def render(self, primitive):
         if not primitive:
             return
 
-        self._pre_render_primitive(primitive)
-
-        color = self.color
-        if isinstance(primitive, Line):
-            self._render_line(primitive, color)
-        elif isinstance(primitive, Arc):
-            self._render_arc(primitive, color)
-        elif isinstance(primitive, Region):
-            self._render_region(primitive, color)
-        elif isinstance(primitive, Circle):
-            self._render_circle(primitive, color)
-        elif isinstance(primitive, Rectangle):
-            self._render_rectangle(primitive, color)
-        elif isinstance(primitive, Obround):
-            self._render_obround(primitive, color)
-        elif isinstance(primitive, Polygon):
-            self._render_polygon(primitive, color)
-        elif isinstance(primitive, Drill):
-            self._render_drill(primitive, self.color)
-        elif isinstance(primitive, Slot):
-            self._render_slot(primitive, self.color)
-        elif isinstance(primitive, AMGroup):
-            self._render_amgroup(primitive, color)
-        elif isinstance(primitive, Outline):
-            self._render_region(primitive, color)
-        elif isinstance(primitive, TestRecord):
-            self._render_test_record(primitive, color)
-
-        self._post_render_primitive(primitive)
+        table, hooks = self._dispatch_table()
+        try:
+            renderer = table[primitive.__class__]
+        except KeyError:
+            renderer = self._find_renderer(primitive.__class__)
+
+        if hooks:
+            self._pre_render_primitive(primitive)
+        if renderer is not None:
+            renderer(self, primitive, self.color)
+        if hooks:
+            self._post_render_primitive(primitive)
+
+    def render_many(self, primitives):
+        """ Render a sequence of primitives, in order
+
+        Equivalent to calling :meth:`render` on each primitive. Backends that
+        can process whole batches of primitives should override this.
+        """
+        table, hooks = self._dispatch_table()
+        for primitive in primitives:
+            if not primitive:
+                continue
+            try:
+                renderer = table[primitive.__class__]
+            except KeyError:
+                renderer = self._find_renderer(primitive.__class__)
+            if hooks:
+                self._pre_render_primitive(primitive)
+            if renderer is not None:
+                renderer(self, primitive, self.color)
+            if hooks:
+                self._post_render_primitive(primitive)
+
+    def _dispatch_table(self):
+        """ Get the dispatch table of this context's class
+
+        Returns
+        -------
+        table : dict
+            Renderer functions by primitive class, filled in as primitive
+            classes are seen
+
+        hooks : bool
+            False if neither :meth:`_pre_render_primitive` nor
+            :meth:`_post_render_primitive` is overridden
+        """
+        try:
+            return _DISPATCH_CACHE[self.__class__]
+        except KeyError:
+            cls = self.__class__
+            hooks = (cls._pre_render_primitive
+                     is not GerberContext._pre_render_primitive
+                     or cls._post_render_primitive
+                     is not GerberContext._post_render_primitive)
+            state = _DISPATCH_CACHE[cls] = ({}, hooks)
+            return state
+
+    def _find_renderer(self, primitive_type):
+        """ Look up the renderer of `primitive_type` and cache it
+        """
+        cls = self.__class__
+        registry = {}
+        for klass in reversed(cls.__mro__):
+            registry.update(klass.__dict__.get('_renderers', {}))
+        renderer = None
+        for klass in primitive_type.__mro__:
+            if klass in registry:
+                renderer = registry[klass]
+                break
+        if isinstance(renderer, str):
+            renderer = getattr(cls, renderer)
+        self._dispatch_table()[0][primitive_type] = renderer
+        return renderer
 
     def _pre_render_primitive(self, primitive):
         """
@@ -214,6 +306,14 @@ class GerberContext(object):
     def _render_amgroup(self, primitive, color):
         pass
 
+    def _render_flash(self, primitive, color):
+        """
+        Render a flashed aperture. By default the flash is expanded into a
+        standalone primitive, backends that can reuse the shared aperture
+        definition should override this.
+        """
+        self.render(primitive.to_primitive())
+
     def _render_test_record(self, primitive, color):
         pass
 
@@ -225,3 +325,62 @@ class RenderSettings(object):
         self.alpha = alpha
         self.invert = invert
         self.mirror = mirror
+
+
+def _layers_bounds(layers):
+    """ Bounds enclosing every layer that has any
+    """
+    x_range = [10000, -10000]
+    y_range = [10000, -10000]
+    for layer in layers:
+        bounds = layer.bounds
+        if bounds is not None:
+            layer_x, layer_y = bounds
+            x_range[0] = min(x_range[0], layer_x[0])
+            x_range[1] = max(x_range[1], layer_x[1])
+            y_range[0] = min(y_range[0], layer_y[0])
+            y_range[1] = max(y_range[1], layer_y[1])
+    return (tuple(x_range), tuple(y_range))
+
+
+def _arc_sweep(arc):
+    """ Angle swept by an arc, negative when it runs clockwise
+
+    An arc ending where it starts is a full circle in multi-quadrant mode,
+    and sweeps nothing in single-quadrant mode.
+    """
+    two_pi = 2 * math.pi
+    if arc.direction == 'counterclockwise':
+        sweep = (arc.end_angle - arc.start_angle) % two_pi
+    else:
+        sweep = -((arc.start_angle - arc.end_angle) % two_pi)
+    if sweep == 0 and arc.quadrant_mode != 'single-quadrant':
+        sweep = two_pi if arc.direction == 'counterclockwise' else -two_pi
+    return sweep
+
+
+def _region_points(region, tolerance, scale=1.0):
+    """ Outline of a region as a list of points, multiplied by `scale`
+
+    Arcs are flattened into chords deviating at most `tolerance` from the
+    arc, in scaled units.
+    """
+    points = [tuple(coord * scale for coord in region.primitives[0].start)]
+    for prim in region.primitives:
+        if isinstance(prim, Line):
+            points.append(tuple(coord * scale for coord in prim.end))
+            continue
+        radius = prim.radius * scale
+        sweep = _arc_sweep(prim)
+        if radius > tolerance:
+            step = 2 * math.acos(1 - float(tolerance) / radius)
+        else:
+            step = math.pi
+        count = max(int(math.ceil(abs(sweep) / step)), 1)
+        cx, cy = prim.center[0] * scale, prim.center[1] * scale
+        for i in range(1, count):
+            angle = prim.start_angle + sweep * i / count
+            points.append((cx + radius * math.cos(angle),
+                           cy + radius * math.sin(angle)))
+        points.append(tuple(coord * scale for coord in prim.end))
+    return points
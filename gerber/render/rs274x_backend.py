@@ -267,7 +267,7 @@ class Rs274xContext(GerberContext):
             self._level_polarity = region.level_polarity
             self.body.append(LPParamStmt.from_region(region))
 
-    def _render_flash(self, primitive, aperture):
+    def _write_flash(self, primitive, aperture):
 
         self._render_level_polarity(primitive)
 
@@ -306,7 +306,7 @@ class Rs274xContext(GerberContext):
     def _render_circle(self, circle, color):
 
         aper = self._get_circle(circle.diameter, circle.hole_diameter, circle.hole_width, circle.hole_height)
-        self._render_flash(circle, aper)
+        self._write_flash(circle, aper)
 
     def _get_rectangle(self, width, height, hole_diameter=None, hole_width=None,
                        hole_height=None, dcode = None):
@@ -333,7 +333,7 @@ class Rs274xContext(GerberContext):
         aper = self._get_rectangle(rectangle.width, rectangle.height,
                                    rectangle.hole_diameter,
                                    rectangle.hole_width, rectangle.hole_height)
-        self._render_flash(rectangle, aper)
+        self._write_flash(rectangle, aper)
 
     def _get_obround(self, width, height, hole_diameter=None, hole_width=None,
                      hole_height=None, dcode = None):
@@ -359,14 +359,14 @@ class Rs274xContext(GerberContext):
         aper = self._get_obround(obround.width, obround.height,
                                  obround.hole_diameter, obround.hole_width,
                                  obround.hole_height)
-        self._render_flash(obround, aper)
+        self._write_flash(obround, aper)
 
     def _render_polygon(self, polygon, color):
 
         aper = self._get_polygon(polygon.radius, polygon.sides,
                                  polygon.rotation, polygon.hole_diameter,
                                  polygon.hole_width, polygon.hole_height)
-        self._render_flash(polygon, aper)
+        self._write_flash(polygon, aper)
 
     def _get_polygon(self, radius, num_vertices, rotation, hole_diameter=None,
                      hole_width=None, hole_height=None, dcode = None):
@@ -484,7 +484,34 @@ class Rs274xContext(GerberContext):
     def _render_amgroup(self, amgroup, color):
 
         aper = self._get_amacro(amgroup)
-        self._render_flash(amgroup, aper)
+        self._write_flash(amgroup, aper)
+
+    def _render_flash(self, flash, color):
+
+        # Define the aperture once from the shared definition, rather than
+        # from a positioned copy of it
+        aperture = flash.aperture
+        if isinstance(aperture, Circle):
+            aper = self._get_circle(aperture.diameter, aperture.hole_diameter,
+                                    aperture.hole_width, aperture.hole_height)
+        elif isinstance(aperture, Rectangle):
+            aper = self._get_rectangle(aperture.width, aperture.height,
+                                       aperture.hole_diameter,
+                                       aperture.hole_width, aperture.hole_height)
+        elif isinstance(aperture, Obround):
+            aper = self._get_obround(aperture.width, aperture.height,
+                                     aperture.hole_diameter,
+                                     aperture.hole_width, aperture.hole_height)
+        elif isinstance(aperture, Polygon):
+            aper = self._get_polygon(aperture.radius, aperture.sides,
+                                     aperture.rotation, aperture.hole_diameter,
+                                     aperture.hole_width, aperture.hole_height)
+        elif isinstance(aperture, AMGroup):
+            aper = self._get_amacro(aperture)
+        else:
+            raise NotImplementedError('Flash with invalid aperture type')
+
+        self._write_flash(flash, aper)
 
     def _render_inverted_layer(self):
         pass
@@ -0,0 +1,481 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+SVG rendering
+=============
+**Streaming SVG backend**
+
+Writes SVG straight to a file as primitives are rendered, without building
+the document in memory. Each layer is an SVG mask, drawn white where the
+layer is dark and black where it is clear, through which the layer color is
+painted. Consecutive primitives with the same polarity and drawing style are
+merged into a single ``<path>``, and every flashed aperture is defined once
+and then placed with ``<use>``.
+"""
+
+import math
+
+from .render import (GerberContext, RenderSettings, _arc_sweep,
+                     _layers_bounds)
+from .theme import THEMES
+from ..primitives import *
+from ..utils import rotate_point
+
+_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<svg xmlns="http://www.w3.org/2000/svg" '
+           'xmlns:xlink="http://www.w3.org/1999/xlink" '
+           'width="{width}{units}" height="{height}{units}" '
+           'viewBox="{x} {y} {width} {height}">\n'
+           '<g transform="scale(1,-1)">\n')
+
+
+class GerberSvgContext(GerberContext):
+    """ Streaming SVG rendering context
+
+    Coordinates are written in board units, so the output does not depend
+    on a rendering scale.
+
+        >>> ctx = GerberSvgContext()
+        >>> ctx.render_layers(pcb.top_layers, 'board.svg')
+
+    Parameters
+    ----------
+    precision : int
+        Number of decimals written for coordinates
+    """
+
+    def __init__(self, precision=5):
+        super(GerberSvgContext, self).__init__()
+        self.precision = precision
+        self.file = None
+        self.bounds = None
+        self._owns_file = False
+        self._layer_count = 0
+        self._run = None
+        self._apertures = {}
+
+    def begin(self, filename, bounds, bgsettings=None):
+        """ Start writing an SVG document
+
+        Parameters
+        ----------
+        filename : string or file
+            SVG file to write, or a text file object
+
+        bounds : tuple
+            ((xmin, xmax), (ymin, ymax)) bounds of the image
+
+        bgsettings : :class:`RenderSettings` <optional>
+            Background color. No background is drawn if None.
+        """
+        if hasattr(filename, 'write'):
+            self.file = filename
+            self._owns_file = False
+        else:
+            self.file = open(filename, 'w')
+            self._owns_file = True
+        self.bounds = bounds
+        self._layer_count = 0
+        self._run = None
+        self._apertures = {}
+        (xmin, xmax), (ymin, ymax) = bounds
+        self.file.write(_HEADER.format(
+            x=self._num(xmin), y=self._num(-ymax),
+            width=self._num(xmax - xmin), height=self._num(ymax - ymin),
+            units='in' if self.units == 'inch' else 'mm'))
+        if bgsettings is not None:
+            self.file.write('<rect {} fill="{}" fill-opacity="{}"/>\n'.format(
+                self._bounds_attributes(), _color(bgsettings.color),
+                self._num(bgsettings.alpha)))
+
+    def end(self):
+        """ Finish the SVG document
+        """
+        self.file.write('</g>\n</svg>\n')
+        if self._owns_file:
+            self.file.close()
+        self.file = None
+        self._apertures = {}
+
+    def render_layer(self, layer, filename=None, settings=None, bgsettings=None,
+                     verbose=False, bounds=None):
+        """ Render a layer
+
+        If no document has been started with :meth:`begin`, `filename` is
+        written with this layer only.
+        """
+        if settings is None:
+            settings = THEMES['default'].get(layer.layer_class, RenderSettings())
+        standalone = self.file is None
+        if standalone:
+            self._set_units([layer])
+            if bgsettings is None:
+                bgsettings = THEMES['default'].get('background',
+                                                   RenderSettings())
+            self.begin(filename, bounds if bounds is not None
+                       else layer.bounds, bgsettings)
+        if verbose:
+            print('[Render]: Rendering {} Layer.'.format(layer.layer_class))
+        self._begin_layer(settings)
+        self.render_many(layer.primitives)
+        self._end_layer(settings)
+        if standalone:
+            self.end()
+
+    def render_layers(self, layers, filename, theme=THEMES['default'],
+                      verbose=False):
+        """ Render a set of layers
+        """
+        x_range, y_range = _layers_bounds(layers)
+
+        if verbose:
+            print('[Render]: Writing image to {}'.format(filename))
+        self._set_units(layers)
+        self.begin(filename, (x_range, y_range),
+                   theme['background'])
+        for layer in layers:
+            settings = theme.get(layer.layer_class, RenderSettings())
+            self.render_layer(layer, settings=settings, verbose=verbose)
+        self.end()
+
+    def _set_units(self, layers):
+        # The document's physical size is given in the units of the layers
+        for layer in layers:
+            units = getattr(layer.cam_source, 'units', None)
+            if units in ('inch', 'metric'):
+                self.units = units
+                return
+
+    def _begin_layer(self, settings):
+        self.invert = settings.invert
+        self.file.write('<mask id="layer{}" maskUnits="userSpaceOnUse" {}>\n'
+                        .format(self._layer_count, self._bounds_attributes()))
+        if settings.invert:
+            self.file.write('<rect {} fill="#fff"/>\n'
+                            .format(self._bounds_attributes()))
+        if settings.mirror:
+            (xmin, xmax), _ = self.bounds
+            self.file.write('<g transform="matrix(-1 0 0 1 {} 0)">\n'
+                            .format(self._num(xmin + xmax)))
+        else:
+            self.file.write('<g>\n')
+
+    def _end_layer(self, settings):
+        self._end_run()
+        self.file.write('</g>\n</mask>\n')
+        self.file.write('<rect {} fill="{}" fill-opacity="{}" '
+                        'mask="url(#layer{})"/>\n'.format(
+                            self._bounds_attributes(),
+                            _color(settings.color),
+                            self._num(settings.alpha), self._layer_count))
+        self._layer_count += 1
+
+    def _mask_color(self, primitive):
+        dark = primitive.level_polarity == 'dark' and not self.invert
+        return '#fff' if dark else '#000'
+
+    def _draw(self, primitive, shape):
+        """ Add a shape from :meth:`_shape` to the current path
+        """
+        if shape is None:
+            return
+        data, stroke = shape
+        key = (self._mask_color(primitive), stroke)
+        if self._run != key:
+            self._end_run()
+            color, stroke = key
+            if stroke is None:
+                self.file.write('<path fill="{}" d="'.format(color))
+            else:
+                self.file.write('<path fill="none" stroke="{}" '
+                                'stroke-width="{}" stroke-linecap="{}" d="'
+                                .format(color, self._num(stroke[0]),
+                                        stroke[1]))
+            self._run = key
+        else:
+            self.file.write(' ')
+        self.file.write(data)
+
+    def _end_run(self):
+        if self._run is not None:
+            self.file.write('"/>\n')
+            self._run = None
+
+    def _render_line(self, line, color):
+        self._draw(line, self._shape(line))
+
+    def _render_arc(self, arc, color):
+        self._draw(arc, self._shape(arc))
+
+    def _render_region(self, region, color):
+        self._draw(region, self._shape(region))
+
+    def _render_circle(self, circle, color):
+        self._draw(circle, self._shape(circle))
+
+    def _render_rectangle(self, rectangle, color):
+        self._draw(rectangle, self._shape(rectangle))
+
+    def _render_obround(self, obround, color):
+        self._draw(obround, self._shape(obround))
+
+    def _render_polygon(self, polygon, color):
+        self._draw(polygon, self._shape(polygon))
+
+    def _render_drill(self, circle, color=None):
+        self._draw(circle, self._shape(circle))
+
+    def _render_slot(self, slot, color):
+        self._draw(slot, self._shape(slot))
+
+    def _render_amgroup(self, amgroup, color):
+        self.render_many(amgroup.primitives)
+
+    def _render_flash(self, flash, color):
+        aperture = flash.aperture
+        ref = self._aperture_ref(aperture)
+        self._end_run()
+        dx, dy = flash._aperture_offset
+        if ref is None:
+            # Draw the macro's parts with their own polarities, offset to the
+            # flash position
+            self.file.write('<g transform="translate({} {})">\n'.format(
+                self._num(dx), self._num(dy)))
+            self.render(aperture)
+            self._end_run()
+            self.file.write('</g>\n')
+            return
+        color = self._mask_color(flash)
+        self.file.write('<use xlink:href="#{}" x="{}" y="{}" fill="{}" '
+                        'stroke="{}"/>\n'.format(ref, self._num(dx),
+                                                 self._num(dy), color, color))
+
+    def _aperture_ref(self, aperture):
+        """ Id of the definition of a flashed aperture
+
+        The definition is written the first time the aperture is flashed.
+        Returns None for apertures that can't be defined once for all
+        polarities, i.e. macros with clear parts.
+        """
+        try:
+            return self._apertures[id(aperture)][0]
+        except KeyError:
+            pass
+        if isinstance(aperture, AMGroup):
+            parts = aperture.primitives
+            if any(part.level_polarity != 'dark' for part in parts):
+                return None
+        else:
+            parts = [aperture]
+        shapes = [self._shape(part) for part in parts]
+        ref = 'ap{}'.format(len(self._apertures))
+        self._end_run()
+        self.file.write('<defs><g id="{}">'.format(ref))
+        for shape in shapes:
+            if shape is None:
+                continue
+            data, stroke = shape
+            if stroke is None:
+                self.file.write('<path d="{}"/>'.format(data))
+            else:
+                self.file.write('<path fill="none" stroke-width="{}" '
+                                'stroke-linecap="{}" d="{}"/>'.format(
+                                    self._num(stroke[0]), stroke[1], data))
+        self.file.write('</g></defs>\n')
+        # Keep the aperture alive so that its id can't be reused
+        self._apertures[id(aperture)] = (ref, aperture)
+        return ref
+
+    def _shape(self, primitive):
+        """ Path data of a primitive
+
+        Returns
+        -------
+        shape : tuple
+            (data, stroke): the path data, and the (width, linecap) to stroke
+            it with, or None if it is filled. Filled outlines are
+            counterclockwise and holes clockwise, so that shapes in the same
+            path add up under the nonzero fill rule. None if the primitive
+            can't be drawn.
+        """
+        if isinstance(primitive, Line):
+            if isinstance(primitive.aperture, Circle):
+                return ('M{}L{}'.format(self._point(primitive.start),
+                                        self._point(primitive.end)),
+                        (primitive.aperture.diameter, 'round'))
+            elif getattr(primitive, 'vertices', None) is not None:
+                return self._polygon(primitive.vertices), None
+            return None
+        elif isinstance(primitive, Arc):
+            if isinstance(primitive.aperture, Circle):
+                width = primitive.aperture.diameter
+                cap = 'round'
+            else:
+                width = max(primitive.aperture.width,
+                            primitive.aperture.height)
+                cap = 'square'
+            return ('M{}{}'.format(self._point(primitive.start),
+                                   self._arc(primitive)), (width, cap))
+        elif isinstance(primitive, (Region, Outline)):
+            return self._region(primitive), None
+        elif isinstance(primitive, (Circle, Drill)):
+            data = self._circle(primitive.position, primitive.radius)
+        elif isinstance(primitive, Rectangle):
+            data = self._polygon(_box(primitive.lower_left,
+                                      primitive.upper_right))
+        elif isinstance(primitive, Obround):
+            data = self._obround(primitive)
+        elif isinstance(primitive, Polygon):
+            data = self._polygon(primitive.vertices)
+        elif isinstance(primitive, Slot):
+            return ('M{}L{}'.format(self._point(primitive.start),
+                                    self._point(primitive.end)),
+                    (primitive.diameter, 'round'))
+        else:
+            return None
+        return data + self._hole(primitive), None
+
+    def _hole(self, primitive):
+        data = ''
+        hole_diameter = getattr(primitive, 'hole_diameter', None)
+        if hole_diameter is not None and hole_diameter > 0:
+            data += self._circle(primitive.position, hole_diameter / 2.0,
+                                 clockwise=True)
+        hole_width = getattr(primitive, 'hole_width', None)
+        hole_height = getattr(primitive, 'hole_height', None)
+        if (hole_width is not None and hole_height is not None
+                and hole_width > 0 and hole_height > 0):
+            cx, cy = primitive.position
+            corners = _box((cx - hole_width / 2.0, cy - hole_height / 2.0),
+                           (cx + hole_width / 2.0, cy + hole_height / 2.0))
+            corners = [rotate_point(corner, primitive.rotation, (cx, cy))
+                       for corner in corners]
+            data += self._polygon(corners, clockwise=True)
+        return data
+
+    def _polygon(self, vertices, clockwise=False):
+        vertices = list(vertices)
+        if (_signed_area(vertices) < 0) != clockwise:
+            vertices.reverse()
+        return 'M{}Z'.format('L'.join(self._point(v) for v in vertices))
+
+    def _obround(self, obround):
+        """ Counterclockwise outline of an obround
+
+        A single outline, rather than two circles and a rectangle, so that a
+        clockwise hole cuts through it under the nonzero fill rule.
+        """
+        center = obround.position
+        radius = min(obround.width, obround.height) / 2.0
+        if obround.width > obround.height:
+            axis = (obround.width / 2.0 - radius, 0)
+            normal = (0, radius)
+        else:
+            axis = (0, obround.height / 2.0 - radius)
+            normal = (-radius, 0)
+        corners = [(center[0] + a * axis[0] + n * normal[0],
+                    center[1] + a * axis[1] + n * normal[1])
+                   for a, n in ((1, -1), (1, 1), (-1, 1), (-1, -1))]
+        corners = [self._point(rotate_point(corner, obround.rotation, center))
+                   for corner in corners]
+        radius = self._num(radius)
+        return 'M{}A{r},{r} 0 0,1 {}L{}A{r},{r} 0 0,1 {}Z'.format(
+            *corners, r=radius)
+
+    def _circle(self, center, radius, clockwise=False):
+        cx, cy = center
+        radius = self._num(radius)
+        sweep = 0 if clockwise else 1
+        return 'M{}A{r},{r} 0 0,{s} {}A{r},{r} 0 0,{s} {}Z'.format(
+            self._point((cx + float(radius), cy)),
+            self._point((cx - float(radius), cy)),
+            self._point((cx + float(radius), cy)), r=radius, s=sweep)
+
+    def _arc(self, arc):
+        """ Path data of an arc, from its start point
+        """
+        sweep = _arc_sweep(arc)
+        radius = self._num(arc.radius)
+        flag = 1 if sweep > 0 else 0
+        data = ''
+        if abs(sweep) > math.pi:
+            # Go through the middle of the arc, so that full circles work
+            angle = arc.start_angle + sweep / 2.0
+            middle = (arc.center[0] + arc.radius * math.cos(angle),
+                      arc.center[1] + arc.radius * math.sin(angle))
+            data = 'A{r},{r} 0 0,{f} {}'.format(self._point(middle),
+                                                r=radius, f=flag)
+        return data + 'A{r},{r} 0 0,{f} {}'.format(self._point(arc.end),
+                                                   r=radius, f=flag)
+
+    def _region(self, region):
+        prims = region.primitives
+        # Orient the outline counterclockwise, from its vertices and the
+        # middle of its arcs
+        points = [prims[0].start]
+        for prim in prims:
+            if isinstance(prim, Arc):
+                angle = (prim.start_angle + prim.end_angle) / 2.0
+                points.append((prim.center[0] + prim.radius * math.cos(angle),
+                               prim.center[1] + prim.radius * math.sin(angle)))
+            points.append(prim.end)
+        if _signed_area(points) < 0:
+            prims = [_reversed(prim) for prim in reversed(prims)]
+        data = ['M', self._point(prims[0].start)]
+        for prim in prims:
+            if isinstance(prim, Line):
+                data.append('L' + self._point(prim.end))
+            else:
+                data.append(self._arc(prim))
+        data.append('Z')
+        return ''.join(data)
+
+    def _point(self, point):
+        return '{},{}'.format(self._num(point[0]), self._num(point[1]))
+
+    def _num(self, value):
+        text = '{:.{}f}'.format(value, self.precision).rstrip('0').rstrip('.')
+        return '0' if text in ('', '-0') else text
+
+    def _bounds_attributes(self):
+        (xmin, xmax), (ymin, ymax) = self.bounds
+        return 'x="{}" y="{}" width="{}" height="{}"'.format(
+            self._num(xmin), self._num(ymin), self._num(xmax - xmin),
+            self._num(ymax - ymin))
+
+
+def _box(lower_left, upper_right):
+    (xmin, ymin), (xmax, ymax) = lower_left, upper_right
+    return [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
+
+
+def _signed_area(points):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1)
+               in zip(points, points[1:] + points[:1])) / 2.0
+
+
+def _reversed(prim):
+    """ A region segment going the other way
+    """
+    if isinstance(prim, Line):
+        return Line(prim.end, prim.start, prim.aperture)
+    direction = ('clockwise' if prim.direction == 'counterclockwise'
+                 else 'counterclockwise')
+    return Arc(prim.end, prim.start, prim.center, direction, prim.aperture,
+               prim.quadrant_mode)
+
+
+def _color(color):
+    return '#{:02x}{:02x}{:02x}'.format(*[int(round(c * 255)) for c in color])
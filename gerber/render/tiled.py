@@ -0,0 +1,211 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tiled rendering
+===============
+**Render large boards in tiles**
+
+Splits the image into tiles, renders each tile with a raster
+:class:`GerberCairoContext` limited to the tile's window, and streams the
+tiles into a single PNG file one row of tiles at a time. The tiles can be
+rendered in a pool of worker processes; only the row being written and the
+row being rendered are ever held in memory.
+"""
+
+import collections
+import math
+import multiprocessing
+import sys
+
+import numpy as np
+
+from .cairo_backend import GerberCairoContext, _image_size
+from .png import PNGWriter
+from .render import RenderSettings, _layers_bounds
+from .theme import THEMES
+from ..primitives import TestRecord
+
+
+def render_tiled(layers, filename, theme=THEMES['default'], scale=300,
+                 tile_size=1024, workers=None, bounds=None, verbose=False):
+    """ Render a set of layers to a PNG file, one tile at a time
+
+    The image is the same, pixel for pixel, as the one rendered by a raster
+    :class:`GerberCairoContext` at the same scale; only the tiling differs.
+
+    Parameters
+    ----------
+    layers : list of :class:`gerber.layers.PCBLayer`
+        Layers to render, bottom first
+
+    filename : string or file
+        PNG file to write
+
+    theme : :class:`gerber.render.theme.Theme`
+        Rendering theme
+
+    scale : int
+        Rendering scale in pixels per unit
+
+    tile_size : int
+        Width and height of the tiles in pixels
+
+    workers : int, optional
+        Number of worker processes rendering the tiles. If None or 1, the
+        tiles are rendered in this process.
+
+    bounds : tuple, optional
+        ((xmin, xmax), (ymin, ymax)) board bounds. Defaults to the union of
+        the layers' bounds.
+
+    verbose : bool
+        Print progress messages
+    """
+    if bounds is None:
+        bounds = _layers_bounds(layers)
+    bgsettings = theme['background']
+    layer_settings = [theme.get(layer.layer_class, RenderSettings())
+                      for layer in layers]
+
+    # Only the geometry of this context is used, so keep its surface tiny
+    ctx = GerberCairoContext(scale, raster=True)
+    ctx.window = (0, 0, 1, 1)
+    ctx.set_bounds(bounds)
+    width, height = _image_size(ctx.size_in_pixels)
+    tiles = [(x, y, min(tile_size, width - x), min(tile_size, height - y))
+             for y in range(0, height, tile_size)
+             for x in range(0, width, tile_size)]
+    columns = int(math.ceil(width / float(tile_size)))
+
+    if verbose:
+        print('[Render]: Rendering {} tiles of {}x{} image.'
+              .format(len(tiles), width, height))
+    primitives = _split_primitives(ctx, layers, layer_settings, tiles,
+                                   tile_size, columns)
+    rows = [[(scale, bounds, tile, bgsettings,
+              list(zip(layer_settings, tile_primitives)))
+             for tile, tile_primitives in zip(tiles[row:row + columns],
+                                              primitives[row:row + columns])]
+            for row in range(0, len(tiles), columns)]
+
+    pool = None
+    if workers is not None and workers > 1:
+        pool = multiprocessing.Pool(min(workers, len(tiles)))
+
+    try:
+        if verbose:
+            print('[Render]: Writing image to {}'.format(filename))
+        with PNGWriter(filename, width, height) as png:
+            for band in _render_rows(rows, pool):
+                png.write_rows(np.concatenate(band, axis=1))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def _render_rows(rows, pool=None):
+    """ Render the rows of tiles, yielding each row's tiles in order
+
+    With a pool, the next row is submitted before the current one is
+    collected, so the workers stay busy while at most two rows of tiles are
+    pending or finished at any time.
+    """
+    if pool is None:
+        for jobs in rows:
+            yield [_render_tile(job) for job in jobs]
+        return
+    pending = collections.deque()
+    for jobs in rows:
+        pending.append([pool.apply_async(_render_tile, (job,))
+                        for job in jobs])
+        if len(pending) > 1:
+            yield [result.get() for result in pending.popleft()]
+    while pending:
+        yield [result.get() for result in pending.popleft()]
+
+
+
+def _split_primitives(ctx, layers, layer_settings, tiles, tile_size, columns):
+    """ Select the primitives of each layer that reach into each tile
+
+    Returns a list with, for each tile, a list of the primitives of every
+    layer to draw on it, in their original order.
+    """
+    rows = len(tiles) // columns
+    selected = [[] for _ in tiles]
+    for layer, settings in zip(layers, layer_settings):
+        matrix = ctx._layer_matrix(settings.mirror)
+        layer_primitives = [[] for _ in tiles]
+        for primitive in layer.primitives:
+            if isinstance(primitive, TestRecord):
+                # Labels are drawn beyond the primitive's bounding box
+                for tile_primitives in layer_primitives:
+                    tile_primitives.append(primitive)
+                continue
+            (xmin, xmax), (ymin, ymax) = primitive.bounding_box
+            corners = [matrix.transform_point(*ctx.scale_point((x, y)))
+                       for x in (xmin, xmax) for y in (ymin, ymax)]
+            # Grow the box by a few pixels for antialiasing and mask filtering
+            col0 = max(int(min(x for x, _ in corners) - 3) // tile_size, 0)
+            col1 = min(int(max(x for x, _ in corners) + 3) // tile_size,
+                       columns - 1)
+            row0 = max(int(min(y for _, y in corners) - 3) // tile_size, 0)
+            row1 = min(int(max(y for _, y in corners) + 3) // tile_size,
+                       rows - 1)
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    layer_primitives[row * columns + col].append(primitive)
+        for tile_primitives, primitives in zip(selected, layer_primitives):
+            tile_primitives.append(primitives)
+    return selected
+
+
+def _render_tile(job):
+    """ Render one tile, returning its pixels as RGBA rows
+    """
+    scale, bounds, window, bgsettings, layers = job
+    ctx = GerberCairoContext(scale, raster=True)
+    ctx.window = window
+    ctx.set_bounds(bounds)
+    ctx._paint_background(bgsettings)
+    for settings, primitives in layers:
+        ctx._render_primitives(primitives, settings)
+    ctx.surface.flush()
+    return _unpremultiply(ctx.surface)
+
+
+def _unpremultiply(surface):
+    """ Convert an ARGB32 surface to straight alpha RGBA rows
+
+    Uses the same rounding as cairo's PNG writer.
+    """
+    width = surface.get_width()
+    height = surface.get_height()
+    data = np.frombuffer(bytes(surface.get_data()), dtype=np.uint8)
+    pixels = data.reshape(height, surface.get_stride())[:, :width * 4]
+    pixels = pixels.reshape(height, width, 4).astype(np.uint32)
+    if sys.byteorder == 'little':
+        blue, green, red, alpha = (pixels[..., i] for i in range(4))
+    else:
+        alpha, red, green, blue = (pixels[..., i] for i in range(4))
+    rgba = np.zeros((height, width, 4), dtype=np.uint8)
+    opaque = alpha > 0
+    divisor = np.where(opaque, alpha, 1)
+    for i, channel in enumerate((red, green, blue)):
+        rgba[..., i] = np.where(opaque,
+                                (channel * 255 + alpha // 2) // divisor, 0)
+    rgba[..., 3] = alpha
+    return rgba
@@ -18,7 +18,6 @@
 """ This module provides an RS-274-X class and parser.
 """
 
-import copy
 import json
 import os
 import re
@@ -32,7 +31,9 @@ except(ImportError):
 from .gerber_statements import *
 from .primitives import *
 from .cam import CamFile, FileSettings
-from .utils import sq_distance
+from .reader import read_text, iter_text
+from .utils import (sq_distance, parse_gerber_value, parse_gerber_values,
+                    instance_attributes)
 
 
 def read(filename):
@@ -70,6 +71,29 @@ def loads(data, filename=None):
     return GerberParser().parse_raw(data, filename)
 
 
+def iter_primitives(source, chunk_size=None):
+    """ Generate the primitives of a gerber file without loading all of it
+
+    The file is read in chunks and only the current graphics state is kept,
+    so memory use does not grow with the size of the file. Statements are
+    not retained.
+
+    Parameters
+    ----------
+    source : string or file object
+        Filename, or file object opened in text or binary mode, to read from.
+
+    chunk_size : int, optional
+        Number of bytes to read at a time.
+
+    Returns
+    -------
+    primitives : generator of :class:`gerber.primitives.Primitive`
+        The primitives of the file, in drawing order.
+    """
+    return GerberParser().iter_primitives(source, chunk_size)
+
+
 class GerberFile(CamFile):
     """ A class representing a single gerber file
 
@@ -161,6 +185,7 @@ class GerberFile(CamFile):
                 statement.to_inch()
             for primitive in self.primitives:
                 primitive.to_inch()
+            self.invalidate_spatial_index()
 
     def to_metric(self):
         if self.units != 'metric':
@@ -169,12 +194,14 @@ class GerberFile(CamFile):
                 statement.to_metric()
             for primitive in self.primitives:
                 primitive.to_metric()
+            self.invalidate_spatial_index()
 
     def offset(self, x_offset=0,  y_offset=0):
         for statement in self.statements:
             statement.offset(x_offset, y_offset)
         for primitive in self.primitives:
             primitive.offset(x_offset, y_offset)
+        self.invalidate_spatial_index()
 
 
 class GerberParser(object):
@@ -234,9 +261,53 @@ class GerberParser(object):
     REGION_MODE_STMT = re.compile(r'(?P<mode>G3[67])\*')
     QUAD_MODE_STMT = re.compile(r'(?P<mode>G7[45])\*')
 
+    # Parameters grouped by their two-character code, so a parameter is only
+    # matched against the expressions that can possibly match it.
+    PARAM_CODES = (('FS', (FS,)), ('MO', (MO,)), ('LP', (LP,)),
+                   ('AD', (AD_CIRCLE, AD_RECT, AD_OBROUND, AD_POLY, AD_MACRO)),
+                   ('AM', (AM,)), ('AS', (AS,)), ('IF', (IF,)), ('IN', (IN,)),
+                   ('IP', (IP,)), ('IR', (IR,)), ('MI', (MI,)), ('OF', (OF,)),
+                   ('SF', (SF,)), ('LN', (LN,)))
+
+    PARAM_DISPATCH = dict((code, [re.compile(r"{0}\*".format(p)) for p in params])
+                          for code, params in PARAM_CODES)
+
+    # Master expression used by the tokenizer. The alternatives are tried in
+    # the same order as the individual statement expressions above, and the
+    # name of the alternative that matched is the token type.
+    TOKEN_STMT = re.compile("|".join((
+        r"(?P<skip>[\s*]+)",
+        (r"(?P<coord>(?P<function>{function})?"
+         r"(X(?P<x>{number}))?(Y(?P<y>{number}))?"
+         r"(I(?P<i>{number}))?(J(?P<j>{number}))?"
+         r"(?P<op>{op})?\*)").format(number=NUMBER, function=COORD_FUNCTION,
+                                     op=COORD_OP),
+        r"(?P<aperture>(?P<deprecated>G54|G55)?D(?P<d>\d+)\*)",
+        r"(?P<param>%(?P<params>[^%]*)%)",
+        r"(?P<region_mode>G3[67]\*)",
+        r"(?P<quadrant_mode>G7[45]\*)",
+        r"(?P<comment>G0?4(?P<text>[^*\r\n]*)\*?)",
+        r"(?P<deprecated_unit>G7[01]\*)",
+        r"(?P<deprecated_format>G9[01]\*)",
+        r"(?P<eof>M0?[012]\*)",
+    )))
+
     # Keep include loop from crashing us
     INCLUDE_FILE_RECURSION_LIMIT = 10
 
+    # Bytes read at a time by iter_primitives()
+    CHUNK_SIZE = 1 << 16
+
+    # Complete statements at the start of a piece of text: parameter blocks,
+    # comments (which may hold '%'), and anything else up to a '*'
+    COMPLETE_STMTS = re.compile(r"(?:\s*(?:%[^%]*%|G0?4[^*\r\n]*[*\r\n]|[^%*]+\*))*")
+
+    # Number of converted coordinate values kept for reuse
+    COORDINATE_CACHE_SIZE = 1 << 16
+
+    # Maximum number of statements whose coordinates are converted together
+    COORDINATE_BATCH_SIZE = 1 << 10
+
     def __init__(self):
         self.filename = None
         self.settings = FileSettings()
@@ -247,6 +318,8 @@ class GerberParser(object):
         self.current_region = None
         self.x = 0
         self.y = 0
+        # The current point, shared by the primitives ending and starting there
+        self._point = (0, 0)
         self.op = "D02"
         self.aperture = 0
         self.interpolation = 'linear'
@@ -257,16 +330,20 @@ class GerberParser(object):
         self.quadrant_mode = 'multi-quadrant'
         self.step_and_repeat = (1, 1, 0, 0)
         self._recursion_depth = 0
+        # Converted coordinate values, valid for the current format. Missing
+        # coordinates are None.
+        self._coordinates = {None: None}
+        # Function and operation codes seen so far
+        self._codes = {None: None}
 
     def parse(self, filename):
         self.filename = filename
-        with open(filename, "rU") as fp:
-            data = fp.read()
+        data = read_text(filename)
         return self.parse_raw(data, filename)
 
     def parse_raw(self, data, filename=None):
         self.filename = filename
-        for stmt in self._parse(self._split_commands(data)):
+        for stmt in self._parse(data):
             self.evaluate(stmt)
             self.statements.append(stmt)
 
@@ -274,41 +351,44 @@ class GerberParser(object):
         for stmt in self.statements:
             stmt.units = self.settings.units
 
-        return GerberFile(self.statements, self.settings, self.primitives, self.apertures.values(), filename)
+        return GerberFile(self.statements, self.settings, self.primitives, list(self.apertures.values()), filename)
 
-    def _split_commands(self, data):
+    def iter_primitives(self, source, chunk_size=None):
+        """ Generate primitives as they are completed, reading source in chunks
         """
-        Split the data into commands. Commands end with * (and also newline to help with some badly formatted files)
+        if hasattr(source, 'read'):
+            self.filename = getattr(source, 'name', None)
+        else:
+            self.filename = source
+        chunks = iter_text(source, chunk_size or self.CHUNK_SIZE)
+        for data in self._read_statements(chunks):
+            for stmt in self._parse(data):
+                self.evaluate(stmt)
+                if self.primitives:
+                    for primitive in self.primitives:
+                        yield primitive
+                    del self.primitives[:]
+
+    def _read_statements(self, chunks):
+        """ Regroup chunks of text into pieces holding complete statements
+
+        Pieces are only split after a complete statement, so no statement,
+        parameter block or comment is split between them.
         """
-
-        length = len(data)
-        start = 0
-        in_header = True
-
-        for cur in range(0, length):
-
-            val = data[cur]
-
-            if val == '%' and start == cur:
-                in_header = True
-                continue
-
-            if val == '\r' or val == '\n':
-                if start != cur:
-                    yield data[start:cur]
-                start = cur + 1
-
-            elif not in_header and val == '*':
-                yield data[start:cur + 1]
-                start = cur + 1
-
-            elif in_header and val == '%':
-                yield data[start:cur + 1]
-                start = cur + 1
-                in_header = False
+        complete = self.COMPLETE_STMTS.match
+        pending = ''
+        for chunk in chunks:
+            pending += chunk
+            end = complete(pending).end()
+            if end > 0:
+                yield pending[:end]
+                pending = pending[end:]
+        if pending:
+            yield pending
 
     def dump_json(self):
-        stmts = {"statements": [stmt.__dict__ for stmt in self.statements]}
+        stmts = {"statements": [dict(instance_attributes(stmt))
+                                 for stmt in self.statements]}
         return json.dumps(stmts)
 
     def dump_str(self):
@@ -317,167 +397,222 @@ class GerberParser(object):
             string += str(stmt) + "\n"
         return string
 
-    def _parse(self, data):
-        oldline = ''
+    def _tokenize(self, data):
+        """ Split gerber data into typed tokens in a single pass
 
-        for line in data:
-            line = oldline + line.strip()
+        Yields (type, match) tuples, where type is the name of the matching
+        alternative of `TOKEN_STMT` (or 'unknown', in which case the match is
+        the unrecognised statement text). Parameter blocks are expanded into
+        one 'param' token per parameter, matched by `PARAM_DISPATCH`.
 
-            # skip empty lines
-            if not len(line):
+        Newlines are only significant as the end of an unterminated comment.
+        A statement that is broken over several lines is rejoined before it
+        is matched.
+        """
+        match = self.TOKEN_STMT.match
+        length = len(data)
+        pos = 0
+
+        while pos < length:
+            m = match(data, pos)
+            if m is not None:
+                token = m.lastgroup
+                pos = m.end()
+                if token == 'param':
+                    for param in self._tokenize_params(m.group('params')):
+                        yield param
+                elif token != 'skip':
+                    yield (token, m)
                 continue
 
-            # deal with multi-line parameters
-            if line.startswith("%") and not line.endswith("%") and not "%" in line[1:]:
-                oldline = line
-                continue
+            # Not a complete statement on a single line. Rejoin the lines up
+            # to the end of the statement and try again.
+            star = data.find('*', pos)
+            if star < 0:
+                # Unterminated data at the end of the file
+                return
+            percent = data.find('%', pos, star)
+            stop = percent if percent >= 0 else star + 1
+            line = ''.join(l.strip() for l in data[pos:stop].splitlines())
+            m = match(line)
+            if m is not None and m.end() == len(line) and m.lastgroup != 'param':
+                yield (m.lastgroup, m)
+            else:
+                yield ('unknown', line)
+            pos = stop
 
-            did_something = True  # make sure we do at least one loop
-            while did_something and len(line) > 0:
-                did_something = False
-
-                # consume empty data blocks
-                if line[0] == '*':
-                    line = line[1:]
-                    did_something = True
-                    continue
-
-                # coord
-                (coord, r) = _match_one(self.COORD_STMT, line)
-                if coord:
-                    yield CoordStmt.from_dict(coord, self.settings)
-                    line = r
-                    did_something = True
-                    continue
-
-                # aperture selection
-                (aperture, r) = _match_one(self.APERTURE_STMT, line)
-                if aperture:
-                    yield ApertureStmt(**aperture)
-                    did_something = True
-                    line = r
-                    continue
-
-                # parameter
-                (param, r) = _match_one_from_many(self.PARAM_STMT, line)
-
-                if param:
-                    if param["param"] == "FS":
-                        stmt = FSParamStmt.from_dict(param)
-                        self.settings.zero_suppression = stmt.zero_suppression
-                        self.settings.format = stmt.format
-                        self.settings.notation = stmt.notation
-                        yield stmt
-                    elif param["param"] == "MO":
-                        stmt = MOParamStmt.from_dict(param)
-                        self.settings.units = stmt.mode
-                        yield stmt
-                    elif param["param"] == "LP":
-                        yield LPParamStmt.from_dict(param)
-                    elif param["param"] == "AD":
-                        yield ADParamStmt.from_dict(param)
-                    elif param["param"] == "AM":
-                        stmt = AMParamStmt.from_dict(param)
-                        stmt.units = self.settings.units
-                        yield stmt
-                    elif param["param"] == "OF":
-                        yield OFParamStmt.from_dict(param)
-                    elif param["param"] == "IF":
-                        # Don't crash on include loop
-                        if self._recursion_depth < self.INCLUDE_FILE_RECURSION_LIMIT:
-                            self._recursion_depth += 1
-                            with open(os.path.join(os.path.dirname(self.filename), param["filename"]), 'r') as f:
-                                inc_data = f.read()
-                            for stmt in self._parse(self._split_commands(inc_data)):
-                                yield stmt
-                            self._recursion_depth -= 1
-                        else:
-                            raise IOError("Include file nesting depth limit exceeded.")
-                    elif param["param"] == "IN":
-                        yield INParamStmt.from_dict(param)
-                    elif param["param"] == "LN":
-                        yield LNParamStmt.from_dict(param)
-                    # deprecated commands AS, IN, IP, IR, MI, OF, SF, LN
-                    elif param["param"] == "AS":
-                        yield ASParamStmt.from_dict(param)
-                    elif param["param"] == "IN":
-                        yield INParamStmt.from_dict(param)
-                    elif param["param"] == "IP":
-                        yield IPParamStmt.from_dict(param)
-                    elif param["param"] == "IR":
-                        yield IRParamStmt.from_dict(param)
-                    elif param["param"] == "MI":
-                        yield MIParamStmt.from_dict(param)
-                    elif param["param"] == "OF":
-                        yield OFParamStmt.from_dict(param)
-                    elif param["param"] == "SF":
-                        yield SFParamStmt.from_dict(param)
-                    elif param["param"] == "LN":
-                        yield LNParamStmt.from_dict(param)
-                    else:
-                        yield UnknownStmt(line)
-
-                    did_something = True
-                    line = r
-                    continue
-
-                # Region Mode
-                (mode, r) = _match_one(self.REGION_MODE_STMT, line)
-                if mode:
-                    yield RegionModeStmt.from_gerber(line)
-                    line = r
-                    did_something = True
-                    continue
-
-                # Quadrant Mode
-                (mode, r) = _match_one(self.QUAD_MODE_STMT, line)
-                if mode:
-                    yield QuadrantModeStmt.from_gerber(line)
-                    line = r
-                    did_something = True
-                    continue
-
-                # comment
-                (comment, r) = _match_one(self.COMMENT_STMT, line)
-                if comment:
-                    yield CommentStmt(comment["comment"])
-                    did_something = True
-                    line = r
-                    continue
-
-                # deprecated codes
-                (deprecated_unit, r) = _match_one(self.DEPRECATED_UNIT, line)
-                if deprecated_unit:
-                    stmt = MOParamStmt(param="MO", mo="inch" if "G70" in
-                                       deprecated_unit["mode"] else "metric")
+    def _tokenize_params(self, block):
+        """ Split the contents of a %...% parameter block into param tokens
+        """
+        if '\n' in block or '\r' in block:
+            block = ''.join(l.strip() for l in block.splitlines())
+        length = len(block)
+        pos = 0
+
+        while pos < length:
+            m = None
+            for expr in self.PARAM_DISPATCH.get(block[pos:pos + 2], ()):
+                m = expr.match(block, pos)
+                if m is not None:
+                    break
+
+            if m is None:
+                # Unterminated parameters are dropped
+                if '*' in block[pos:]:
+                    line = block[pos:] + '%'
+                    yield ('unknown', '%' + line if pos == 0 else line)
+                return
+
+            yield ('param', m)
+            pos = m.end()
+            # consume empty data blocks
+            while pos < length and block[pos] == '*':
+                pos += 1
+
+    def _parse_coordinate(self, value):
+        if value not in self._coordinates:
+            if len(self._coordinates) > self.COORDINATE_CACHE_SIZE:
+                self._coordinates.clear()
+                self._coordinates[None] = None
+            self._coordinates[value] = parse_gerber_value(
+                value, self.settings.format, self.settings.zero_suppression)
+        return self._coordinates[value]
+
+    def _convert_ahead(self, tokens):
+        """ Convert the coordinates of upcoming statements in batches
+
+        Tokens are buffered up to the next parameter, which may change the
+        coordinate format, or COORDINATE_BATCH_SIZE statements. Coordinate
+        values in the buffer that haven't been converted yet are converted
+        with a single parse_gerber_values() call before the tokens are passed
+        on.
+        """
+        block = []
+        for token in tokens:
+            block.append(token)
+            if token[0] == 'param' or len(block) >= self.COORDINATE_BATCH_SIZE:
+                self._convert_coordinates(block)
+                for token in block:
+                    yield token
+                block = []
+        self._convert_coordinates(block)
+        for token in block:
+            yield token
+
+    def _convert_coordinates(self, block):
+        coordinates = self._coordinates
+        values = set()
+        for token, m in block:
+            if token == 'coord':
+                values.update(m.group('x', 'y', 'i', 'j'))
+        values = [value for value in values if value not in coordinates]
+        if not values:
+            return
+        if len(coordinates) + len(values) > self.COORDINATE_CACHE_SIZE:
+            coordinates.clear()
+            coordinates[None] = None
+        converted = parse_gerber_values(values, self.settings.format,
+                                        self.settings.zero_suppression)
+        coordinates.update(zip(values, converted.tolist()))
+
+    def _parse(self, data):
+        coordinates = self._coordinates
+        codes = self._codes
+        for token, m in self._convert_ahead(self._tokenize(data)):
+            if token == 'coord':
+                function, x, y, i, j, op = m.group('function', 'x', 'y',
+                                                   'i', 'j', 'op')
+                # Share one string per function and operation code
+                function = codes.setdefault(function, function)
+                op = codes.setdefault(op, op)
+                # Values were converted by _convert_ahead(), and boards
+                # reuse the same coordinates over and over, so each value
+                # string is only converted once
+                try:
+                    x, y, i, j = [coordinates[value] for value in (x, y, i, j)]
+                except KeyError:
+                    x, y, i, j = [self._parse_coordinate(value)
+                                  for value in (x, y, i, j)]
+                yield CoordStmt(function, x, y, i, j, op, self.settings)
+
+            elif token == 'aperture':
+                yield ApertureStmt(m.group('d'), m.group('deprecated'))
+
+            elif token == 'param':
+                param = m.groupdict()
+                if param["param"] == "FS":
+                    stmt = FSParamStmt.from_dict(param)
+                    self.settings.zero_suppression = stmt.zero_suppression
+                    self.settings.format = stmt.format
+                    self.settings.notation = stmt.notation
+                    coordinates.clear()
+                    coordinates[None] = None
+                    yield stmt
+                elif param["param"] == "MO":
+                    stmt = MOParamStmt.from_dict(param)
                     self.settings.units = stmt.mode
                     yield stmt
-                    line = r
-                    did_something = True
-                    continue
-
-                (deprecated_format, r) = _match_one(self.DEPRECATED_FORMAT, line)
-                if deprecated_format:
-                    yield DeprecatedStmt.from_gerber(line)
-                    line = r
-                    did_something = True
-                    continue
-
-                # eof
-                (eof, r) = _match_one(self.EOF_STMT, line)
-                if eof:
-                    yield EofStmt()
-                    did_something = True
-                    line = r
-                    continue
-
-                if line.find('*') > 0:
-                    yield UnknownStmt(line)
-                    did_something = True
-                    line = ""
-                    continue
-
-            oldline = line
+                elif param["param"] == "LP":
+                    yield LPParamStmt.from_dict(param)
+                elif param["param"] == "AD":
+                    yield ADParamStmt.from_dict(param)
+                elif param["param"] == "AM":
+                    stmt = AMParamStmt.from_dict(param)
+                    stmt.units = self.settings.units
+                    yield stmt
+                elif param["param"] == "IF":
+                    # Don't crash on include loop
+                    if self._recursion_depth < self.INCLUDE_FILE_RECURSION_LIMIT:
+                        self._recursion_depth += 1
+                        inc_data = read_text(os.path.join(os.path.dirname(self.filename), param["filename"]))
+                        for stmt in self._parse(inc_data):
+                            yield stmt
+                        self._recursion_depth -= 1
+                    else:
+                        raise IOError("Include file nesting depth limit exceeded.")
+                # deprecated commands AS, IN, IP, IR, MI, OF, SF, LN
+                elif param["param"] == "AS":
+                    yield ASParamStmt.from_dict(param)
+                elif param["param"] == "IN":
+                    yield INParamStmt.from_dict(param)
+                elif param["param"] == "IP":
+                    yield IPParamStmt.from_dict(param)
+                elif param["param"] == "IR":
+                    yield IRParamStmt.from_dict(param)
+                elif param["param"] == "MI":
+                    yield MIParamStmt.from_dict(param)
+                elif param["param"] == "OF":
+                    yield OFParamStmt.from_dict(param)
+                elif param["param"] == "SF":
+                    yield SFParamStmt.from_dict(param)
+                elif param["param"] == "LN":
+                    yield LNParamStmt.from_dict(param)
+                else:
+                    yield UnknownStmt(m.group())
+
+            elif token == 'region_mode':
+                yield RegionModeStmt.from_gerber(m.group())
+
+            elif token == 'quadrant_mode':
+                yield QuadrantModeStmt.from_gerber(m.group())
+
+            elif token == 'comment':
+                yield CommentStmt(m.group('text'))
+
+            elif token == 'deprecated_unit':
+                stmt = MOParamStmt(param="MO", mo="inch" if "G70" in
+                                   m.group() else "metric")
+                self.settings.units = stmt.mode
+                yield stmt
+
+            elif token == 'deprecated_format':
+                yield DeprecatedStmt.from_gerber(m.group())
+
+            elif token == 'eof':
+                yield EofStmt()
+
+            else:
+                yield UnknownStmt(m)
 
     def evaluate(self, stmt):
         """ Evaluate Gerber statement and update image accordingly.
@@ -521,7 +656,7 @@ class GerberParser(object):
             elif len(modifiers[0]) == 3:
                 rectangular_hole = modifiers[0][1:3]
 
-            aperture = Circle(position=None, diameter=diameter,
+            aperture = Circle(position=(0, 0), diameter=diameter,
                               hole_diameter=hole_diameter,
                               hole_width=rectangular_hole[0],
                               hole_height=rectangular_hole[1],
@@ -538,7 +673,7 @@ class GerberParser(object):
             elif len(modifiers[0]) == 4:
                 rectangular_hole = modifiers[0][2:4]
 
-            aperture = Rectangle(position=None, width=width, height=height,
+            aperture = Rectangle(position=(0, 0), width=width, height=height,
                                  hole_diameter=hole_diameter,
                                  hole_width=rectangular_hole[0],
                                  hole_height=rectangular_hole[1],
@@ -554,7 +689,7 @@ class GerberParser(object):
             elif len(modifiers[0]) == 4:
                 rectangular_hole = modifiers[0][2:4]
 
-            aperture = Obround(position=None, width=width, height=height,
+            aperture = Obround(position=(0, 0), width=width, height=height,
                                hole_diameter=hole_diameter,
                                hole_width=rectangular_hole[0],
                                hole_height=rectangular_hole[1],
@@ -574,7 +709,7 @@ class GerberParser(object):
             elif len(modifiers[0]) >= 5:
                 rectangular_hole = modifiers[0][3:5]
 
-            aperture = Polygon(position=None, sides=number_vertices,
+            aperture = Polygon(position=(0, 0), sides=number_vertices,
                                radius=outer_diameter/2.0,
                                hole_diameter=hole_diameter,
                                hole_width=rectangular_hole[0],
@@ -638,9 +773,13 @@ class GerberParser(object):
             # no implicit op allowed, force here if coord block doesn't have it
             stmt.op = self.op
 
+        point = self._point
+        if point[0] != x or point[1] != y:
+            point = (x, y)
+
         if self.op == "D01" or self.op == "D1":
-            start = (self.x, self.y)
-            end = (x, y)
+            start = self._point
+            end = point
 
             if self.interpolation == 'linear':
                 if self.region_mode == 'off':
@@ -705,24 +844,12 @@ class GerberParser(object):
                 self.current_region = None
 
         elif self.op == "D03" or self.op == "D3":
-            primitive = copy.deepcopy(self.apertures[self.aperture])
-
-            if primitive is not None:
-
-                if not isinstance(primitive, AMParamStmt):
-                    primitive.position = (x, y)
-                    primitive.level_polarity = self.level_polarity
-                    primitive.units = self.settings.units
-                    self.primitives.append(primitive)
-                else:
-                    # Aperture Macro
-                    for am_prim in primitive.primitives:
-                        renderable = am_prim.to_primitive((x, y),
-                                                          self.level_polarity,
-                                                          self.settings.units)
-                        if renderable is not None:
-                            self.primitives.append(renderable)
+            # Flashes share the aperture definition rather than copying it
+            self.primitives.append(Flash(self.apertures[self.aperture], point,
+                                         level_polarity=self.level_polarity,
+                                         units=self.settings.units))
         self.x, self.y = x, y
+        self._point = point
 
     def _find_center(self, start, end, offsets):
         """
@@ -782,19 +909,3 @@ class GerberParser(object):
 
     def _evaluate_aperture(self, stmt):
         self.aperture = stmt.d
-
-def _match_one(expr, data):
-    match = expr.match(data)
-    if match is None:
-        return ({}, None)
-    else:
-        return (match.groupdict(), data[match.end(0):])
-
-
-def _match_one_from_many(exprs, data):
-    for expr in exprs:
-        match = expr.match(data)
-        if match:
-            return (match.groupdict(), data[match.end(0):])
-
-    return ({}, None)
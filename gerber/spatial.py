@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.spatial
+==============
+**Spatial index of primitives**
+
+This module provides :class:`SpatialIndex`, a uniform grid over the bounding
+boxes of a list of primitives that answers window, point and nearest
+neighbour queries without scanning every primitive.
+
+    >>> index = copper.spatial_index
+    >>> pads = index.query_window(((1.0, 1.5), (0.2, 0.4)))
+"""
+
+import math
+
+import numpy as np
+
+from .primitives import TestRecord
+
+# Primitives covering more grid cells than this are kept out of the grid and
+# tested on every query, so that a few large regions don't fill every cell.
+MAX_CELLS_PER_PRIMITIVE = 16
+
+
+class SpatialIndex(object):
+    """ Uniform grid index over the bounding boxes of primitives
+
+    The grid is built in bulk with NumPy: each primitive is listed in every
+    cell its bounding box overlaps, and the lists are stored in one array
+    sorted by cell. Queries gather the candidates from the cells they reach
+    and test their bounding boxes all at once.
+
+    Netlist test records have no extent and are indexed as a point at their
+    position. The index holds the bounding boxes the primitives had when it
+    was built.
+    It has to be rebuilt when primitives are moved or converted.
+
+    Parameters
+    ----------
+    primitives : list of :class:`gerber.primitives.Primitive`
+        Primitives to index
+
+    boxes : numpy.ndarray, optional
+        (n, 4) array of the primitives' (xmin, xmax, ymin, ymax), if they
+        are already known
+
+    Attributes
+    ----------
+    primitives : list
+        The indexed primitives
+
+    boxes : numpy.ndarray
+        (n, 4) array of the primitives' (xmin, xmax, ymin, ymax)
+    """
+
+    def __init__(self, primitives, boxes=None):
+        self.primitives = primitives
+        if boxes is None:
+            boxes = np.array([_bounding_box(p) for p in primitives],
+                             dtype=float).reshape(-1, 4)
+        self.boxes = boxes
+        count = len(boxes)
+        if count:
+            self.origin = (boxes[:, 0].min(), boxes[:, 2].min())
+            width = max(boxes[:, 1].max() - self.origin[0], 1e-9)
+            height = max(boxes[:, 3].max() - self.origin[1], 1e-9)
+        else:
+            self.origin = (0.0, 0.0)
+            width = height = 1.0
+
+        # About two primitives per cell, with cells as square as possible
+        cells = max(count // 2, 1)
+        self.columns = max(int(round(math.sqrt(cells * width / height))), 1)
+        self.rows = max(int(round(cells / float(self.columns))), 1)
+        self.cell_size = (width / self.columns, height / self.rows)
+
+        col0, col1 = self._columns(boxes[:, 0], boxes[:, 1])
+        row0, row1 = self._rows(boxes[:, 2], boxes[:, 3])
+        spans = (col1 - col0 + 1) * (row1 - row0 + 1)
+        large = spans > MAX_CELLS_PER_PRIMITIVE
+        self.large = np.nonzero(large)[0]
+
+        # List each small primitive in each of its cells
+        small = np.nonzero(~large)[0]
+        spans = spans[small]
+        items = np.repeat(small, spans)
+        starts = np.cumsum(spans) - spans
+        local = np.arange(len(items)) - np.repeat(starts, spans)
+        span_columns = (col1 - col0 + 1)[items]
+        cell = ((row0[items] + local // span_columns) * self.columns +
+                col0[items] + local % span_columns)
+        order = np.argsort(cell, kind='stable')
+        self.items = items[order]
+        counts = np.bincount(cell, minlength=self.rows * self.columns)
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self):
+        return len(self.primitives)
+
+    def query_window(self, bounds):
+        """ Primitives whose bounding boxes overlap a window
+
+        Parameters
+        ----------
+        bounds : tuple
+            ((xmin, xmax), (ymin, ymax)) window
+
+        Returns
+        -------
+        primitives : list
+            Primitives touching the window, in their original order
+        """
+        return [self.primitives[i] for i in self.window_indices(bounds)]
+
+    def query_point(self, point, tolerance=0.0):
+        """ Primitives whose bounding boxes are within `tolerance` of a point
+
+        Returns
+        -------
+        primitives : list
+            Matching primitives, in their original order
+        """
+        x, y = point
+        indices = self.window_indices(((x - tolerance, x + tolerance),
+                                       (y - tolerance, y + tolerance)))
+        if tolerance > 0 and len(indices):
+            # The window is square, the tolerance is a distance
+            distance = _box_distance(self.boxes[indices], x, y)
+            indices = indices[distance <= tolerance]
+        return [self.primitives[i] for i in indices]
+
+    def nearest(self, point, k=1):
+        """ The `k` primitives whose bounding boxes are nearest to a point
+
+        Distances are measured to the bounding boxes, so every primitive whose
+        box contains the point is at distance 0.
+
+        Returns
+        -------
+        primitives : list
+            Up to `k` primitives, nearest first
+        """
+        if k <= 0 or not len(self.primitives):
+            return []
+        x, y = point
+        x0, y0 = self.origin
+        col = int(min(max((x - x0) // self.cell_size[0], 0), self.columns - 1))
+        row = int(min(max((y - y0) // self.cell_size[1], 0), self.rows - 1))
+
+        # Search growing blocks of cells around the cell nearest to the point
+        # until no primitive outside the block can be nearer than the k-th
+        # nearest found so far
+        radius = 0
+        while True:
+            col0, col1 = max(col - radius, 0), min(col + radius, self.columns - 1)
+            row0, row1 = max(row - radius, 0), min(row + radius, self.rows - 1)
+            everything = (col0 == 0 and row0 == 0 and
+                          col1 == self.columns - 1 and row1 == self.rows - 1)
+            if everything:
+                candidates = np.arange(len(self.primitives))
+            else:
+                candidates = self._cells(col0, col1, row0, row1)
+            if len(candidates) >= k or everything:
+                distance = _box_distance(self.boxes[candidates], x, y)
+                if len(candidates) > k:
+                    # Only sort the k nearest, and whatever ties with them
+                    kth = np.partition(distance, k - 1)[k - 1]
+                    near = distance <= kth
+                    candidates, distance = candidates[near], distance[near]
+                order = np.lexsort((candidates, distance))[:k]
+                if (everything or distance[order[-1]] <=
+                        self._outside_distance(x, y, col0, col1, row0, row1)):
+                    return [self.primitives[i] for i in candidates[order]]
+            radius = max(radius * 2, 1)
+
+    def window_indices(self, bounds):
+        """ Indices of the primitives whose bounding boxes overlap a window
+
+        Returns
+        -------
+        indices : numpy.ndarray
+            Sorted indices into :attr:`primitives`
+        """
+        (xmin, xmax), (ymin, ymax) = bounds
+        col0, col1 = self._columns(np.array([xmin]), np.array([xmax]))
+        row0, row1 = self._rows(np.array([ymin]), np.array([ymax]))
+        col0, col1, row0, row1 = int(col0[0]), int(col1[0]), int(row0[0]), int(row1[0])
+        if (col1 - col0 + 1) * (row1 - row0 + 1) * 2 > self.rows * self.columns:
+            # Most of the grid, testing every box is cheaper
+            candidates = np.arange(len(self.primitives))
+        else:
+            candidates = self._cells(col0, col1, row0, row1)
+        boxes = self.boxes[candidates]
+        hit = ((boxes[:, 0] <= xmax) & (boxes[:, 1] >= xmin) &
+               (boxes[:, 2] <= ymax) & (boxes[:, 3] >= ymin))
+        return candidates[hit]
+
+    def _columns(self, xmin, xmax):
+        return (self._clip((xmin - self.origin[0]) // self.cell_size[0],
+                           self.columns),
+                self._clip((xmax - self.origin[0]) // self.cell_size[0],
+                           self.columns))
+
+    def _rows(self, ymin, ymax):
+        return (self._clip((ymin - self.origin[1]) // self.cell_size[1],
+                           self.rows),
+                self._clip((ymax - self.origin[1]) // self.cell_size[1],
+                           self.rows))
+
+    def _clip(self, cells, count):
+        return np.clip(cells, 0, count - 1).astype(np.intp)
+
+    def _outside_distance(self, x, y, col0, col1, row0, row1):
+        """ Distance from a point to the grid outside a block of cells
+
+        The boxes of the primitives that are not listed in the block lie
+        entirely beside, above or below it.
+        """
+        (cell_width, cell_height), (x0, y0) = self.cell_size, self.origin
+        x1 = x0 + self.columns * cell_width
+        y1 = y0 + self.rows * cell_height
+        sides = []
+        if col0 > 0:
+            sides.append((x0, x0 + col0 * cell_width, y0, y1))
+        if col1 < self.columns - 1:
+            sides.append((x0 + (col1 + 1) * cell_width, x1, y0, y1))
+        if row0 > 0:
+            sides.append((x0, x1, y0, y0 + row0 * cell_height))
+        if row1 < self.rows - 1:
+            sides.append((x0, x1, y0 + (row1 + 1) * cell_height, y1))
+        if not sides:
+            return float('inf')
+        return _box_distance(np.array(sides), x, y).min()
+
+    def _cells(self, col0, col1, row0, row1):
+        """ Indices of the primitives in a block of cells
+        """
+        # The cells of a row of the block are contiguous in the grid
+        found = [self.large]
+        for row in range(row0, row1 + 1):
+            start = self.cell_start[row * self.columns + col0]
+            end = self.cell_start[row * self.columns + col1 + 1]
+            found.append(self.items[start:end])
+        return np.unique(np.concatenate(found))
+
+
+def _box_distance(boxes, x, y):
+    dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 1]), 0.0)
+    dy = np.maximum(np.maximum(boxes[:, 2] - y, y - boxes[:, 3]), 0.0)
+    return np.hypot(dx, dy)
+
+
+def _bounding_box(primitive):
+    if isinstance(primitive, TestRecord):
+        x, y = primitive.position
+        return ((x, x), (y, y))
+    return primitive.bounding_box
@@ -0,0 +1,91 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+from .tests import *
+from .. import cache as gerber_cache
+from ..cache import ParseCache
+from ..common import read
+from ..excellon import ExcellonFile
+from ..rs274x import GerberFile
+
+
+NCDRILL_FILE = os.path.join(os.path.dirname(__file__),
+                            'resources/ncdrill.DRD')
+TOP_COPPER_FILE = os.path.join(os.path.dirname(__file__),
+                               'resources/top_copper.GTL')
+
+
+def _with_cache(test):
+    def wrapper():
+        directory = tempfile.mkdtemp()
+        try:
+            test(directory)
+        finally:
+            shutil.rmtree(directory)
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@_with_cache
+def test_cache_hit(directory):
+    cache = ParseCache(directory)
+    parsed = read(TOP_COPPER_FILE, cache=cache)
+    assert_true(isinstance(parsed, GerberFile))
+    assert_equal(len(os.listdir(directory)), 1)
+    cached = read(TOP_COPPER_FILE, cache=cache)
+    assert_true(cached is not parsed)
+    assert_equal(cached.filename, TOP_COPPER_FILE)
+    assert_equal([str(s) for s in cached.statements],
+                 [str(s) for s in parsed.statements])
+    assert_equal(cached.bounding_box, parsed.bounding_box)
+    assert_true(isinstance(read(NCDRILL_FILE, cache=cache), ExcellonFile))
+    assert_equal(len(os.listdir(directory)), 2)
+
+
+@_with_cache
+def test_cache_eviction(directory):
+    cache = ParseCache(directory)
+    read(TOP_COPPER_FILE, cache=cache)
+    read(NCDRILL_FILE, cache=cache)
+    drill_key = cache.key(NCDRILL_FILE)
+    drill_size = os.path.getsize(cache._path(drill_key))
+    # Make the copper entry the least recently used one
+    copper_path = cache._path(cache.key(TOP_COPPER_FILE))
+    os.utime(copper_path, (0, 0))
+    cache.max_size = drill_size
+    cache.evict()
+    assert_false(os.path.exists(copper_path))
+    assert_true(cache.get(drill_key) is not None)
+    assert_equal(cache.size, drill_size)
+    cache.clear()
+    assert_equal(cache.size, 0)
+
+
+@_with_cache
+def test_cache_bad_entry(directory):
+    cache = ParseCache(directory)
+    key = cache.key(TOP_COPPER_FILE)
+    with open(cache._path(key), 'wb') as f:
+        f.write(b'not a cache entry')
+    assert_equal(cache.get(key), None)
+    assert_true(isinstance(read(TOP_COPPER_FILE, cache=cache), GerberFile))
+    assert_true(cache.get(key) is not None)
+
+
+@_with_cache
+def test_cache_format_change(directory):
+    cache = ParseCache(directory)
+    key = cache.key(TOP_COPPER_FILE)
+    read(TOP_COPPER_FILE, cache=cache)
+    version = gerber_cache.CACHE_VERSION
+    gerber_cache.CACHE_VERSION = 'older-layout'
+    try:
+        assert_not_equal(cache.key(TOP_COPPER_FILE), key)
+        assert_equal(cache.get(cache.key(TOP_COPPER_FILE)), None)
+    finally:
+        gerber_cache.CACHE_VERSION = version
+    assert_true(cache.get(key) is not None)
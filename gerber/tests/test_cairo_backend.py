@@ -6,7 +6,12 @@ import os
 import shutil
 import tempfile
 
-from ..render.cairo_backend import GerberCairoContext
+from ..primitives import Circle, Flash, Line, Rectangle
+from ..layers import PCBLayer
+from ..render.cairo_backend import (GerberCairoContext, LayerCache, cairo,
+                                    _simplify)
+from ..render.render import RenderSettings
+from ..render.tiled import _unpremultiply
 from ..rs274x import read
 from .tests import *
 from nose.tools import assert_tuple_equal
@@ -225,3 +230,127 @@ def _test_simple_render_svg(gerber_path):
     assert_equal(expected_bytes[:38], '<?xml version="1.0" encoding="UTF-8"?>')
 
     shutil.rmtree(temp_dir)
+
+
+def test_render_raster_png():
+    """Example of rendering to a PNG file through raster surfaces"""
+    gerber = read(_resolve_path('resources/example_simple_contour.gbr'))
+
+    ctx = GerberCairoContext(raster=True)
+    gerber.render(ctx)
+
+    temp_dir = tempfile.mkdtemp()
+    png_temp_path = os.path.join(temp_dir, 'output.png')
+    ctx.dump(png_temp_path)
+
+    with open(png_temp_path, 'rb') as png_file:
+        assert_equal(png_file.read(8), b'\x89PNG\r\n\x1a\n')
+    assert_raises(ValueError, ctx.dump, os.path.join(temp_dir, 'output.svg'))
+
+    shutil.rmtree(temp_dir)
+
+
+def test_render_flash_sprites():
+    """Flashes of the same aperture are stamped from a cached sprite"""
+    aperture = Circle((0, 0), 0.1)
+    flashes = [Flash(aperture, (0.1 * i, 0.5)) for i in range(1, 10)]
+
+    ctx = GerberCairoContext(scale=100, raster=True)
+    ctx.set_bounds(((0, 1), (0, 1)))
+    ctx._render_primitives(flashes, RenderSettings())
+    assert_equal(len(ctx._sprites), 1)
+    ctx.clear()
+    assert_equal(len(ctx._sprites), 0)
+
+    ctx = GerberCairoContext(scale=100, raster=True, sprite_cache_size=0)
+    ctx.set_bounds(((0, 1), (0, 1)))
+    ctx._render_primitives(flashes, RenderSettings())
+    assert_equal(len(ctx._sprites), 0)
+
+
+def test_render_flash_then_line():
+    """A line drawn after a flash in the same run is not lost"""
+    aperture = Circle((0, 0), 0.1)
+    primitives = [Flash(aperture, (0.2, 0.5)),
+                  Line((0.5, 0.5), (0.9, 0.5), aperture)]
+
+    ctx = GerberCairoContext(scale=100, raster=True)
+    ctx.set_bounds(((0, 1), (0, 1)))
+    ctx._paint_background(RenderSettings((0.0, 0.0, 0.0)))
+    ctx._render_primitives(primitives, RenderSettings((1.0, 1.0, 1.0)))
+    ctx.surface.flush()
+    row = _unpremultiply(ctx.surface)[50]
+    for x in (20, 60, 70, 80):
+        assert_equal(row[x].tolist(), [255, 255, 255, 255])
+    assert_equal(row[35].tolist(), [0, 0, 0, 255])
+
+
+def test_render_flash_vector():
+    """Vector renders draw the shared aperture at each flash position"""
+    aperture = Rectangle((0, 0), 0.3, 0.3, hole_diameter=0.1)
+    flashes = [Flash(aperture, (0.25, 0.5)), Flash(aperture, (0.75, 0.5)),
+               Flash(Circle((0, 0), 0.06), (0.65, 0.5),
+                     level_polarity='clear')]
+
+    ctx = GerberCairoContext(scale=100)
+    ctx.set_bounds(((0, 1), (0, 1)))
+    ctx._paint_background(RenderSettings((0.0, 0.0, 0.0)))
+    ctx._render_primitives(flashes, RenderSettings((1.0, 1.0, 1.0)))
+    image = cairo.ImageSurface(cairo.FORMAT_ARGB32, 100, 100)
+    image_ctx = cairo.Context(image)
+    image_ctx.set_source_surface(ctx.surface)
+    image_ctx.paint()
+    image.flush()
+    row = _unpremultiply(image)[50]
+    for x in (15, 35, 85):
+        assert_equal(row[x].tolist(), [255, 255, 255, 255])
+    for x in (5, 25, 65, 75, 95):
+        assert_equal(row[x].tolist(), [0, 0, 0, 255])
+    assert_equal(aperture.position, (0, 0))
+
+
+def test_simplify():
+    points = [(0, 0), (0.2, 0), (0.4, 0), (1, 0), (1.2, 0), (2, 0)]
+    assert_equal(_simplify(points, 0.5), [(0, 0), (1, 0), (2, 0)])
+    assert_equal(_simplify(points[:2], 0.5), points[:2])
+
+
+def test_render_lod_merges_tiny_flashes():
+    """Flashes smaller than the LOD threshold are drawn as single pixels"""
+    aperture = Circle((0, 0), 0.001)
+    flashes = [Flash(aperture, (0.5 + 0.001 * i, 0.5)) for i in range(5)]
+
+    ctx = GerberCairoContext(scale=100, raster=True)
+    ctx.lod = 1
+    ctx.set_bounds(((0, 1), (0, 1)))
+    ctx._new_render_layer()
+    ctx.render_many(flashes)
+    assert_equal(len(ctx._mask_run.pixels), 1)
+    assert_equal(len(ctx._sprites), 0)
+    ctx._flatten()
+
+
+def test_render_layer_cache():
+    """Layers rendered again with other colors reuse their cached mask"""
+    layer = PCBLayer.from_cam(
+        read(_resolve_path('resources/example_simple_contour.gbr')))
+    cache = LayerCache()
+    ctx = GerberCairoContext(scale=50, raster=True, layer_cache=cache)
+
+    ctx.render_layer(layer, settings=RenderSettings((1.0, 0.0, 0.0)))
+    assert_equal(len(cache), 1)
+    ctx.render_layer(layer, settings=RenderSettings((0.0, 1.0, 0.0),
+                                                    alpha=0.5))
+    assert_equal(len(cache), 1)
+    ctx.render_layer(layer, settings=RenderSettings(mirror=True))
+    assert_equal(len(cache), 2)
+
+    # Converting the file in place invalidates its mask
+    layer.cam_source.to_metric()
+    ctx.render_layer(layer, settings=RenderSettings(mirror=True))
+    assert_equal(len(cache), 3)
+
+    cache.max_size = cache.size // 2
+    ctx.render_layer(layer, settings=RenderSettings(invert=True))
+    assert_equal(len(cache), 1)
+    assert_true(cache.size <= cache.max_size)
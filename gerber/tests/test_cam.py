@@ -68,6 +68,13 @@ def test_camfile_settings():
     assert_equal(cf.settings, FileSettings())
 
 
+def test_camfile_version():
+    cf = CamFile()
+    assert_equal(cf.version, 0)
+    cf.invalidate_spatial_index()
+    assert_equal(cf.version, 1)
+
+
 def test_bounds_override_smoketest():
     cf = CamFile()
     cf.bounds
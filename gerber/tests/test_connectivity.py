@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .tests import *
+from ..cam import FileSettings
+from ..connectivity import Connectivity
+from ..ipc356 import IPCNetlist, IPC356_TestRecord
+from ..primitives import Circle, Drill, Flash, Line, Region
+
+
+class _Layer(object):
+    def __init__(self, primitives, units='inch'):
+        self.primitives = primitives
+        self.units = units
+
+
+def _board():
+    """ Two layers joined by a via
+
+    Top: trace A from (0, 0) to (1, 0) ending on a via pad, and trace B
+    from (0, 1) to (1, 1). Bottom: a trace from the via to (2, 0), and a
+    pour under trace B that no hole reaches.
+    """
+    trace = Circle((0, 0), 0.01)
+    pad = Circle((0, 0), 0.05)
+    top = _Layer([Line((0, 0), (1, 0), trace), Flash(pad, (1, 0)),
+                  Line((0, 1), (1, 1), trace)])
+    points = [(0, 0.9), (1, 0.9), (1, 1.1), (0, 1.1), (0, 0.9)]
+    pour = Region([Line(start, end, Circle((0, 0), 0))
+                   for start, end in zip(points, points[1:])])
+    bottom = _Layer([Line((1, 0), (2, 0), trace), pour,
+                     Flash(pad, (1, 0), level_polarity='clear')])
+    drills = _Layer([Drill((1, 0), 0.02), Drill((5, 5), 0.02)])
+    return top, bottom, drills
+
+
+def _netlist(records):
+    return IPCNetlist([IPC356_TestRecord(net_name=name, x_coord=x,
+                                         y_coord=y, access=access)
+                       for name, (x, y), access in records],
+                      FileSettings(units='inch'))
+
+
+def test_nets():
+    top, bottom, drills = _board()
+    nets = Connectivity([top, bottom], [drills], processes=1)
+    assert_equal(nets.net_count, 3)
+    a, b = nets.primitive_nets[0][0], nets.primitive_nets[0][2]
+    assert_equal(list(nets.primitive_nets[0]), [a, a, b])
+    # The clear flash isn't copper
+    assert_equal(nets.primitive_nets[1][0], a)
+    assert_equal(nets.primitive_nets[1][2], -1)
+    pour = nets.primitive_nets[1][1]
+    assert_equal(len(set([a, b, pour])), 3)
+    assert_equal(list(nets.hole_nets), [a, -1])
+    assert_equal(nets.primitives(a),
+                 [(0, top.primitives[0]), (0, top.primitives[1]),
+                  (1, bottom.primitives[0])])
+    assert_equal(nets.net_at((1.5, 0), 1), a)
+    assert_equal(nets.net_at((0.5, 0.95), 1), pour)
+    assert_equal(nets.net_at((0.5, 0.5), 1), None)
+
+
+def test_nets_in_worker_processes():
+    top, bottom, drills = _board()
+    serial = Connectivity([top, bottom], [drills], processes=1)
+    parallel = Connectivity([top, bottom], [drills], processes=2)
+    for expected, found in zip(serial.primitive_nets, parallel.primitive_nets):
+        assert_equal(list(expected), list(found))
+
+
+def test_compare():
+    top, bottom, drills = _board()
+    nets = Connectivity([top, bottom], [drills], processes=1)
+    a = nets.primitive_nets[0][0]
+    b = nets.primitive_nets[0][2]
+    netlist = _netlist([('A', (0, 0), 'top'), ('A', (2, 0), 'bottom'),
+                        ('B', (0, 1), 'top'), ('B', (0.5, 0.95), 'bottom'),
+                        ('C', (1, 1), 'both'), ('D', (3, 3), 'top'),
+                        ('N/C', (0.5, 0), 'top')])
+    report = nets.compare(netlist)
+    pour = nets.primitive_nets[1][1]
+    assert_equal(report.nets['A'], [a])
+    assert_equal(report.opens, {'B': sorted([b, pour])})
+    assert_equal(report.shorts, {b: ['B', 'C']})
+    assert_equal(report.nets['D'], [])
+    assert_equal([record.net_name for record in report.unconnected], ['D'])
@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from .tests import *
+from ..drc import (_components, _sweep, check_annular_ring, check_clearance,
+                   check_layer, check_trace_width)
+from ..primitives import (Arc, Circle, Drill, Flash, Line, Rectangle, Region)
+
+
+class _Layer(object):
+    def __init__(self, primitives):
+        self.primitives = primitives
+
+
+def _square(x, y, size):
+    points = [(x, y), (x + size, y), (x + size, y + size), (x, y + size),
+              (x, y)]
+    return Region([Line(start, end, Circle((0, 0), 0))
+                   for start, end in zip(points, points[1:])])
+
+
+def test_sweep():
+    boxes = np.array([[0, 1, 0, 1], [0.5, 2, 0.5, 2], [3, 4, 0, 1],
+                      [0, 4, 3, 4], [1.5, 3.5, 1.9, 3.1]], dtype=float)
+    pairs = set()
+    for a, b in _sweep(boxes):
+        pairs.update((min(i, j), max(i, j)) for i, j in zip(a, b))
+    assert_equal(pairs, set([(0, 1), (1, 4), (3, 4)]))
+
+
+def test_components():
+    labels = _components(6, np.array([4, 1, 5]), np.array([5, 2, 2]))
+    assert_equal(list(labels), [0, 1, 1, 3, 1, 1])
+
+
+def test_clearance_between_traces():
+    aperture = Circle((0, 0), 0.01)
+    first = Line((0, 0), (1, 0), aperture)
+    second = Line((0, 0.015), (1, 0.015), aperture)
+    far = Line((0, 0.1), (1, 0.1), aperture)
+    violations = check_clearance(_Layer([first, second, far]), 0.01)
+    assert_equal(len(violations), 1)
+    violation = violations[0]
+    assert_equal(violation.rule, 'clearance')
+    assert_equal(violation.primitives, (first, second))
+    assert_almost_equal(violation.value, 0.005)
+    assert_almost_equal(violation.location[1], 0.0075)
+
+
+def test_clearance_ignores_connected_copper():
+    """ Traces meeting at a pad are connected, however close they run
+    """
+    aperture = Circle((0, 0), 0.01)
+    pad = Flash(Rectangle((0, 0), 0.1, 0.1), (0, 0))
+    first = Line((0.04, 0.005), (1, 0.005), aperture)
+    second = Line((0.04, -0.01), (1, -0.01), aperture)
+    violations = check_clearance(_Layer([pad, first, second]), 0.01)
+    assert_equal(violations, [])
+
+
+def test_clearance_inside_region():
+    """ A pad inside a pour is connected to it without touching its edges
+    """
+    pour = _square(0, 0, 1)
+    pad = Circle((0.5, 0.5), 0.1)
+    trace = Line((0.5, 0.57), (2, 0.57), Circle((0, 0), 0.01))
+    violations = check_clearance(_Layer([pour, pad, trace]), 0.01)
+    assert_equal(violations, [])
+
+
+def test_clearance_to_region_and_arc():
+    pour = _square(0, 0, 1)
+    arc = Arc((1.8, 0.5), (1.8, 0.5), (1.5, 0.5), 'counterclockwise',
+              Circle((0, 0), 0.02), 'multi-quadrant')
+    violations = check_clearance(_Layer([pour, arc]), 0.2)
+    assert_equal(len(violations), 1)
+    # The full circle reaches x = 1.5 - 0.3 - 0.01
+    assert_almost_equal(violations[0].value, 0.19, 2)
+    assert_almost_equal(violations[0].location[0], 1.095, 2)
+
+
+def test_clear_polarity_is_ignored():
+    aperture = Circle((0, 0), 0.01)
+    first = Line((0, 0), (1, 0), aperture)
+    second = Line((0, 0.015), (1, 0.015), aperture, level_polarity='clear')
+    assert_equal(check_clearance(_Layer([first, second]), 0.01), [])
+
+
+def test_trace_width():
+    narrow = Line((0, 0), (1, 0), Circle((0, 0), 0.004))
+    wide = Line((0, 1), (1, 1), Circle((0, 0), 0.01))
+    violations = check_trace_width(_Layer([narrow, wide]), 0.006)
+    assert_equal(len(violations), 1)
+    assert_equal(violations[0].primitives, (narrow,))
+    assert_equal(violations[0].value, 0.004)
+    assert_equal(violations[0].location, (0.5, 0))
+
+
+def test_annular_ring():
+    pad = Flash(Circle((0, 0), 0.08), (1, 1))
+    square = Flash(Rectangle((0, 0), 0.06, 0.06), (2, 1))
+    copper = _Layer([pad, square])
+    drills = _Layer([Drill((1, 1), 0.04), Drill((2.01, 1), 0.03),
+                     Drill((3, 1), 0.04)])
+    violations = check_annular_ring(copper, drills, 0.015)
+    assert_equal(len(violations), 2)
+    offset, missing = violations
+    assert_equal(offset.primitives, (drills.primitives[1], square))
+    assert_almost_equal(offset.value, 0.03 - 0.01 - 0.015)
+    assert_equal(missing.primitives, (drills.primitives[2],))
+    assert_equal(missing.value, None)
+    assert_equal(check_annular_ring(copper, drills, 0.004)[0].primitives,
+                 (drills.primitives[2],))
+
+
+def test_check_layer():
+    aperture = Circle((0, 0), 0.004)
+    layer = _Layer([Line((0, 0), (1, 0), aperture),
+                    Line((0, 0.01), (1, 0.01), aperture)])
+    rules = [v.rule for v in check_layer(layer, clearance=0.01,
+                                         trace_width=0.005)]
+    assert_equal(rules, ['clearance', 'trace_width', 'trace_width'])
+    assert_raises(ValueError, check_layer, layer, annular_ring=0.01)
@@ -18,7 +18,7 @@ NCDRILL_FILE = os.path.join(os.path.dirname(__file__),
 def test_format_detection():
     """ Test file type detection
     """
-    with open(NCDRILL_FILE, "rU") as f:
+    with open(NCDRILL_FILE, "r") as f:
         data = f.read()
     settings = detect_excellon_format(data)
     assert_equal(settings['format'], (2, 4))
@@ -37,9 +37,9 @@ def test_read():
 def test_write():
     ncdrill = read(NCDRILL_FILE)
     ncdrill.write('test.ncd')
-    with open(NCDRILL_FILE, "rU") as src:
+    with open(NCDRILL_FILE, "r") as src:
         srclines = src.readlines()
-    with open('test.ncd', "rU") as res:
+    with open('test.ncd', "r") as res:
         for idx, line in enumerate(res):
             assert_equal(line.strip(), srclines[idx].strip())
     os.remove('test.ncd')
@@ -194,6 +194,17 @@ def test_parse_incremental_position():
     assert_equal(p.pos, [2., 2.])
 
 
+def test_parse_converts_coordinates_ahead():
+    p = ExcellonParser(FileSettings(format=(2, 4), zeros='leading'))
+    p.active_tool = ExcellonTool(FileSettings(), number=1)
+    p.COORDINATE_BATCH_SIZE = 2
+    p.parse_raw('X01Y02\nX01Y0200\nX-03\nY5\n')
+    assert_equal(p._coordinates, {None: None, '01': 1.0, '02': 2.0,
+                                  '0200': 2.0, '-03': -3.0, '5': 50.0})
+    assert_equal([(stmt.x, stmt.y) for stmt in p.statements],
+                 [(1.0, 2.0), (1.0, 2.0), (-3.0, None), (None, 50.0)])
+
+
 def test_parse_unknown():
     p = ExcellonParser(FileSettings())
     p._parse_line('Not A Valid Statement')
@@ -21,6 +21,8 @@ def test_excellontstmt():
     stmt.to_inch()
     stmt.to_metric()
     stmt.offset()
+    stmt.note = 'custom'
+    assert_equal(stmt.note, 'custom')
 
 
 def test_excellontool_factory():
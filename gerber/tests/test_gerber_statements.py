@@ -689,6 +689,22 @@ def test_statement_string():
     assert_in('type=PARAM', str(stmt))
 
 
+def test_statement_slots():
+    """ Test compact coordinate and aperture statements
+    """
+    coord = CoordStmt('G01', 0.1, 0.2, None, None, 'D01', None)
+    aperture = ApertureStmt(10)
+    for stmt in (coord, aperture):
+        # Every attribute is in a slot
+        assert_equal(vars(stmt), {})
+    assert_equal(Statement.__str__(coord),
+                 '<CoordStmt type=COORD units=inch function=G01 '
+                 'x=0.1 y=0.2 i=None j=None op=D01>')
+    assert_equal(coord, CoordStmt('G01', 0.1, 0.2, None, None, 'D01', None))
+    assert_not_equal(coord, CoordStmt('G01', 0.1, 0.3, None, None, 'D01',
+                                      None))
+
+
 def test_ADParamStmt_factory():
     """ Test ADParamStmt factory
     """
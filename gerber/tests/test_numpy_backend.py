@@ -0,0 +1,128 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from io import BytesIO
+
+import numpy as np
+
+from .tests import *
+from ..layers import PCBLayer
+from ..primitives import (Arc, Circle, Flash, Line, Obround, Rectangle,
+                          Region)
+from ..render.numpy_backend import GerberNumpyContext
+from ..render.render import RenderSettings
+from ..rs274x import read
+
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def _render(primitives, bounds=((0, 1), (0, 1)), scale=10, invert=False):
+    ctx = GerberNumpyContext(scale=scale)
+    ctx.set_bounds(bounds)
+    ctx._render_layer(_Layer(primitives), RenderSettings(invert=invert))
+    return ctx.mask
+
+
+class _Layer(object):
+    def __init__(self, primitives):
+        self.primitives = primitives
+
+
+def test_render_circle():
+    mask = _render([Circle((0.5, 0.5), 0.4)])
+    assert_equal(mask.shape, (10, 10))
+    assert_true(mask[5, 5])
+    assert_false(mask[0, 0])
+    # Pixel centers within 0.2 of the center
+    assert_equal(mask.sum(), 12)
+
+
+def test_render_rectangle_with_hole():
+    mask = _render([Rectangle((0.5, 0.5), 0.8, 0.8, hole_diameter=0.2)])
+    assert_true(mask[1, 1])
+    assert_false(mask[0, 0])
+    assert_false(mask[5, 5])
+
+
+def test_render_clear_polarity():
+    mask = _render([Rectangle((0.5, 0.5), 1.0, 1.0),
+                    Circle((0.5, 0.5), 0.4, level_polarity='clear')])
+    assert_false(mask[5, 5])
+    assert_true(mask[0, 0])
+
+
+def test_render_invert():
+    mask = _render([Circle((0.5, 0.5), 0.4)], invert=True)
+    assert_false(mask[5, 5])
+    assert_true(mask[0, 0])
+
+
+def test_render_line_capsule():
+    aperture = Circle((0, 0), 0.2)
+    mask = _render([Line((0.2, 0.5), (0.8, 0.5), aperture)])
+    # Rows are counted from the top of the board
+    assert_true(mask[4, 1:9].all())
+    assert_false(mask[1].any())
+    assert_false(mask[4, 0])
+
+
+def test_render_arc():
+    aperture = Circle((0, 0), 0.1)
+    arc = Arc((0.9, 0.5), (0.1, 0.5), (0.5, 0.5), 'counterclockwise',
+              aperture, 'multi-quadrant')
+    mask = _render([arc])
+    # Upper half ring only
+    assert_true(mask[1, 4])
+    assert_false(mask[8, 4])
+    assert_false(mask[4, 4])
+
+
+def test_render_single_quadrant_arc_without_sweep():
+    aperture = Circle((0, 0), 0.3)
+    arc = Arc((0.9, 0.5), (0.9, 0.5), (0.5, 0.5), 'counterclockwise',
+              aperture, 'single-quadrant')
+    mask = _render([arc])
+    # A dot at its ends, not a full ring
+    assert_true(mask[4, 8])
+    assert_false(mask[4, 1])
+    assert_false(mask[1, 4])
+
+
+def test_render_region():
+    aperture = Circle((0, 0), 0)
+    region = Region([Line((0.1, 0.1), (0.9, 0.1), aperture),
+                     Line((0.9, 0.1), (0.1, 0.9), aperture),
+                     Line((0.1, 0.9), (0.1, 0.1), aperture)])
+    mask = _render([region])
+    assert_true(mask[8, 1])
+    assert_false(mask[1, 8])
+
+
+def test_render_obround():
+    mask = _render([Obround((0.5, 0.5), 0.8, 0.4)])
+    assert_true(mask[5, 1])
+    assert_true(mask[5, 8])
+    assert_false(mask[2, 5])
+
+
+def test_render_flash():
+    aperture = Circle((0, 0), 0.2)
+    flashed = _render([Flash(aperture, (0.3, 0.6))])
+    placed = _render([Circle((0.3, 0.6), 0.2)])
+    assert_equal(flashed.tolist(), placed.tolist())
+    assert_equal(aperture.position, (0, 0))
+
+
+def test_render_layers_png():
+    layer = PCBLayer.from_cam(
+        read(os.path.join(RESOURCES, 'example_simple_contour.gbr')))
+    ctx = GerberNumpyContext()
+    fobj = BytesIO()
+    ctx.render_layers([layer], fobj, max_width=100, max_height=100)
+    assert_equal(fobj.getvalue()[:8], b'\x89PNG\r\n\x1a\n')
+    assert_true(ctx.mask.any())
+    pixels = ctx.pixels()
+    assert_equal(pixels.dtype, np.uint8)
+    assert_equal(pixels.shape[:2], ctx.mask.shape)
@@ -0,0 +1,36 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+from .tests import *
+from ..pcb import PCB
+
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def _layer_files(pcb):
+    return [(layer.layer_class, layer.cam_source.filename)
+            for layer in pcb.layers]
+
+
+def test_from_directory_workers():
+    pcb = PCB.from_directory(RESOURCES)
+    parallel = PCB.from_directory(RESOURCES, workers=2)
+    assert_true(len(pcb) > 0)
+    assert_equal(_layer_files(parallel), _layer_files(pcb))
+    assert_equal(parallel.name, pcb.name)
+
+
+def test_from_directory_lazy():
+    pcb = PCB.from_directory(RESOURCES)
+    lazy = PCB.from_directory(RESOURCES, lazy=True)
+    assert_equal([layer.layer_class for layer in lazy.layers],
+                 [layer.layer_class for layer in pcb.layers])
+    assert_false(any(layer.loaded for layer in lazy.layers))
+    assert_equal(lazy.board_bounds, pcb.board_bounds)
+    assert_true(any(layer.loaded for layer in lazy.layers))
+    lazy.preload()
+    assert_true(all(layer.loaded for layer in lazy.layers))
+    assert_equal(_layer_files(lazy), _layer_files(pcb))
@@ -0,0 +1,104 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+from .tests import *
+from ..primitive_table import PrimitiveTable, LINE, ARC, FLASH, OTHER
+from ..primitives import Arc, Circle, Flash, Line, Rectangle, Region
+from ..rs274x import loads
+
+
+TOP_COPPER_FILE = os.path.join(os.path.dirname(__file__),
+                               'resources/top_copper.GTL')
+
+
+def _primitives():
+    circle = Circle((0, 0), 0.5, units='inch')
+    rect = Rectangle((0, 0), 2, 1, units='inch')
+    line = Line((0, 0), (5, 0), circle, units='inch')
+    arc = Arc((1, 0), (0, 1), (0, 0), 'counterclockwise', circle,
+              'multi-quadrant', level_polarity='clear', units='inch')
+    flash = Flash(rect, (10, 10), units='inch')
+    region = Region([Line((0, 0), (0, -3), None, units='inch'),
+                     Line((0, -3), (-1, -3), None, units='inch'),
+                     Line((-1, -3), (0, 0), None, units='inch')],
+                    units='inch')
+    return [line, arc, flash, region]
+
+
+def test_table_views():
+    primitives = _primitives()
+    table = PrimitiveTable.from_primitives(primitives)
+    assert_equal(len(table), 4)
+    assert_equal(table.units, 'inch')
+    assert_equal(table.kind.tolist(), [LINE, ARC, FLASH, OTHER])
+    # Apertures are stored once and shared by the views
+    assert_equal(len(table.apertures), 2)
+    views = table.primitives
+    for view, primitive in zip(views, primitives):
+        assert_equal(type(view), type(primitive))
+        assert_equal(view.bounding_box, primitive.bounding_box)
+        assert_equal(view.level_polarity, primitive.level_polarity)
+    assert_equal(views[0].start, (0, 0))
+    assert_equal(views[0].end, (5, 0))
+    assert_true(views[0].aperture is table.apertures[0])
+    assert_equal(views[0].aperture, primitives[0].aperture)
+    assert_equal(views[1].direction, 'counterclockwise')
+    assert_true(views[3] is table.others[0])
+    assert_true(views[3] is not primitives[3])
+    assert_equal(table[2].position, (10, 10))
+
+
+def test_table_bounds():
+    primitives = _primitives()
+    table = PrimitiveTable.from_primitives(primitives)
+    assert_equal(table.bounding_box, ((-1.0, 11.0), (-3.0, 10.5)))
+    assert_equal(PrimitiveTable().bounding_box, None)
+
+    with open(TOP_COPPER_FILE, 'r') as f:
+        top_copper = loads(f.read(), TOP_COPPER_FILE)
+    table = PrimitiveTable.from_primitives(top_copper.primitives,
+                                           top_copper.units)
+    for value, expected in zip(sum(table.bounding_box, ()),
+                               sum(top_copper.bounding_box, ())):
+        assert_almost_equal(value, expected)
+
+
+def test_table_conversion():
+    table = PrimitiveTable.from_primitives(_primitives())
+    table.to_inch()
+    assert_equal(table.units, 'inch')
+    table.to_metric()
+    assert_equal(table.units, 'metric')
+    assert_equal(table[0].end, (127.0, 0.0))
+    assert_equal(table[0].aperture.diameter, 12.7)
+    assert_equal(table[0].units, 'metric')
+    assert_equal(table[3].units, 'metric')
+    (min_x, max_x), (min_y, max_y) = table.bounding_box
+    assert_almost_equal(min_x, -1.0 * 25.4)
+    assert_almost_equal(max_y, 10.5 * 25.4)
+    table.to_inch()
+    assert_almost_equal(table[2].position[0], 10.0)
+
+
+def test_table_offset():
+    table = PrimitiveTable.from_primitives(_primitives())
+    table.offset(1, -1)
+    assert_equal(table[0].start, (1, -1))
+    assert_equal(table[1].center, (1, -1))
+    assert_equal(table[2].position, (11, 9))
+    assert_equal(table.bounding_box, ((0.0, 12.0), (-4.0, 9.5)))
+
+
+def test_table_leaves_source_unchanged():
+    with open(TOP_COPPER_FILE, 'r') as f:
+        top_copper = loads(f.read(), TOP_COPPER_FILE)
+    bounds = top_copper.bounding_box
+    table = PrimitiveTable.from_primitives(top_copper.primitives,
+                                           top_copper.units)
+    table.to_metric()
+    table.offset(1, 1)
+    assert_equal(top_copper.bounding_box, bounds)
+    assert_equal(top_copper.primitives[0].aperture.units, 'inch')
+    assert_true(table.apertures[0] is not top_copper.primitives[0].aperture)
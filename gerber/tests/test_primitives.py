@@ -4,6 +4,8 @@
 # Author: Hamilton Kibbe <ham@hamiltonkib.be>
 from operator import add
 
+import numpy as np
+
 from ..primitives import *
 from .tests import *
 
@@ -164,6 +166,21 @@ def test_line_offset():
     assert_equal(l.end, (2., 2.))
 
 
+def test_compact_primitives():
+    """ Test that high-volume primitives have no per-instance __dict__
+    """
+    c = Circle((0, 0), 1)
+    prims = [Line((0, 0), (1, 1), c),
+             Arc((0, 1), (1, 0), (0, 0), 'clockwise', c, 'single-quadrant'),
+             Flash(c, (1, 1)), Drill((0, 0), 1), Slot((0, 0), (1, 1), 1)]
+    for prim in prims:
+        assert_false(hasattr(prim, '__dict__'))
+    assert_true(hasattr(c, '__dict__'))
+    assert_equal(Line._to_convert, ('start', 'end', 'aperture'))
+    assert_equal(Line((0, 0), (1, 1), c), prims[0])
+    assert_not_equal(Line((0, 0), (1, 2), c), prims[0])
+
+
 def test_arc_radius():
     """ Test Arc primitive radius calculation
     """
@@ -497,6 +514,11 @@ def test_rectangle_bounds():
     xbounds, ybounds = r.bounding_box
     assert_array_almost_equal(xbounds, (-math.sqrt(2), math.sqrt(2)))
     assert_array_almost_equal(ybounds, (-math.sqrt(2), math.sqrt(2)))
+    r = Rectangle((0, 0), 4, 2, rotation=-30)
+    xbounds, ybounds = r.bounding_box
+    assert_array_almost_equal(xbounds, (-math.sqrt(3) - 0.5, math.sqrt(3) + 0.5))
+    assert_array_almost_equal(ybounds, (-1 - math.sqrt(3) / 2,
+                                        1 + math.sqrt(3) / 2))
 
 def test_rectangle_vertices():
     sqrt2 = math.sqrt(2.0)
@@ -520,9 +542,19 @@ def test_rectangle_vertices():
 def test_rectangle_segments():
 
     r = Rectangle((0, 0), 2.0, 2.0)
-    expected = [vtx for segment in r.segments for vtx in segment]
-    for vertex in r.vertices:
-        assert_in(vertex, expected)
+    assert_equal(r.segments.shape, (4, 2, 2))
+    # Each edge runs from one vertex to the next, the last one closing it
+    vertices = r.vertices
+    for i, (start, end) in enumerate(r.segments.tolist()):
+        assert_equal(tuple(start), vertices[i])
+        assert_equal(tuple(end), vertices[(i + 1) % 4])
+    assert_equal(r.segment_boxes.tolist(),
+                 [[-1, -1, -1, 1], [-1, 1, 1, 1], [1, 1, -1, 1],
+                  [-1, 1, -1, -1]])
+
+    r.offset(1, 0)
+    assert_equal(r.segment_boxes[0].tolist(), [0, 0, -1, 1])
+    assert_true(r == Rectangle((1, 0), 2.0, 2.0))
 
 
 def test_rectangle_conversion():
@@ -771,6 +803,11 @@ def test_chamfer_rectangle_vertices():
     for chamfer, corners, expected in TEST_VECTORS:
         r = ChamferRectangle((0, 0), 5, 5, chamfer, corners)
         assert_equal(set(r.vertices), set(expected))
+        # The outline is walked in order, so every edge is a side or a
+        # chamfer and none cuts across the rectangle
+        lengths = np.hypot(*(r.segments[:, 1] - r.segments[:, 0]).T)
+        assert_equal(len(lengths), len(expected))
+        assert_true(max(lengths) <= 5.0)
 
 
 def test_round_rectangle_ctor():
@@ -1017,6 +1054,16 @@ def test_polygon_offset():
     assert_equal(p.position, (1., 1.))
 
 
+def test_polygon_segments():
+    """ Test polygon edges join consecutive vertices only
+    """
+    p = Polygon((0, 0), 100, 1, 0)
+    assert_equal(p.segments.shape, (100, 2, 2))
+    assert_equal(p.segment_boxes.shape, (100, 4))
+    assert_true((p.segments[1:, 0] == p.segments[:-1, 1]).all())
+    assert_true((p.segments[-1, 1] == p.segments[0, 0]).all())
+
+
 def test_region_ctor():
     """ Test Region creation
     """
@@ -1357,3 +1404,75 @@ def test_slot_bounds():
         s = Slot(start, end, 2.0)
         assert_equal(s.bounding_box, expected)
 
+
+
+def test_flash_bounds():
+    """ Test Flash bounding box calculation
+    """
+    aperture = Rectangle((0, 0), 2, 4)
+    f = Flash(aperture, (1, 1))
+    assert_equal(f.bounding_box, ((0, 2), (-1, 3)))
+    assert_equal(aperture.bounding_box, ((-1, 1), (-2, 2)))
+
+
+def test_flash_segments():
+    """ Test Flash edges are the aperture's, moved to the flash position
+    """
+    aperture = Rectangle((0, 0), 2, 4)
+    f = Flash(aperture, (1, 1))
+    assert_equal(f.segments.tolist(),
+                 (aperture.segments + (1, 1)).tolist())
+    assert_equal(f.segment_boxes[0].tolist(), [0, 0, -1, 3])
+    assert_equal(Flash(Circle((0, 0), 1), (1, 1)).segments, None)
+
+
+def test_flash_shares_aperture():
+    """ Test that flashes reference the aperture without copying it
+    """
+    aperture = Circle((0, 0), 2)
+    f1 = Flash(aperture, (1, 1))
+    f2 = Flash(aperture, (5, 5), level_polarity='clear')
+    assert_true(f1.aperture is f2.aperture)
+    assert_equal(f1.bounding_box, ((0, 2), (0, 2)))
+    assert_equal(f2.bounding_box, ((4, 6), (4, 6)))
+    assert_equal(f2.level_polarity, 'clear')
+    assert_equal(aperture.position, (0, 0))
+
+
+def test_flash_offset():
+    aperture = Circle((0, 0), 1)
+    f = Flash(aperture, (0, 0))
+    f.offset(1, 0)
+    assert_equal(f.position, (1., 0.))
+    f.offset(0, 1)
+    assert_equal(f.position, (1., 1.))
+    assert_equal(aperture.position, (0, 0))
+
+
+def test_flash_conversion():
+    aperture = Circle((0, 0), 254., units='metric')
+    f1 = Flash(aperture, (2.54, 25.4), units='metric')
+    f2 = Flash(aperture, (25.4, 2.54), units='metric')
+    f1.to_inch()
+    f2.to_inch()
+    assert_equal(f1.position, (0.1, 1.))
+    assert_equal(f2.position, (1., 0.1))
+    assert_equal(aperture.diameter, 10.)
+
+    f1.to_metric()
+    f2.to_metric()
+    assert_array_almost_equal(f1.position, (2.54, 25.4))
+    assert_array_almost_equal(f2.position, (25.4, 2.54))
+    assert_equal(aperture.diameter, 254.)
+
+
+def test_flash_to_primitive():
+    aperture = Circle((0, 0), 2, units='inch')
+    f = Flash(aperture, (1, 1), level_polarity='clear', units='inch')
+    c = f.to_primitive()
+    assert_true(isinstance(c, Circle))
+    assert_false(c is aperture)
+    assert_equal(c.position, (1, 1))
+    assert_equal(c.level_polarity, 'clear')
+    assert_equal(c.bounding_box, f.bounding_box)
+    assert_equal(aperture.position, (0, 0))
@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+
+from .tests import assert_equal
+from ..reader import read_text, iter_text
+
+
+TOP_COPPER_FILE = os.path.join(os.path.dirname(__file__),
+                               'resources/top_copper.GTL')
+
+MIXED_NEWLINES = b'G04 a*\r\nG04 b*\rG04 c*\nG04 \xc2\xb5*\r'
+
+
+def _temp_file(data):
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_read_text():
+    with open(TOP_COPPER_FILE, 'r') as f:
+        assert_equal(read_text(TOP_COPPER_FILE), f.read())
+
+
+def test_read_text_newlines():
+    path = _temp_file(MIXED_NEWLINES)
+    try:
+        assert_equal(read_text(path), u'G04 a*\nG04 b*\nG04 c*\nG04 \xb5*\n')
+    finally:
+        os.remove(path)
+
+
+def test_read_text_empty():
+    path = _temp_file(b'')
+    try:
+        assert_equal(read_text(path), u'')
+        assert_equal(list(iter_text(path)), [])
+    finally:
+        os.remove(path)
+
+
+def test_iter_text():
+    expected = u'G04 a*\nG04 b*\nG04 c*\nG04 \xb5*\n'
+    path = _temp_file(MIXED_NEWLINES)
+    try:
+        # Chunk boundaries split the '\r\n' pair and the two-byte character
+        for chunk_size in (1, 2, 3, 7, 1024):
+            assert_equal(u''.join(iter_text(path, chunk_size)), expected)
+            assert_equal(u''.join(iter_text(io.BytesIO(MIXED_NEWLINES),
+                                            chunk_size)), expected)
+    finally:
+        os.remove(path)
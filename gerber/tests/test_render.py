@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+
+from .tests import *
+from ..primitives import Arc, Circle, Line, Region
+from ..render.render import GerberContext, _arc_sweep, _region_points
+
+
+class _LoggingContext(GerberContext):
+
+    def __init__(self):
+        super(_LoggingContext, self).__init__()
+        self.rendered = []
+
+    def _render_circle(self, primitive, color):
+        self.rendered.append(('circle', primitive))
+
+    def _render_line(self, primitive, color):
+        self.rendered.append(('line', primitive))
+
+
+def test_render_dispatch():
+    ctx = _LoggingContext()
+    circle = Circle((0, 0), 1)
+    line = Line((0, 0), (1, 1), circle)
+    ctx.render(circle)
+    ctx.render(line)
+    assert_equal(ctx.rendered, [('circle', circle), ('line', line)])
+
+
+def test_render_many():
+    ctx = _LoggingContext()
+    circle = Circle((0, 0), 1)
+    line = Line((0, 0), (1, 1), circle)
+    ctx.render_many([line, None, circle])
+    assert_equal(ctx.rendered, [('line', line), ('circle', circle)])
+
+
+def test_render_subclass_uses_base_renderer():
+    class Pad(Circle):
+        pass
+
+    ctx = _LoggingContext()
+    pad = Pad((0, 0), 1)
+    ctx.render(pad)
+    assert_equal(ctx.rendered, [('circle', pad)])
+
+
+def test_register_renderer():
+    class Marker(Circle):
+        pass
+
+    class MarkerContext(_LoggingContext):
+        pass
+
+    MarkerContext.register_renderer(
+        Marker, lambda ctx, primitive, color: ctx.rendered.append(
+            ('marker', primitive)))
+    marker = Marker((0, 0), 1)
+
+    ctx = MarkerContext()
+    ctx.render(marker)
+    assert_equal(ctx.rendered, [('marker', marker)])
+
+    # Other context classes are not affected
+    ctx = _LoggingContext()
+    ctx.render(marker)
+    assert_equal(ctx.rendered, [('circle', marker)])
+
+
+def test_arc_sweep():
+    aperture = Circle((0, 0), 0)
+    arc = Arc((1, 0), (0, 1), (0, 0), 'counterclockwise', aperture,
+              'multi-quadrant')
+    assert_almost_equal(_arc_sweep(arc), math.pi / 2)
+    arc.direction = 'clockwise'
+    assert_almost_equal(_arc_sweep(arc), -1.5 * math.pi)
+    # Coincident ends are a full circle only in multi-quadrant mode
+    arc = Arc((1, 0), (1, 0), (0, 0), 'clockwise', aperture, 'multi-quadrant')
+    assert_equal(_arc_sweep(arc), -2 * math.pi)
+    arc.quadrant_mode = 'single-quadrant'
+    assert_equal(_arc_sweep(arc), 0)
+
+
+def test_region_points_flattens_arcs():
+    """Arcs in region outlines are flattened within the scaled tolerance"""
+    aperture = Circle((0, 0), 0)
+    region = Region([Line((0, 0), (1, 0), aperture),
+                     Arc((1, 0), (1, 1), (1, 0.5), 'counterclockwise',
+                         aperture, 'multi-quadrant'),
+                     Line((1, 1), (0, 1), aperture),
+                     Line((0, 1), (0, 0), aperture)])
+    coarse = _region_points(region, 10, 100)
+    fine = _region_points(region, 0.5, 100)
+    assert_equal(coarse[:2], [(0, 0), (100, 0)])
+    assert_equal(coarse[-3:], [(100, 100), (0, 100), (0, 0)])
+    assert_true(len(fine) > len(coarse))
+    for x, y in fine[2:-3]:
+        assert_true(x > 100)
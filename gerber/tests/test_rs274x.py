@@ -2,9 +2,13 @@
 # -*- coding: utf-8 -*-
 
 # Author: Hamilton Kibbe <ham@hamiltonkib.be>
+import io
 import os
 
-from ..rs274x import read, GerberFile
+from ..primitives import Flash, Line
+from ..gerber_statements import (CoordStmt, ApertureStmt, FSParamStmt,
+                                 MOParamStmt, UnknownStmt, CommentStmt, EofStmt)
+from ..rs274x import read, loads, iter_primitives, GerberFile
 from .tests import *
 
 
@@ -53,3 +57,58 @@ def test_conversion():
 
     for i, m in zip(top_copper.primitives, top_copper_inch.primitives):
         assert_equal(i, m)
+
+
+def test_flashes_share_apertures():
+    top_copper = read(TOP_COPPER_FILE)
+    flashes = [p for p in top_copper.primitives if isinstance(p, Flash)]
+    assert_true(len(flashes) > 0)
+    apertures = list(top_copper.apertures)
+    for flash in flashes:
+        assert_true(any(flash.aperture is aperture for aperture in apertures))
+
+
+def test_statements_split_over_lines():
+    gerber = loads('%FSLAX24Y24*\nMOIN*%\n%ADD10C,\n0.01*%\nG04comment\n'
+                   'D10*\nX10\n000Y20000D02*X30000D01*\n%TF.Part,Other*%\nM02*\n')
+    types = [type(stmt) for stmt in gerber.statements]
+    assert_equal(types[:2], [FSParamStmt, MOParamStmt])
+    assert_equal(gerber.units, 'inch')
+    assert_equal(gerber.statements[2].d, 10)
+    assert_equal(types[3:], [CommentStmt, ApertureStmt, CoordStmt, CoordStmt,
+                             UnknownStmt, EofStmt])
+    assert_equal(gerber.statements[3].comment, 'comment')
+    assert_equal((gerber.statements[5].x, gerber.statements[5].y), (1.0, 2.0))
+    assert_equal((gerber.statements[6].x, gerber.statements[6].y), (3.0, None))
+    assert_equal(gerber.statements[7].line, '%TF.Part,Other*%')
+
+
+def test_iter_primitives():
+    with open(TOP_COPPER_FILE, 'r') as f:
+        top_copper = loads(f.read(), TOP_COPPER_FILE)
+    with open(TOP_COPPER_FILE, 'r') as f:
+        primitives = list(iter_primitives(f, chunk_size=100))
+    assert_equal(len(primitives), len(top_copper.primitives))
+    for streamed, parsed in zip(primitives, top_copper.primitives):
+        assert_equal(type(streamed), type(parsed))
+        assert_equal(streamed.bounding_box, parsed.bounding_box)
+    assert_equal(len(list(iter_primitives(TOP_COPPER_FILE))), len(primitives))
+
+
+def test_lines_share_points():
+    top_copper = read(TOP_COPPER_FILE)
+    lines = [p for p in top_copper.primitives if isinstance(p, Line)]
+    shared = [b.start is a.end for a, b in zip(lines, lines[1:])
+              if b.start == a.end]
+    assert_true(shared)
+    assert_true(all(shared))
+
+
+def test_iter_primitives_percent_in_comment():
+    data = ('G04 50% fill*\n%FSLAX24Y24*%\n%MOIN*%\nG04 100%\n'
+            '%ADD10C,0.01*%\nD10*\nX0Y0D03*\nX10000Y0D03*\nM02*\n')
+    parsed = loads(data)
+    for chunk_size in range(1, len(data) + 1):
+        primitives = list(iter_primitives(io.StringIO(data), chunk_size))
+        assert_equal([p.position for p in primitives],
+                     [p.position for p in parsed.primitives])
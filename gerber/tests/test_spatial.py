@@ -0,0 +1,94 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+from .tests import *
+from ..common import read as read_cam
+from ..layers import PCBLayer
+from ..primitives import Circle, Flash, Line, Rectangle
+from ..rs274x import read
+from ..spatial import SpatialIndex
+
+
+def _grid(count=10):
+    pad = Circle((0, 0), 0.2)
+    return [Flash(pad, (x, y)) for y in range(count) for x in range(count)]
+
+
+def test_query_window():
+    flashes = _grid()
+    index = SpatialIndex(flashes)
+    found = index.query_window(((2.95, 4.05), (0.5, 1.5)))
+    assert_equal([f.position for f in found], [(3, 1), (4, 1)])
+    assert_equal(index.query_window(((20, 21), (20, 21))), [])
+
+
+def test_query_window_large_primitive():
+    """ Primitives spanning many cells are found anywhere in their box
+    """
+    primitives = _grid() + [Rectangle((5, 5), 10, 10)]
+    index = SpatialIndex(primitives)
+    found = index.query_window(((5.3, 5.4), (5.3, 5.4)))
+    assert_equal(found, [primitives[-1]])
+
+
+def test_query_point():
+    flashes = _grid()
+    index = SpatialIndex(flashes)
+    assert_equal(index.query_point((3.05, 3.05)), [flashes[33]])
+    assert_equal(index.query_point((3.5, 3.5)), [])
+    # 0.1 from the box in x and y, so 0.14 away
+    assert_equal(index.query_point((3.2, 3.2), 0.12), [])
+    assert_equal(index.query_point((3.2, 3.2), 0.15), [flashes[33]])
+
+
+def test_nearest():
+    flashes = _grid()
+    index = SpatialIndex(flashes)
+    assert_equal(index.nearest((7.1, 2.2)), [flashes[27]])
+    assert_equal(index.nearest((7.1, 2.5), 2), [flashes[27], flashes[37]])
+    # Far outside the grid
+    assert_equal(index.nearest((-100, 50)), [flashes[90]])
+    assert_equal(len(index.nearest((0, 0), 500)), 100)
+
+
+def test_empty_index():
+    index = SpatialIndex([])
+    assert_equal(index.query_window(((0, 1), (0, 1))), [])
+    assert_equal(index.nearest((0, 0)), [])
+
+
+def test_camfile_index_invalidation():
+    gerber = read(os.path.join(os.path.dirname(__file__),
+                               'resources', 'top_copper.GTL'))
+    index = gerber.spatial_index
+    assert_true(gerber.spatial_index is index)
+    primitive = gerber.primitives[0]
+    assert_true(primitive in index.query_window(primitive.bounding_box))
+    gerber.offset(10, 10)
+    assert_false(gerber.spatial_index is index)
+    assert_true(primitive in gerber.spatial_index.query_window(
+        primitive.bounding_box))
+
+
+def test_layer_index():
+    gerber = read(os.path.join(os.path.dirname(__file__),
+                               'resources', 'top_copper.GTL'))
+    layer = PCBLayer(cam_source=gerber, layer_class='top')
+    assert_true(layer.spatial_index is gerber.spatial_index)
+    line = Line((0, 0), (1, 0), Circle((0, 0), 0.1))
+    layer.primitives = [line]
+    assert_equal(layer.spatial_index.query_point((0.5, 0)), [line])
+
+
+def test_netlist_index():
+    """ Test records are indexed as points at their position """
+    ipc = read_cam(os.path.join(os.path.dirname(__file__),
+                                'resources', 'ipc-d-356.ipc'))
+    index = ipc.spatial_index
+    assert_equal(len(index), len(ipc.primitives))
+    record = ipc.primitives[0]
+    assert_true(record in index.query_point(record.position))
+    layer = PCBLayer.from_cam(ipc)
+    assert_true(record in layer.spatial_index.query_point(record.position))
@@ -0,0 +1,161 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from io import StringIO
+from xml.dom.minidom import parseString
+
+from .tests import *
+from ..layers import PCBLayer
+from ..primitives import Arc, Circle, Flash, Line, Obround, Rectangle, Region
+from ..render.render import RenderSettings
+from ..render.svg_backend import GerberSvgContext
+from ..rs274x import read
+
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def _render(primitives, bounds=((0, 1), (0, 1)), settings=None):
+    ctx = GerberSvgContext()
+    out = StringIO()
+    ctx.begin(out, bounds)
+    ctx._begin_layer(settings or RenderSettings())
+    ctx.render_many(primitives)
+    ctx._end_layer(settings or RenderSettings())
+    ctx.end()
+    return parseString(out.getvalue())
+
+
+def _paths(doc):
+    return doc.getElementsByTagName('path')
+
+
+def test_polarity_runs():
+    """ Consecutive primitives with the same polarity share a path
+    """
+    doc = _render([Circle((0.2, 0.2), 0.1), Circle((0.5, 0.5), 0.1),
+                   Circle((0.5, 0.5), 0.05, level_polarity='clear'),
+                   Circle((0.8, 0.8), 0.1)])
+    paths = _paths(doc)
+    assert_equal([p.getAttribute('fill') for p in paths],
+                 ['#fff', '#000', '#fff'])
+    assert_equal(paths[0].getAttribute('d').count('M'), 2)
+
+
+def test_strokes():
+    aperture = Circle((0, 0), 0.1)
+    doc = _render([Line((0, 0), (1, 1), aperture),
+                   Line((1, 0), (0, 1), aperture)])
+    paths = _paths(doc)
+    assert_equal(len(paths), 1)
+    assert_equal(paths[0].getAttribute('fill'), 'none')
+    assert_equal(paths[0].getAttribute('stroke-width'), '0.1')
+    assert_equal(paths[0].getAttribute('stroke-linecap'), 'round')
+    assert_equal(paths[0].getAttribute('d'), 'M0,0L1,1 M1,0L0,1')
+
+
+def test_full_circle_arc():
+    arc = Arc((1, 0), (1, 0), (0, 0), 'counterclockwise', Circle((0, 0), 0.1),
+              'multi-quadrant')
+    doc = _render([arc])
+    assert_equal(_paths(doc)[0].getAttribute('d'),
+                 'M1,0A1,1 0 0,1 -1,0A1,1 0 0,1 1,0')
+
+
+def test_region_orientation():
+    """ Region outlines are written counterclockwise
+    """
+    aperture = Circle((0, 0), 0)
+    points = [(0, 0), (0, 1), (1, 1), (1, 0), (0, 0)]
+    lines = [Line(start, end, aperture)
+             for start, end in zip(points, points[1:])]
+    doc = _render([Region(lines)])
+    assert_equal(_paths(doc)[0].getAttribute('d'), 'M0,0L1,0L1,1L0,1L0,0Z')
+
+
+def test_rectangle_hole():
+    doc = _render([Rectangle((0.5, 0.5), 0.4, 0.4, hole_diameter=0.2)])
+    data = _paths(doc)[0].getAttribute('d')
+    assert_equal(data, 'M0.3,0.3L0.7,0.3L0.7,0.7L0.3,0.7Z'
+                       'M0.6,0.5A0.1,0.1 0 0,0 0.4,0.5A0.1,0.1 0 0,0 0.6,0.5Z')
+
+
+def test_obround_hole():
+    """ Obrounds are a single outline, so that their hole is cleared
+    """
+    hole = 'M0.55,0.5A0.05,0.05 0 0,0 0.45,0.5A0.05,0.05 0 0,0 0.55,0.5Z'
+    obround = Obround((0.5, 0.5), 0.6, 0.2, hole_diameter=0.1)
+    doc = _render([obround])
+    assert_equal(_paths(doc)[0].getAttribute('d'),
+                 'M0.7,0.4A0.1,0.1 0 0,1 0.7,0.6L0.3,0.6'
+                 'A0.1,0.1 0 0,1 0.3,0.4Z' + hole)
+
+    doc = _render([Flash(Obround((0, 0), 0.2, 0.6, hole_diameter=0.1),
+                         (0.5, 0.5))])
+    definition = doc.getElementsByTagName('defs')[0]
+    assert_equal(_paths(definition)[0].getAttribute('d'),
+                 'M0.1,0.2A0.1,0.1 0 0,1 -0.1,0.2L-0.1,-0.2'
+                 'A0.1,0.1 0 0,1 0.1,-0.2Z'
+                 'M0.05,0A0.05,0.05 0 0,0 -0.05,0A0.05,0.05 0 0,0 0.05,0Z')
+
+
+def test_flash_definitions():
+    """ Each aperture is defined once and placed with <use>
+    """
+    aperture = Circle((0, 0), 0.1)
+    flashes = [Flash(aperture, (0.2, 0.2)), Flash(aperture, (0.8, 0.8)),
+               Flash(aperture, (0.5, 0.5), level_polarity='clear')]
+    doc = _render(flashes)
+    assert_equal(len(doc.getElementsByTagName('defs')), 1)
+    uses = doc.getElementsByTagName('use')
+    assert_equal([(u.getAttribute('x'), u.getAttribute('y'),
+                   u.getAttribute('fill')) for u in uses],
+                 [('0.2', '0.2', '#fff'), ('0.8', '0.8', '#fff'),
+                  ('0.5', '0.5', '#000')])
+    assert_true(all(u.getAttribute('xlink:href') == '#ap0' for u in uses))
+
+
+def test_flash_macro_with_clear_parts():
+    """ Macros with clear parts are drawn in place, offset to the flash
+    """
+    gerber = read(os.path.join(RESOURCES, 'example_am_exposure_modifier.gbr'))
+    aperture = gerber.primitives[-1].aperture
+    doc = _render([Flash(aperture, (0.5, 0.5)), Flash(aperture, (0.2, 0.2))])
+    assert_equal(len(doc.getElementsByTagName('defs')), 0)
+    groups = [g for g in doc.getElementsByTagName('g')
+              if g.getAttribute('transform').startswith('translate')]
+    assert_equal([g.getAttribute('transform') for g in groups],
+                 ['translate(0.5 0.5)', 'translate(0.2 0.2)'])
+    expected = [p.getAttribute('d') for p in _paths(_render([aperture]))]
+    for group in groups:
+        assert_equal([p.getAttribute('d') for p in _paths(group)], expected)
+
+
+def test_invert_and_mirror():
+    settings = RenderSettings(color=(1.0, 0.0, 0.0), invert=True, mirror=True)
+    doc = _render([Circle((0.2, 0.2), 0.1)], bounds=((0, 2), (0, 1)),
+                  settings=settings)
+    mask = doc.getElementsByTagName('mask')[0]
+    assert_equal(mask.getElementsByTagName('rect')[0].getAttribute('fill'),
+                 '#fff')
+    assert_equal(mask.getElementsByTagName('g')[0].getAttribute('transform'),
+                 'matrix(-1 0 0 1 2 0)')
+    assert_equal(_paths(doc)[0].getAttribute('fill'), '#000')
+    rect = doc.getElementsByTagName('rect')[-1]
+    assert_equal(rect.getAttribute('fill'), '#ff0000')
+    assert_equal(rect.getAttribute('mask'), 'url(#layer0)')
+
+
+def test_render_layers():
+    gerber = read(os.path.join(RESOURCES, 'example_level_holes.gbr'))
+    layer = PCBLayer(cam_source=gerber, layer_class='top')
+    out = StringIO()
+    GerberSvgContext().render_layers([layer], out)
+    doc = parseString(out.getvalue())
+    svg = doc.documentElement
+    assert_equal(svg.getAttribute('viewBox'), '2.5 -17.5 15 15')
+    assert_equal(svg.getAttribute('width'), '15mm')
+    assert_equal(len(doc.getElementsByTagName('mask')), 1)
+    assert_equal([p.getAttribute('fill') for p in _paths(doc)],
+                 ['#fff', '#000', '#fff', '#000'])
@@ -0,0 +1,78 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from io import BytesIO
+
+from .tests import *
+from ..pcb import PCB
+from ..render.cairo_backend import GerberCairoContext
+from ..render.theme import THEMES
+from ..render.png import PNGWriter
+from ..render.tiled import render_tiled, _render_rows, _unpremultiply
+
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def _render(layers, bounds, **kwargs):
+    fobj = BytesIO()
+    render_tiled(layers, fobj, scale=100, bounds=bounds, **kwargs)
+    return fobj.getvalue()
+
+
+def test_render_tiled_matches_single_tile():
+    pcb = PCB.from_directory(RESOURCES)
+    layers = pcb.top_layers
+    bounds = pcb.board_bounds
+
+    single = _render(layers, bounds, tile_size=100000)
+    assert_equal(single[:8], b'\x89PNG\r\n\x1a\n')
+    assert_equal(_render(layers, bounds, tile_size=37), single)
+    assert_equal(_render(layers, bounds, tile_size=64, workers=2), single)
+
+
+def test_render_tiled_matches_raster_context():
+    pcb = PCB.from_directory(RESOURCES)
+    layers = pcb.top_layers
+    bounds = pcb.board_bounds
+    theme = THEMES['default']
+
+    ctx = GerberCairoContext(scale=100, raster=True)
+    for layer in layers:
+        ctx.render_layer(layer, settings=theme[layer.layer_class],
+                         bgsettings=theme['background'], bounds=bounds)
+    ctx.surface.flush()
+    fobj = BytesIO()
+    with PNGWriter(fobj, ctx.surface.get_width(),
+                    ctx.surface.get_height()) as png:
+        png.write_rows(_unpremultiply(ctx.surface))
+
+    assert_equal(_render(layers, bounds, tile_size=50), fobj.getvalue())
+
+
+class _CountingPool(object):
+    """ Runs jobs as they are submitted, counting the unfetched results """
+
+    def __init__(self):
+        self.outstanding = 0
+        self.peak = 0
+
+    def apply_async(self, func, args):
+        pool = self
+        pool.outstanding += 1
+        pool.peak = max(pool.peak, pool.outstanding)
+
+        class Result(object):
+            def get(self):
+                pool.outstanding -= 1
+                return args[0]
+        return Result()
+
+
+def test_render_rows_bounds_pending_tiles():
+    rows = [[(row, col) for col in range(3)] for row in range(5)]
+    pool = _CountingPool()
+    assert_equal(list(_render_rows(rows, pool)), rows)
+    assert_equal(pool.peak, 6)
+    assert_equal(pool.outstanding, 0)
@@ -0,0 +1,156 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+from .tests import *
+from ..common import read
+from ..excellon import read as read_excellon
+from ..gerber_statements import ADParamStmt, AMParamStmt, CoordStmt
+from ..operations import rotate, scale
+from ..primitives import AMGroup, Arc, Rectangle
+from ..render.numpy_backend import GerberNumpyContext
+from ..render.render import RenderSettings
+from ..rs274x import loads
+from ..transform import rotation, scaling, transform, translation
+
+
+def _resource(name):
+    return os.path.join(os.path.dirname(__file__), 'resources', name)
+
+
+def _flat(box):
+    (xmin, xmax), (ymin, ymax) = box
+    return (xmin, xmax, ymin, ymax)
+
+
+def _copper_area(gerber, scale=200):
+    ctx = GerberNumpyContext(scale=scale)
+    ctx.set_bounds(((-1, 2), (-1, 2)))
+    ctx._render_layer(gerber, RenderSettings())
+    return ctx.mask.sum() / float(scale * scale)
+
+
+def _gerber_text(gerber):
+    return '\n'.join(statement.to_gerber(gerber.settings)
+                     for statement in gerber.statements)
+
+
+def test_matrices():
+    assert_equal(rotation(90).tolist(),
+                 [[0.0, -1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    point = rotation(90, (1, 1)).dot((2, 1, 1))
+    assert_array_almost_equal(point, (1, 2, 1))
+    assert_equal(scaling(2, center=(1, 0)).dot((2, 1, 1)).tolist(),
+                 [3.0, 2.0, 1.0])
+    assert_equal(translation(1, 2).dot((0, 0, 1)).tolist(), [1.0, 2.0, 1.0])
+
+
+def test_rotate_gerber():
+    gerber = read(_resource('top_copper.GTL'))
+    original = _gerber_text(gerber)
+    rotated = rotate(gerber, 90)
+    (xmin, xmax), (ymin, ymax) = gerber.bounds
+    assert_equal(rotated.bounds, ((-ymax, -ymin), (xmin, xmax)))
+    for before, after in zip(gerber.primitives, rotated.primitives):
+        (xmin, xmax), (ymin, ymax) = before.bounding_box
+        assert_array_almost_equal(_flat(after.bounding_box),
+                                  (-ymax, -ymin, xmin, xmax))
+    for before, after in zip(gerber.apertures, rotated.apertures):
+        if isinstance(before, Rectangle):
+            assert_equal((after.width, after.height),
+                         (before.height, before.width))
+            assert_equal(after.rotation, 0)
+    # Nothing is shared with the source file
+    assert_equal(_gerber_text(gerber), original)
+    written = loads(_gerber_text(rotated))
+    assert_array_almost_equal(_flat(written.bounds), _flat(rotated.bounds))
+
+
+def test_transform_in_place():
+    gerber = read(_resource('example_flash_circle.gbr'))
+    primitive = gerber.primitives[-1]
+    x, y = primitive.position
+    assert_true(transform(gerber, translation(1, 2), in_place=True) is gerber)
+    assert_true(gerber.primitives[-1] is primitive)
+    assert_equal(primitive.position, (x + 1, y + 2))
+
+
+def test_turned_rectangle_becomes_macro():
+    gerber = read(_resource('example_flash_rectangle.gbr'))
+    rotated = rotate(gerber, 30)
+    macros = [s for s in rotated.statements if isinstance(s, AMParamStmt)]
+    definitions = [s for s in rotated.statements
+                   if isinstance(s, ADParamStmt)]
+    assert_equal([m.name for m in macros], ['RROT10', 'RROT11'])
+    assert_equal([d.shape for d in definitions], ['RROT10', 'RROT11'])
+    written = loads(_gerber_text(rotated))
+    for expected, found in zip(rotated.primitives, written.primitives):
+        assert_array_almost_equal(_flat(found.bounding_box),
+                                  _flat(expected.bounding_box), 4)
+    # The flashes use the macros too, so that they are drawn turned
+    assert_true(all(isinstance(p.aperture, AMGroup)
+                    for p in rotated.primitives))
+    assert_true(abs(_copper_area(rotated) - _copper_area(gerber)) < 0.005)
+
+
+def test_turned_rectangle_draws():
+    gerber = loads('%FSLAX24Y24*%%MOMM*%%ADD10R,0.44X0.25*%D10*'
+                   'X0Y0D02*X10000D01*M02*')
+    assert_raises(ValueError, rotate, gerber, 30)
+    rotated = rotate(gerber, 90)
+    assert_true(abs(_copper_area(rotated) - _copper_area(gerber)) < 0.005)
+
+    # Region outlines don't draw with the current aperture
+    gerber = loads('%FSLAX24Y24*%%MOMM*%%ADD10R,0.44X0.25*%D10*G36*'
+                   'X0Y0D02*X10000D01*Y10000D01*X0D01*Y0D01*G37*M02*')
+    rotated = rotate(gerber, 30)
+    assert_true(abs(_copper_area(rotated) - _copper_area(gerber)) < 0.005)
+
+
+def test_mirror_reverses_arcs():
+    gerber = read(_resource('example_cutin.gbr'))
+    mirrored = transform(gerber, scaling(1, -1))
+    for before, after in zip(gerber.primitives, mirrored.primitives):
+        if isinstance(before, Arc):
+            assert_not_equal(before.direction, after.direction)
+            assert_equal(after.center, (before.center[0], -before.center[1]))
+    functions = [(a.function, b.function)
+                 for a, b in zip(gerber.statements, mirrored.statements)
+                 if isinstance(a, CoordStmt) and a.function in ('G02', 'G03')]
+    assert_true(functions)
+    for before, after in functions:
+        assert_not_equal(before, after)
+
+
+def test_rotate_macro():
+    gerber = read(_resource('example_am_exposure_modifier.gbr'))
+    rotated = rotate(gerber, 90)
+    (xmin, xmax), (ymin, ymax) = gerber.bounds
+    assert_equal(rotated.bounds, ((-ymax, -ymin), (xmin, xmax)))
+    written = loads(_gerber_text(rotated))
+    for expected, found in zip(rotated.primitives, written.primitives):
+        assert_array_almost_equal(_flat(found.bounding_box),
+                                  _flat(expected.bounding_box))
+    assert_raises(ValueError, scale, gerber, 1, 2)
+
+
+def test_single_quadrant_arcs():
+    gerber = read(_resource('example_single_quadrant.gbr'))
+    mirrored = transform(gerber, scaling(1, -1))
+    for statement in mirrored.statements:
+        if isinstance(statement, CoordStmt) and statement.i is not None:
+            assert_true(statement.i >= 0 and statement.j >= 0)
+    assert_raises(ValueError, rotate, gerber, 30)
+
+
+def test_scale_excellon():
+    drills = read_excellon(_resource('ncdrill.DRD'))
+    scaled = scale(drills, 2, 2)
+    for before, after in zip(drills.hits, scaled.hits):
+        assert_equal(after.position, (before.position[0] * 2,
+                                      before.position[1] * 2))
+        assert_equal(after.tool.diameter, before.tool.diameter * 2)
+    for number, tool in drills.tools.items():
+        assert_true(scaled.tools[number] is not tool)
+        assert_equal(scaled.tools[number].diameter, tool.diameter * 2)
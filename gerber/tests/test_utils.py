@@ -3,7 +3,9 @@
 
 # Author: Hamilton Kibbe <ham@hamiltonkib.be>
 
-from .tests import assert_equal, assert_raises
+import numpy as np
+
+from .tests import assert_almost_equal, assert_equal, assert_raises
 from ..utils import *
 
 
@@ -99,6 +101,28 @@ def test_parse_format_validation():
     assert_raises(ValueError, parse_gerber_value, '00001111', (13, 1))
 
 
+def test_parse_gerber_values():
+    """ Test batch parser gives the same values as parse_gerber_value()
+    """
+    values = ['1', '-1', '+25', '0', '-0', '123456', '1234567', '-0012',
+              '12.5', '', '12345678901234567']
+    for fmt in ((2, 4), (2, 5), (3, 3), (6, 7), (1, 1)):
+        for zero_suppression in ('leading', 'trailing', 'none'):
+            # An empty value is only valid with zero suppression
+            strings = [string for string in values
+                       if string or zero_suppression != 'none']
+            parsed = parse_gerber_values(strings, fmt, zero_suppression)
+            for string, value in zip(strings, parsed.tolist()):
+                assert_equal(repr(value),
+                             repr(parse_gerber_value(string, fmt,
+                                                     zero_suppression)))
+    parsed = parse_gerber_values([['1', '2'], ['3', '4']], (2, 5), 'leading')
+    assert_equal(parsed.shape, (2, 2))
+    assert_equal(parsed.tolist(), [[0.00001, 0.00002], [0.00003, 0.00004]])
+    assert_equal(parse_gerber_values([]).shape, (0,))
+    assert_raises(ValueError, parse_gerber_values, ['1'], (7, 5))
+
+
 def test_write_format_validation():
     """ Test write_gerber_value() format validation
     """
@@ -126,4 +150,42 @@ def test_convex_hull():
     points = [(0, 0), (1, 0), (1, 1), (0.5, 0.5), (0, 1), (0, 0)]
     expected = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
     assert_equal(set(convex_hull(points)), set(expected))
-    
\ No newline at end of file
+    
+
+def test_polygon_edges():
+    square = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    edges = polygon_edges(square)
+    assert_equal(edges.tolist(), [[[0, 0], [1, 0]], [[1, 0], [1, 1]],
+                                  [[1, 1], [0, 1]], [[0, 1], [0, 0]]])
+    # A closed outline gets no zero length edge
+    assert_equal(polygon_edges(square + [(0, 0)]).tolist(), edges.tolist())
+    assert_equal(segment_bounding_boxes(edges).tolist(),
+                 [[0, 1, 0, 0], [1, 1, 0, 1], [0, 1, 1, 1], [0, 0, 0, 1]])
+
+
+def test_segments_intersect():
+    a = [[(0, 0), (2, 2)], [(0, 0), (1, 0)], [(0, 0), (1, 0)],
+         [(0, 0), (2, 0)], [(0, 0), (1, 1)]]
+    b = [[(0, 2), (2, 0)], [(1, 0), (1, 1)], [(0, 1), (1, 1)],
+         [(1, 0), (3, 0)], [(2, 2), (3, 3)]]
+    assert_equal(segments_intersect(a, b).tolist(),
+                 [True, True, False, True, False])
+
+
+def test_segment_distance():
+    a = np.array([[0, 0, 2, 2], [0, 0, 1, 0], [0, 0, 1, 0]], dtype=float)
+    b = np.array([[0, 2, 2, 0], [2, 1, 3, 1], [0.5, 1, 0.5, 3]], dtype=float)
+    distance, point_a, point_b = segment_distance(a, b)
+    assert_equal(distance[0], 0)
+    assert_equal(point_a[0].tolist(), [1, 1])
+    assert_equal(point_b[0].tolist(), [1, 1])
+    assert_almost_equal(distance[1], 2 ** 0.5)
+    assert_equal(point_a[1].tolist(), [1, 0])
+    assert_equal(point_b[1].tolist(), [2, 1])
+    assert_equal(distance[2], 1)
+    assert_equal(point_a[2].tolist(), [0.5, 0])
+
+    distance, closest = point_segment_distance([(1, 1), (3, 0)],
+                                               [[(0, 0), (2, 0)]] * 2)
+    assert_equal(distance.tolist(), [1, 1])
+    assert_equal(closest.tolist(), [[1, 0], [2, 0]])
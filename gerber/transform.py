@@ -0,0 +1,649 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.transform
+================
+**Affine transforms of Gerber and Excellon files**
+
+This module applies 2D affine transforms, given as 3x3 matrices, to every
+primitive and statement of a :class:`gerber.rs274x.GerberFile` or
+:class:`gerber.excellon.ExcellonFile`.
+
+    >>> matrix = translation(10, 0).dot(rotation(90))
+    >>> rotated = transform(gerber, matrix)
+
+The coordinates of all the primitives and statements are gathered, mapped
+with one NumPy operation per attribute and written back. Apertures, aperture
+macros and drill tools are shared by many primitives, and are transformed
+once each, without the translation.
+
+Transforms that keep shapes (translations, rotations, uniform scaling and
+mirroring) are exact. Under other matrices, circles are scaled by the
+square root of the determinant and rectangles are stretched along their own
+axes. Aperture macro definitions can only be transformed by matrices that
+keep shapes.
+
+Rectangular and obround aperture definitions turned by an angle that isn't
+a multiple of 90 degrees can't be written as standard apertures, and are
+replaced by aperture macros, both in the statements and in the flashed
+primitives. As macro apertures can't draw lines, such apertures can't be
+turned when they are used for drawing.
+"""
+
+import copy
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from .am_statements import *
+from .excellon import DrillHit, DrillSlot, ExcellonFile
+from .excellon_statements import (CoordinateStmt, EndOfProgramStmt,
+                                  ExcellonTool, RepeatHoleStmt, SlotStmt)
+from .gerber_statements import (ADParamStmt, AMParamStmt, CoordStmt,
+                                QuadrantModeStmt)
+from .primitives import *
+
+# Shapes with a width and height that are kept axis aligned when turned by
+# right angles, which the renderers handle best
+_BOXES = (Rectangle, Obround, Ellipse, Diamond, ChamferRectangle,
+          RoundRectangle)
+
+# Shapes with a rotation about their position
+_ROTATED = _BOXES + (Circle, Polygon, Donut, RoundButterfly,
+                     SquareButterfly, SquareRoundDonut)
+
+# Primitive attributes holding points
+_POINTS = ('position', '_position', 'start', 'end', 'center')
+
+_ARC_FUNCTIONS = {'G02': 'G03', 'G03': 'G02', 'G2': 'G3', 'G3': 'G2'}
+
+
+def translation(x_offset, y_offset):
+    """ Matrix of a translation
+    """
+    return np.array([[1.0, 0.0, x_offset],
+                     [0.0, 1.0, y_offset],
+                     [0.0, 0.0, 1.0]])
+
+
+def scaling(x_scale, y_scale=None, center=(0.0, 0.0)):
+    """ Matrix of a scaling about a point
+
+    A negative scale mirrors along its axis. `y_scale` defaults to
+    `x_scale`.
+    """
+    if y_scale is None:
+        y_scale = x_scale
+    matrix = np.array([[x_scale, 0.0, 0.0],
+                       [0.0, y_scale, 0.0],
+                       [0.0, 0.0, 1.0]])
+    return _about(matrix, center)
+
+
+def rotation(angle, center=(0.0, 0.0)):
+    """ Matrix of a counterclockwise rotation about a point
+
+    Parameters
+    ----------
+    angle : float
+        Angle in degrees
+
+    center : tuple
+        (x, y) center of the rotation
+    """
+    # Exact for multiples of 90 degrees
+    turns, rest = divmod(angle, 90.0)
+    if rest == 0:
+        cos, sin = [(1.0, 0.0), (0.0, 1.0), (-1.0, 0.0), (0.0, -1.0)][int(turns) % 4]
+    else:
+        cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    matrix = np.array([[cos, -sin, 0.0],
+                       [sin, cos, 0.0],
+                       [0.0, 0.0, 1.0]])
+    return _about(matrix, center)
+
+
+def transform(cam_file, matrix, in_place=False):
+    """ Apply an affine transform to a Gerber or Excellon file
+
+    Parameters
+    ----------
+    cam_file : :class:`gerber.rs274x.GerberFile` or :class:`gerber.excellon.ExcellonFile`
+        File to transform
+
+    matrix : array_like
+        3x3 matrix mapping (x, y, 1) column vectors
+
+    in_place : bool
+        Transform `cam_file` itself rather than a copy. The copy shares
+        nothing that the transform changes with the source file, but is
+        made without :func:`copy.deepcopy`.
+
+    Returns
+    -------
+    cam_file : :class:`gerber.cam.CamFile` subclass
+        The transformed file
+    """
+    transformer = _Transformer(matrix, in_place)
+    if isinstance(cam_file, ExcellonFile):
+        cam_file = transformer.excellon(cam_file)
+    else:
+        cam_file = transformer.gerber(cam_file)
+    transformer.flush()
+    cam_file.invalidate_spatial_index()
+    return cam_file
+
+
+def copy_file(cam_file):
+    """ Copy a Gerber or Excellon file
+
+    Cheaper than :func:`copy.deepcopy`: only the statements, primitives,
+    apertures and tools are copied, and shared ones are copied once.
+    """
+    return transform(cam_file, np.identity(3))
+
+
+def _about(matrix, center):
+    if center[0] or center[1]:
+        return translation(*center).dot(matrix).dot(
+            translation(-center[0], -center[1]))
+    return matrix
+
+
+class _Transformer(object):
+    """ Walks the objects of a file, transforming or copying them
+
+    Points are only collected during the walk, and are transformed all at
+    once by :meth:`flush`.
+    """
+
+    def __init__(self, matrix, in_place):
+        matrix = np.asarray(matrix, dtype=float)
+        if matrix.shape != (3, 3):
+            raise ValueError('Transforms are 3x3 matrices')
+        linear = matrix[:2, :2]
+        determinant = float(np.linalg.det(linear))
+        if determinant == 0:
+            raise ValueError('Transform is singular')
+        self.matrix = matrix
+        self.linear = linear
+        self.in_place = in_place
+        self.mirror = determinant < 0
+        self.scale = math.sqrt(abs(determinant))
+        (a, b), (c, d) = linear
+        self.similar = (abs(a * b + c * d) <= 1e-12 * (a * a + c * c) and
+                        abs(math.hypot(a, c) - math.hypot(b, d)) <=
+                        1e-12 * math.hypot(a, c))
+        self.angle = math.degrees(math.atan2(c, a))
+        # Whether the axes are mapped onto the axes
+        self.axial = (b == 0 and c == 0) or (a == 0 and d == 0)
+        # Shared objects already done, by id
+        self.done = {}
+        # Macro apertures replacing turned boxes, by id of the turned box
+        self.turned = {}
+        # Objects with points to transform, by attribute name
+        self.points = defaultdict(list)
+        self.vectors = defaultdict(list)
+        # (statement, x attribute, y attribute) of modal coordinates
+        self.coordinates = []
+        self.offsets = []
+        # Arc center offsets, which are unsigned in single quadrant mode
+        self.quadrant_mode = 'multi-quadrant'
+        self.unsigned = []
+
+    def flush(self):
+        """ Transform the points collected by the walk
+        """
+        for buckets, translate in ((self.points, True),
+                                   (self.vectors, False)):
+            for name, objects in buckets.items():
+                points = self.apply(np.array([getattr(o, name) for o in objects],
+                                             dtype=float), translate)
+                for obj, point in zip(objects, points.tolist()):
+                    setattr(obj, name, tuple(point))
+        self._modal(self.coordinates, True)
+        self._modal(self.offsets, False)
+        self._modal(self.unsigned, False)
+        for statement, x, y in self.unsigned:
+            for name in (x, y):
+                if getattr(statement, name) is not None:
+                    setattr(statement, name, abs(getattr(statement, name)))
+
+    def apply(self, points, translate=True):
+        points = points.reshape(-1, 2)
+        result = points.dot(self.linear.T)
+        if translate:
+            result += self.matrix[:2, 2]
+        return result
+
+    def copy(self, obj):
+        return obj if self.in_place else copy.copy(obj)
+
+    def once(self, obj, function):
+        """ Transform a shared object only once
+        """
+        try:
+            return self.done[id(obj)]
+        except KeyError:
+            result = self.done[id(obj)] = function(obj)
+            return result
+
+    def turn(self, rotation):
+        """ Rotation and axis scales of a shape after the transform
+
+        Returns
+        -------
+        rotation : float
+            New rotation in degrees
+
+        x_scale, y_scale : float
+            Scales along the shape's own axes
+        """
+        if self.similar:
+            if self.mirror:
+                return self.angle - rotation, self.scale, self.scale
+            return self.angle + rotation, self.scale, self.scale
+        theta = math.radians(rotation)
+        u = self.linear.dot((math.cos(theta), math.sin(theta)))
+        v = self.linear.dot((-math.sin(theta), math.cos(theta)))
+        return (math.degrees(math.atan2(u[1], u[0])), math.hypot(*u),
+                math.hypot(*v))
+
+    # Gerber
+
+    def gerber(self, gerber):
+        gerber = self.copy(gerber)
+        statements = []
+        for statement in gerber.statements:
+            statement = self.statement(statement)
+            if isinstance(statement, _Definitions):
+                statements.extend(statement)
+            else:
+                statements.append(statement)
+        gerber.statements = statements
+        gerber.primitives = [self.primitive(p) for p in gerber.primitives]
+        gerber.apertures = [self.flashed_aperture(a) for a in gerber.apertures]
+        return gerber
+
+    def statement(self, statement):
+        if isinstance(statement, CoordStmt):
+            statement = self.copy(statement)
+            if statement.x is not None or statement.y is not None:
+                self.coordinates.append((statement, 'x', 'y'))
+            if statement.i is not None or statement.j is not None:
+                if self.quadrant_mode == 'multi-quadrant':
+                    self.offsets.append((statement, 'i', 'j'))
+                elif self.axial:
+                    self.unsigned.append((statement, 'i', 'j'))
+                else:
+                    raise ValueError('Single quadrant arcs can only be '
+                                     'turned by right angles')
+            if self.mirror and statement.function in _ARC_FUNCTIONS:
+                statement.function = _ARC_FUNCTIONS[statement.function]
+            return statement
+        elif isinstance(statement, ADParamStmt):
+            return self.aperture_definition(statement)
+        elif isinstance(statement, AMParamStmt):
+            return self.once(statement, self.macro)
+        elif isinstance(statement, QuadrantModeStmt):
+            self.quadrant_mode = statement.mode
+        return self.copy(statement)
+
+    def aperture_definition(self, statement):
+        statement = self.copy(statement)
+        if statement.shape not in ('C', 'R', 'O', 'P') or not any(statement.modifiers):
+            # Macro modifiers are the macro's business
+            return statement
+        modifiers = list(statement.modifiers[0])
+        if statement.shape == 'P':
+            rotation = modifiers[2] if len(modifiers) > 2 else 0.0
+            holes = 3
+        elif statement.shape == 'C':
+            rotation = 0.0
+            holes = 1
+        else:
+            rotation = 0.0
+            holes = 2
+        new_rotation, x_scale, y_scale = self.turn(rotation)
+        turns = round(new_rotation / 90.0)
+        right_angle = abs(new_rotation - 90 * turns) < 1e-9
+        swap = right_angle and turns % 2 == 1
+
+        if statement.shape in ('R', 'O'):
+            width, height = modifiers[0] * x_scale, modifiers[1] * y_scale
+            modifiers[:2] = (height, width) if swap else (width, height)
+        elif statement.shape == 'C':
+            modifiers[0] *= self.scale
+        else:
+            modifiers[0] *= self.scale
+            if len(modifiers) > 2:
+                modifiers[2] = new_rotation
+        if len(modifiers) == holes + 1:
+            modifiers[holes] *= self.scale
+        elif len(modifiers) == holes + 2:
+            width = modifiers[holes] * x_scale
+            height = modifiers[holes + 1] * y_scale
+            modifiers[holes:] = (height, width) if swap else (width, height)
+        statement.modifiers = [tuple(modifiers)]
+
+        if statement.shape in ('R', 'O') and not right_angle:
+            return self.turned_box(statement, new_rotation)
+        return statement
+
+    def turned_box(self, statement, rotation):
+        """ Replace a turned rectangle or obround definition with a macro
+        """
+        name = '{0}ROT{1}'.format(statement.shape, statement.d)
+        macro = _box_macro(statement.shape, name, statement.modifiers[0],
+                           rotation, statement.units)
+        definition = ADParamStmt.macro(statement.d, name)
+        definition.units = statement.units
+        return _Definitions([macro, definition])
+
+    def turned_aperture(self, aperture):
+        """ Macro aperture drawing a turned rectangle or obround aperture
+
+        Built from the same macro as the aperture's definition is replaced
+        with, as the renderers only draw axis aligned boxes.
+        """
+        shape = 'R' if isinstance(aperture, Rectangle) else 'O'
+        modifiers = [aperture.width, aperture.height]
+        if aperture.hole_diameter:
+            modifiers.append(aperture.hole_diameter)
+        elif aperture.hole_width and aperture.hole_height:
+            modifiers.extend((aperture.hole_width, aperture.hole_height))
+        macro = _box_macro(shape, '{0}ROT'.format(shape), modifiers,
+                           aperture.rotation, aperture.units)
+        group = macro.build()
+        group.units = aperture.units
+        return group
+
+    def macro(self, statement):
+        """ Transform an aperture macro definition, about the macro origin
+        """
+        if not self.similar:
+            raise ValueError('Aperture macro {} can only be transformed '
+                             'without changing its shape'.format(statement.name))
+        statement = self.copy(statement)
+        statement.primitives = [self.macro_primitive(p)
+                                for p in statement.primitives]
+        return statement
+
+    def macro_primitive(self, primitive):
+        primitive = self.copy(primitive)
+        if isinstance(primitive, (AMCommentPrimitive, AMUnsupportPrimitive)):
+            return primitive
+        scale = self.scale
+
+        def point(p, dy=0.0):
+            # Mirrored about the x axis if needed, and scaled
+            return (p[0] * scale, (-p[1] - dy if self.mirror else p[1]) * scale)
+
+        if isinstance(primitive, AMCirclePrimitive):
+            # Circles have no rotation, move their centers instead
+            x, y = point(primitive.position)
+            theta = math.radians(self.angle)
+            primitive.position = (x * math.cos(theta) - y * math.sin(theta),
+                                  x * math.sin(theta) + y * math.cos(theta))
+            primitive.diameter *= scale
+            return primitive
+
+        if isinstance(primitive, AMVectorLinePrimitive):
+            primitive.start = point(primitive.start)
+            primitive.end = point(primitive.end)
+            primitive.width *= scale
+        elif isinstance(primitive, AMOutlinePrimitive):
+            primitive.start_point = point(primitive.start_point)
+            primitive.points = tuple(point(p) for p in primitive.points)
+        elif isinstance(primitive, AMPolygonPrimitive):
+            primitive.position = point(primitive.position)
+            primitive.diameter *= scale
+        elif isinstance(primitive, AMMoirePrimitive):
+            primitive.position = point(primitive.position)
+            for name in ('diameter', 'ring_thickness', 'gap',
+                         'crosshair_thickness', 'crosshair_length'):
+                setattr(primitive, name, getattr(primitive, name) * scale)
+        elif isinstance(primitive, AMThermalPrimitive):
+            primitive.position = point(primitive.position)
+            for name in ('outer_diameter', 'inner_diameter', 'gap'):
+                setattr(primitive, name, getattr(primitive, name) * scale)
+        elif isinstance(primitive, AMCenterLinePrimitive):
+            primitive.center = point(primitive.center)
+            primitive.width *= scale
+            primitive.height *= scale
+        elif isinstance(primitive, AMLowerLeftLinePrimitive):
+            primitive.lower_left = point(primitive.lower_left,
+                                         primitive.height)
+            primitive.width *= scale
+            primitive.height *= scale
+        # Rotations are about the macro origin
+        rotation = -primitive.rotation if self.mirror else primitive.rotation
+        primitive.rotation = rotation + self.angle
+        return primitive
+
+    # Primitives
+
+    def aperture(self, aperture):
+        return self.once(aperture, lambda a: self.primitive(a, False))
+
+    def flashed_aperture(self, aperture):
+        """ Transform a flashed aperture
+
+        Turned rectangles and obrounds are replaced by the same macro as
+        their definition.
+        """
+        aperture = self.aperture(aperture)
+        if not _turned_box(aperture):
+            return aperture
+        try:
+            return self.turned[id(aperture)]
+        except KeyError:
+            group = self.turned[id(aperture)] = self.turned_aperture(aperture)
+            return group
+
+    def primitive(self, primitive, translate=True, nested=False):
+        """ Transform a primitive, without moving it if `translate` is False
+
+        `nested` primitives are parts of another primitive, e.g. the segments
+        of a region, whose apertures are never used for drawing.
+        """
+        primitive = self.copy(primitive)
+        for name in primitive._to_convert:
+            value = getattr(primitive, name)
+            if value is None:
+                continue
+            elif name == 'aperture':
+                if isinstance(primitive, Flash):
+                    primitive.aperture = self.flashed_aperture(value)
+                    continue
+                primitive.aperture = self.aperture(value)
+                if not nested and _turned_box(primitive.aperture):
+                    raise ValueError('Rectangular and obround apertures used '
+                                     'for drawing can only be turned by '
+                                     'right angles')
+            elif name == 'primitives':
+                primitive.primitives = [self.primitive(p, translate, True)
+                                        for p in value]
+            elif name in _POINTS:
+                (self.points if translate else self.vectors)[name].append(
+                    primitive)
+            elif name not in ('width', 'height', 'hole_width', 'hole_height'):
+                setattr(primitive, name, value * self.scale)
+        if isinstance(primitive, _ROTATED):
+            self.turn_shape(primitive)
+        elif isinstance(primitive, Arc) and self.mirror:
+            primitive.direction = ('clockwise'
+                                   if primitive.direction == 'counterclockwise'
+                                   else 'counterclockwise')
+        elif isinstance(primitive, AMGroup) and primitive.stmt is not None:
+            primitive.stmt = self.once(primitive.stmt, self.macro)
+        primitive._changed()
+        return primitive
+
+    def turn_shape(self, primitive):
+        rotation, x_scale, y_scale = self.turn(primitive.rotation)
+        swap = False
+        corners = getattr(primitive, 'corners', None)
+        if corners is not None and self.mirror:
+            # Mirrored about the shape's x axis: UR, UL, LL, LR to LR, LL...
+            corners = tuple(reversed(corners))
+        if isinstance(primitive, _BOXES) and rotation != primitive.rotation:
+            turns = int(round(rotation / 90.0))
+            if abs(rotation - 90 * turns) < 1e-9:
+                # Keep the shape axis aligned
+                rotation = 0.0
+                swap = turns % 2 == 1
+                if corners is not None:
+                    turns %= 4
+                    corners = tuple(corners[4 - turns:]) + tuple(corners[:4 - turns])
+        for width, height in (('width', 'height'), ('hole_width', 'hole_height')):
+            if width in primitive._to_convert:
+                w = getattr(primitive, width) * x_scale
+                h = getattr(primitive, height) * y_scale
+                setattr(primitive, width, h if swap else w)
+                setattr(primitive, height, w if swap else h)
+        if corners is not None:
+            primitive.corners = corners
+        primitive.rotation = rotation
+
+    # Excellon
+
+    def excellon(self, excellon):
+        excellon = self.copy(excellon)
+        excellon.statements = [self.drill_statement(s)
+                               for s in excellon.statements]
+        excellon.tools = type(excellon.tools)(
+            (number, self.tool(tool)) for number, tool in excellon.tools.items())
+        excellon.hits = [self.hit(hit) for hit in excellon.hits]
+        return excellon
+
+    def drill_statement(self, statement):
+        if isinstance(statement, ExcellonTool):
+            return self.tool(statement)
+        statement = self.copy(statement)
+        if isinstance(statement, (CoordinateStmt, EndOfProgramStmt)):
+            if statement.x is not None or statement.y is not None:
+                self.coordinates.append((statement, 'x', 'y'))
+        elif isinstance(statement, SlotStmt):
+            self.coordinates.append((statement, 'x_start', 'y_start'))
+            self.coordinates.append((statement, 'x_end', 'y_end'))
+        elif isinstance(statement, RepeatHoleStmt):
+            self.offsets.append((statement, 'xdelta', 'ydelta'))
+        return statement
+
+    def tool(self, tool):
+        def scaled(tool):
+            tool = self.copy(tool)
+            if not self.in_place and tool.settings is not None:
+                # Tools may share their settings, and converting their units
+                # changes them
+                tool.settings = self.once(tool.settings, copy.copy)
+            if tool.diameter is not None:
+                tool.diameter *= self.scale
+            return tool
+        return self.once(tool, scaled)
+
+    def hit(self, hit):
+        hit = self.copy(hit)
+        hit.tool = self.tool(hit.tool)
+        if isinstance(hit, DrillHit):
+            self.points['position'].append(hit)
+        elif isinstance(hit, DrillSlot):
+            self.points['start'].append(hit)
+            self.points['end'].append(hit)
+        return hit
+
+    # Statement coordinates
+
+    def _modal(self, entries, translate):
+        """ Transform coordinates where either may be left out
+
+        In absolute notation a coordinate left out keeps its previous value,
+        otherwise it is 0. After the transform, a coordinate is written out
+        if it was before, or if it now differs from its previous value.
+        """
+        if not entries:
+            return
+        points = np.array([[getattr(s, x), getattr(s, y)]
+                           for s, x, y in entries], dtype=float)
+        given = ~np.isnan(points)
+        if translate:
+            for axis in (0, 1):
+                known = np.where(given[:, axis], np.arange(len(points)), -1)
+                known = np.maximum.accumulate(known)
+                values = np.append(points[:, axis], 0.0)
+                points[:, axis] = values[known]
+        else:
+            points[~given] = 0.0
+        result = self.apply(points, translate)
+        previous = np.vstack((self.apply(np.zeros((1, 2)), translate),
+                              result[:-1]))
+        write = given | (result != previous)
+        for (statement, x, y), point, (write_x, write_y) in zip(
+                entries, result.tolist(), write.tolist()):
+            setattr(statement, x, point[0] if write_x else None)
+            setattr(statement, y, point[1] if write_y else None)
+
+
+def _box_macro(shape, name, modifiers, rotation, units):
+    """ Aperture macro of a rectangle ('R') or obround ('O') turned by
+    `rotation` degrees, from the modifiers of its aperture definition
+    """
+    width, height = modifiers[:2]
+    parts = []
+    if shape == 'O':
+        # A rectangle between two circles
+        diameter = min(width, height)
+        length = abs(width - height)
+        theta = math.radians(rotation + (0 if width >= height else 90))
+        dx, dy = length / 2.0 * math.cos(theta), length / 2.0 * math.sin(theta)
+        if width >= height:
+            parts.append('21,1,{0},{1},0,0,{2}'.format(
+                _number(length), _number(diameter), _number(rotation)))
+        else:
+            parts.append('21,1,{0},{1},0,0,{2}'.format(
+                _number(diameter), _number(length), _number(rotation)))
+        for sign in (1, -1):
+            parts.append('1,1,{0},{1},{2}'.format(
+                _number(diameter), _number(sign * dx), _number(sign * dy)))
+    else:
+        parts.append('21,1,{0},{1},0,0,{2}'.format(
+            _number(width), _number(height), _number(rotation)))
+    if len(modifiers) == 3:
+        parts.append('1,0,{0},0,0'.format(_number(modifiers[2])))
+    elif len(modifiers) == 4:
+        parts.append('21,0,{0},{1},0,0,{2}'.format(
+            _number(modifiers[2]), _number(modifiers[3]),
+            _number(rotation)))
+    macro = AMParamStmt('AM', name, '*'.join(parts) + '*')
+    macro.units = units
+    macro.build()
+    return macro
+
+
+def _turned_box(aperture):
+    """ Whether `aperture` is a rectangle or obround that isn't axis aligned
+    """
+    return isinstance(aperture, (Rectangle, Obround)) and aperture.rotation != 0
+
+
+class _Definitions(list):
+    """ Statements replacing a single statement
+    """
+
+
+def _number(value):
+    return ('%.8f' % value).rstrip('0').rstrip('.') or '0'
@@ -23,11 +23,22 @@ This module provides utility functions for working with Gerber and Excellon
 files.
 """
 
+from __future__ import division
+
 import os
 from math import radians, sin, cos, sqrt, atan2, pi
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 MILLIMETERS_PER_INCH = 25.4
 
+# Longest digit string parse_gerber_values() converts with integer
+# arithmetic. Up to 15 digits fit in a float64 exactly.
+MAX_BATCH_DIGITS = 15
+
 
 def parse_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
     """ Convert gerber/excellon formatted string to floating-point number
@@ -66,13 +77,7 @@ def parse_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
 
     # Format precision
     integer_digits, decimal_digits = format
-    MAX_DIGITS = integer_digits + decimal_digits
-
-    # Absolute maximum number of digits supported. This will handle up to
-    # 6:7 format, which is somewhat supported, even though the gerber spec
-    # only allows up to 6:6
-    if MAX_DIGITS > 13 or integer_digits > 6 or decimal_digits > 7:
-        raise ValueError('Parser only supports precision up to 6:7 format')
+    MAX_DIGITS = _check_format(format)
 
     # Remove extraneous information
     value = value.lstrip('+')
@@ -82,16 +87,108 @@ def parse_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
 
     missing_digits = MAX_DIGITS - len(value)
 
+    if missing_digits > 0:
+        if zero_suppression == 'trailing':
+            value += '0' * missing_digits
+        elif zero_suppression == 'leading':
+            value = '0' * missing_digits + value
+
+    # Place the decimal point by dividing by a power of ten. Only the
+    # division rounds, so this gives the same float as parsing the decimal
+    # string would. Values shorter than the integer part have no decimals.
+    decimals = max(len(value) - integer_digits, 0)
+    result = int(value) / 10 ** decimals
+    return -result if negative else result
+
+
+def parse_gerber_values(values, format=(2, 5), zero_suppression='trailing'):
+    """ Convert gerber/excellon formatted strings to floating-point numbers
+
+    This is a vectorized :func:`parse_gerber_value` for converting many values
+    at once. The digits are converted to integers and scaled in NumPy, and
+    the results are identical to calling :func:`parse_gerber_value` on each
+    value.
+
+    Parameters
+    ----------
+    values : sequence of strings
+        Gerber/Excellon-formatted strings representing numerical values.
+
+    format :  tuple (int,int)
+        Gerber/Excellon precision format expressed as a tuple containing:
+        (number of integer-part digits, number of decimal-part digits)
+
+    zero_suppression : string
+        Zero-suppression mode. May be 'leading', 'trailing' or 'none'
+
+    Returns
+    -------
+    values : numpy.ndarray
+        The specified values as a float64 array with the same shape as
+        `values`.
+
+    """
+    if np is None:
+        raise ImportError('parse_gerber_values requires NumPy')
+
+    integer_digits, decimal_digits = format
+    MAX_DIGITS = _check_format(format)
+
+    values = np.asarray(values, dtype=np.str_)
+    result = np.empty(values.shape, dtype=np.float64)
+    if not values.size:
+        return result
+
+    # Remove extraneous information
+    values = np.char.lstrip(values.ravel(), '+')
+    negative = np.char.find(values, '-') >= 0
+    digits = np.char.lstrip(values, '-')
+    lengths = np.char.str_len(digits)
+
+    # One row of character codes per value, padded with zeros
+    width = digits.dtype.itemsize // 4
+    codes = digits.view(np.uint32).reshape(len(digits), width)
+    position = np.arange(width)
+    used = position < lengths[:, None]
+
+    # Plain digit strings are converted here. Anything else, like values with
+    # an explicit decimal point, goes through parse_gerber_value().
+    plain = (((codes >= ord('0')) & (codes <= ord('9'))) | ~used).all(axis=1)
+    plain &= (lengths > 0) & (lengths <= MAX_BATCH_DIGITS)
+    flat = result.reshape(-1)
+    if not plain.all():
+        flat[~plain] = [parse_gerber_value(value, format, zero_suppression)
+                        for value in values[~plain].tolist()]
+
+    # Sum each digit times its place value
+    codes, used, lengths = codes[plain], used[plain], lengths[plain]
+    place = np.where(used, lengths[:, None] - 1 - position, 0)
+    number = (np.where(used, codes.astype(np.int64) - ord('0'), 0) *
+              10 ** place).sum(axis=1)
     if zero_suppression == 'trailing':
-        digits = list(value + ('0' * missing_digits))
-    elif zero_suppression == 'leading':
-        digits = list(('0' * missing_digits) + value)
-    else:
-        digits = list(value)
+        number *= 10 ** np.maximum(MAX_DIGITS - lengths, 0)
+    if zero_suppression in ('trailing', 'leading'):
+        lengths = np.maximum(lengths, MAX_DIGITS)
 
-    result = float(
-        ''.join(digits[:integer_digits] + ['.'] + digits[integer_digits:]))
-    return -result if negative else result
+    decimals = np.maximum(lengths - integer_digits, 0)
+    scale = np.array([float(10 ** n) for n in range(MAX_BATCH_DIGITS + 1)])
+    number = number / scale[decimals]
+    flat[plain] = np.where(negative[plain], -number, number)
+    return result
+
+
+def _check_format(format):
+    """ Check a precision format is supported and return its total digits
+    """
+    integer_digits, decimal_digits = format
+    MAX_DIGITS = integer_digits + decimal_digits
+
+    # Absolute maximum number of digits supported. This will handle up to
+    # 6:7 format, which is somewhat supported, even though the gerber spec
+    # only allows up to 6:6
+    if MAX_DIGITS > 13 or integer_digits > 6 or decimal_digits > 7:
+        raise ValueError('Parser only supports precision up to 6:7 format')
+    return MAX_DIGITS
 
 
 def write_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
@@ -309,6 +406,168 @@ def sq_distance(point1, point2):
     return diff1 * diff1 + diff2 * diff2
 
 
+def polygon_edges(vertices):
+    """ Edges of a closed polygon.
+
+    Parameters
+    ----------
+    vertices : list of tuple(<float>, <float>)
+        Vertices of the polygon, in order. The polygon may be given closed
+        (last vertex equal to the first) or open.
+
+    Returns
+    -------
+    edges : numpy.ndarray
+        (n, 2, 2) array of the edges from each vertex to the next, the last
+        one back to the first vertex.
+    """
+    points = np.asarray(vertices, dtype=float).reshape(-1, 2)
+    if len(points) > 1 and (points[0] == points[-1]).all():
+        points = points[:-1]
+    return np.stack((points, np.roll(points, -1, axis=0)), axis=1)
+
+
+def segment_bounding_boxes(segments):
+    """ Bounding boxes of segments.
+
+    Parameters
+    ----------
+    segments : array_like
+        (n, 2, 2) array of segments, or (n, 4) rows of (x0, y0, x1, y1)
+
+    Returns
+    -------
+    boxes : numpy.ndarray
+        (n, 4) array of each segment's (xmin, xmax, ymin, ymax)
+    """
+    x0, y0, x1, y1 = _segment_columns(segments)
+    return np.column_stack((np.minimum(x0, x1), np.maximum(x0, x1),
+                            np.minimum(y0, y1), np.maximum(y0, y1)))
+
+
+def point_segment_distance(points, segments):
+    """ Distances from points to segments, pairwise.
+
+    Parameters
+    ----------
+    points : array_like
+        (n, 2) array of points
+
+    segments : array_like
+        (n, 2, 2) array of segments, or (n, 4) rows of (x0, y0, x1, y1)
+
+    Returns
+    -------
+    distance : numpy.ndarray
+        Distance from each point to its segment
+
+    closest : numpy.ndarray
+        (n, 2) array of the point of each segment nearest to its point
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    px, py = points[:, 0], points[:, 1]
+    x0, y0, x1, y1 = _segment_columns(segments)
+    dx, dy = x1 - x0, y1 - y0
+    length = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(length > 0, ((px - x0) * dx + (py - y0) * dy) / length,
+                     0.0)
+    t = np.clip(t, 0.0, 1.0)
+    cx, cy = x0 + t * dx, y0 + t * dy
+    return np.hypot(px - cx, py - cy), np.column_stack((cx, cy))
+
+
+def segments_intersect(a, b):
+    """ Whether pairs of segments intersect.
+
+    Segments that only touch, at an end or along a shared line, intersect.
+
+    Parameters
+    ----------
+    a, b : array_like
+        (n, 2, 2) arrays of segments, or (n, 4) rows of (x0, y0, x1, y1)
+
+    Returns
+    -------
+    intersect : numpy.ndarray
+        Boolean array, True where a[i] and b[i] intersect
+    """
+    ax0, ay0, ax1, ay1 = _segment_columns(a)
+    bx0, by0, bx1, by1 = _segment_columns(b)
+    d1 = _cross(bx0, by0, bx1, by1, ax0, ay0)
+    d2 = _cross(bx0, by0, bx1, by1, ax1, ay1)
+    d3 = _cross(ax0, ay0, ax1, ay1, bx0, by0)
+    d4 = _cross(ax0, ay0, ax1, ay1, bx1, by1)
+    crossing = ((d1 * d2 < 0) & (d3 * d4 < 0))
+
+    # An end lying on the other segment
+    def on_segment(d, px, py, x0, y0, x1, y1):
+        return ((d == 0) &
+                (np.minimum(x0, x1) <= px) & (px <= np.maximum(x0, x1)) &
+                (np.minimum(y0, y1) <= py) & (py <= np.maximum(y0, y1)))
+    return (crossing |
+            on_segment(d1, ax0, ay0, bx0, by0, bx1, by1) |
+            on_segment(d2, ax1, ay1, bx0, by0, bx1, by1) |
+            on_segment(d3, bx0, by0, ax0, ay0, ax1, ay1) |
+            on_segment(d4, bx1, by1, ax0, ay0, ax1, ay1))
+
+
+def segment_distance(a, b):
+    """ Distances between segments, pairwise.
+
+    Parameters
+    ----------
+    a, b : array_like
+        (n, 2, 2) arrays of segments, or (n, 4) rows of (x0, y0, x1, y1)
+
+    Returns
+    -------
+    distance : numpy.ndarray
+        Distance between a[i] and b[i], 0 where they intersect
+
+    point_a, point_b : numpy.ndarray
+        (n, 2) arrays of the closest points of a[i] and b[i]. Where the
+        segments cross, both are the crossing point.
+    """
+    a = np.asarray(a, dtype=float).reshape(-1, 4)
+    b = np.asarray(b, dtype=float).reshape(-1, 4)
+
+    # Unless they cross, the closest points include an end of one segment
+    tests = [point_segment_distance(a[:, :2], b),
+             point_segment_distance(a[:, 2:], b),
+             point_segment_distance(b[:, :2], a),
+             point_segment_distance(b[:, 2:], a)]
+    ends = np.array([a[:, :2], a[:, 2:], b[:, :2], b[:, 2:]])
+    closest = np.array([c for _, c in tests])
+    distance = np.array([d for d, _ in tests])
+    nearest = np.argmin(distance, axis=0)
+    rows = np.arange(len(a))
+    distance = distance[nearest, rows]
+    on_a = (nearest < 2)[:, None]
+    point_a = np.where(on_a, ends[nearest, rows], closest[nearest, rows])
+    point_b = np.where(on_a, closest[nearest, rows], ends[nearest, rows])
+
+    crossing = segments_intersect(a, b) & (distance > 0)
+    if crossing.any():
+        ax0, ay0, ax1, ay1 = a[crossing].T
+        bx0, by0, bx1, by1 = b[crossing].T
+        t = (_cross(ax0, ay0, bx0, by0, bx1, by1) /
+             ((ax1 - ax0) * (by1 - by0) - (ay1 - ay0) * (bx1 - bx0)))
+        point = np.column_stack((ax0 + t * (ax1 - ax0), ay0 + t * (ay1 - ay0)))
+        point_a[crossing] = point_b[crossing] = point
+        distance[crossing] = 0.0
+    return distance, point_a, point_b
+
+
+def _segment_columns(segments):
+    return np.asarray(segments, dtype=float).reshape(-1, 4).T
+
+
+def _cross(ox, oy, ux, uy, vx, vy):
+    # z component of (u - o) x (v - o)
+    return (ux - ox) * (vy - oy) - (uy - oy) * (vx - ox)
+
+
 def listdir(directory, ignore_hidden=True, ignore_os=True):
     """ List files in given directory.
     Differs from os.listdir() in that hidden and OS-generated files are ignored
@@ -338,6 +597,35 @@ def listdir(directory, ignore_hidden=True, ignore_os=True):
         files = [f for f in files if not f in os_files]
     return files
 
+
+def instance_attributes(obj):
+    """ List the instance attributes of an object.
+    Unlike obj.__dict__, this includes attributes stored in __slots__.
+
+    Parameters
+    ----------
+    obj : object
+        object to list the attributes of
+
+    Returns
+    -------
+    attributes : list of tuples (name, value)
+        the set attributes, base class slots first, then the contents of
+        the object's __dict__ if it has one
+    """
+    attributes = []
+    for cls in reversed(type(obj).__mro__):
+        for name in cls.__dict__.get('__slots__', ()):
+            if name in ('__dict__', '__weakref__'):
+                continue
+            try:
+                attributes.append((name, cls.__dict__[name].__get__(obj, cls)))
+            except AttributeError:
+                # Slot that was never assigned
+                pass
+    attributes.extend(getattr(obj, '__dict__', {}).items())
+    return attributes
+
 def ConvexHull_qh(points):
     #a hull must be a planar shape with nonzero area, so there must be at least 3 points
     if(len(points)<3):